@@ -0,0 +1,46 @@
+"""composite indexes for hot queries
+
+Revision ID: a3f1c2d4e5b6
+Revises: 313c49b974a6
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3f1c2d4e5b6'
+down_revision: Union[str, Sequence[str], None] = '313c49b974a6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_transactions_type_status_date', 'transactions', ['type', 'status', 'date'], unique=False)
+    op.create_index('ix_transactions_account_date', 'transactions', ['account_id', 'date'], unique=False)
+    op.create_index('ix_transactions_target_account_date', 'transactions', ['target_account_id', 'date'], unique=False)
+    op.create_index('ix_transactions_category_type_status_date', 'transactions', ['category_id', 'type', 'status', 'date'], unique=False)
+    op.create_index('ix_transactions_loan_status_date', 'transactions', ['loan_id', 'status', 'date'], unique=False)
+    op.create_index('ix_goal_contributions_goal_date', 'goal_contributions', ['goal_id', 'date'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # MySQL usuwa automatyczny indeks klucza obcego, gdy nowy indeks złożony zaczyna się od tej kolumny.
+    # Przed usunięciem indeksów złożonych odtwarzamy indeksy jednokolumnowe pod FK.
+    op.create_index('ix_goal_contributions_goal_id', 'goal_contributions', ['goal_id'], unique=False)
+    op.create_index('ix_transactions_account_id', 'transactions', ['account_id'], unique=False)
+    op.create_index('ix_transactions_target_account_id', 'transactions', ['target_account_id'], unique=False)
+    op.create_index('ix_transactions_category_id', 'transactions', ['category_id'], unique=False)
+    op.create_index('ix_transactions_loan_id', 'transactions', ['loan_id'], unique=False)
+
+    op.drop_index('ix_goal_contributions_goal_date', table_name='goal_contributions')
+    op.drop_index('ix_transactions_loan_status_date', table_name='transactions')
+    op.drop_index('ix_transactions_category_type_status_date', table_name='transactions')
+    op.drop_index('ix_transactions_target_account_date', table_name='transactions')
+    op.drop_index('ix_transactions_account_date', table_name='transactions')
+    op.drop_index('ix_transactions_type_status_date', table_name='transactions')
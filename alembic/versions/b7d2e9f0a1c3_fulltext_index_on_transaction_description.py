@@ -0,0 +1,28 @@
+"""fulltext index on transaction description
+
+Revision ID: b7d2e9f0a1c3
+Revises: a3f1c2d4e5b6
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d2e9f0a1c3'
+down_revision: Union[str, Sequence[str], None] = 'a3f1c2d4e5b6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_transactions_description_ft', 'transactions', ['description'], unique=False, mysql_prefix='FULLTEXT')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_transactions_description_ft', table_name='transactions')
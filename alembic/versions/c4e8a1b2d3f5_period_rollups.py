@@ -0,0 +1,45 @@
+"""period rollups
+
+Revision ID: c4e8a1b2d3f5
+Revises: b7d2e9f0a1c3
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e8a1b2d3f5'
+down_revision: Union[str, Sequence[str], None] = 'b7d2e9f0a1c3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Tabela wypełniana przy starcie aplikacji (rollup.ensure_built) lub: python rebuild_rollups.py
+    op.create_table('period_rollups',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('period_start', sa.Date(), nullable=True),
+        sa.Column('category_id', sa.Integer(), nullable=True),
+        sa.Column('type', sa.String(length=20), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=True),
+        sa.Column('account_id', sa.Integer(), nullable=True),
+        sa.Column('total', sa.DECIMAL(precision=12, scale=2), nullable=True),
+        sa.Column('tx_count', sa.Integer(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_period_rollups_id'), 'period_rollups', ['id'], unique=False)
+    op.create_index('ix_period_rollups_key', 'period_rollups', ['period_start', 'category_id', 'type', 'status', 'account_id'], unique=False)
+    op.create_index('ix_period_rollups_category_period', 'period_rollups', ['category_id', 'period_start'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_period_rollups_category_period', table_name='period_rollups')
+    op.drop_index('ix_period_rollups_key', table_name='period_rollups')
+    op.drop_index(op.f('ix_period_rollups_id'), table_name='period_rollups')
+    op.drop_table('period_rollups')
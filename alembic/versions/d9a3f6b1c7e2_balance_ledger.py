@@ -0,0 +1,79 @@
+"""balance ledger
+
+Revision ID: d9a3f6b1c7e2
+Revises: c4e8a1b2d3f5
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd9a3f6b1c7e2'
+down_revision: Union[str, Sequence[str], None] = 'c4e8a1b2d3f5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('balance_entries',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('account_id', sa.Integer(), nullable=True),
+        sa.Column('delta', sa.DECIMAL(precision=12, scale=2), nullable=True),
+        sa.Column('date', sa.Date(), nullable=True),
+        sa.Column('kind', sa.String(length=20), nullable=True),
+        sa.Column('transaction_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_balance_entries_id'), 'balance_entries', ['id'], unique=False)
+    op.create_index('ix_balance_entries_account_date', 'balance_entries', ['account_id', 'date'], unique=False)
+
+    op.create_table('balance_snapshots',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('account_id', sa.Integer(), nullable=True),
+        sa.Column('date', sa.Date(), nullable=True),
+        sa.Column('balance', sa.DECIMAL(precision=12, scale=2), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_balance_snapshots_id'), 'balance_snapshots', ['id'], unique=False)
+    op.create_index('ix_balance_snapshots_account_date', 'balance_snapshots', ['account_id', 'date'], unique=False)
+
+    # Historia z istniejących transakcji zrealizowanych
+    op.execute("""
+        INSERT INTO balance_entries (account_id, delta, date, kind, transaction_id, created_at)
+        SELECT account_id,
+               CASE WHEN type = 'income' THEN amount ELSE -amount END,
+               date, 'transaction', id, CURRENT_TIMESTAMP
+        FROM transactions
+        WHERE status = 'zrealizowana' AND type IN ('income', 'expense', 'transfer') AND account_id IS NOT NULL
+    """)
+    op.execute("""
+        INSERT INTO balance_entries (account_id, delta, date, kind, transaction_id, created_at)
+        SELECT target_account_id, amount, date, 'transaction', id, CURRENT_TIMESTAMP
+        FROM transactions
+        WHERE status = 'zrealizowana' AND type = 'transfer' AND target_account_id IS NOT NULL
+    """)
+    # Saldo otwarcia: różnica między bieżącym saldem a sumą historii (saldo początkowe, ręczne korekty)
+    op.execute("""
+        INSERT INTO balance_entries (account_id, delta, date, kind, transaction_id, created_at)
+        SELECT a.id,
+               a.balance - COALESCE((SELECT SUM(e.delta) FROM balance_entries e WHERE e.account_id = a.id), 0),
+               COALESCE((SELECT MIN(e.date) FROM balance_entries e WHERE e.account_id = a.id), CURRENT_DATE),
+               'adjustment', NULL, CURRENT_TIMESTAMP
+        FROM accounts a
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_balance_snapshots_account_date', table_name='balance_snapshots')
+    op.drop_index(op.f('ix_balance_snapshots_id'), table_name='balance_snapshots')
+    op.drop_table('balance_snapshots')
+    op.drop_index('ix_balance_entries_account_date', table_name='balance_entries')
+    op.drop_index(op.f('ix_balance_entries_id'), table_name='balance_entries')
+    op.drop_table('balance_entries')
@@ -0,0 +1,28 @@
+"""loan interest rate
+
+Revision ID: e5b8c2d7f4a9
+Revises: d9a3f6b1c7e2
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b8c2d7f4a9'
+down_revision: Union[str, Sequence[str], None] = 'd9a3f6b1c7e2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('loans', sa.Column('interest_rate', sa.DECIMAL(precision=6, scale=3), nullable=True, server_default='0'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('loans', 'interest_rate')
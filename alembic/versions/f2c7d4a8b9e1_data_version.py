@@ -0,0 +1,33 @@
+"""data version
+
+Revision ID: f2c7d4a8b9e1
+Revises: e5b8c2d7f4a9
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2c7d4a8b9e1'
+down_revision: Union[str, Sequence[str], None] = 'e5b8c2d7f4a9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('data_versions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.execute("INSERT INTO data_versions (id, version) VALUES (1, 0)")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('data_versions')
@@ -0,0 +1,245 @@
+"""
+Generator syntetycznych danych domowego budżetu do benchmarków.
+
+Tworzy konta (ROR + oszczędnościowe), kategorie z limitami, lata historii transakcji
+(wypłaty, wydatki, przelewy na oszczędności, raty kredytów), transakcje planowane,
+cele z wpłatami, kredyty, płatności cykliczne i wyjątki dni wypłat. Na koniec liczy salda,
+dziennik sald i period_rollups - baza jest spójna tak, jak po normalnym użytkowaniu.
+
+Użycie (z katalogu głównego projektu):
+    DATABASE_URL=sqlite:///./bench.db python benchmarks/generate_data.py --years 3 --tx-per-month 300
+"""
+import sys
+import os
+import argparse
+import random
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+sys.path.append(os.getcwd())
+
+import database, models, utils
+from money import to_money
+from services import rollup, ledger
+
+CATEGORIES = [
+    ("Jedzenie", 2000, "shopping-cart", "#22c55e"),
+    ("Paliwo", 600, "fuel", "#f97316"),
+    ("Mieszkanie", 2500, "home", "#3b82f6"),
+    ("Rachunki", 800, "receipt", "#6366f1"),
+    ("Zdrowie", 300, "heart-pulse", "#ef4444"),
+    ("Rozrywka", 400, "film", "#a855f7"),
+    ("Ubrania", 300, "shirt", "#ec4899"),
+    ("Dzieci", 700, "baby", "#14b8a6"),
+    ("Transport", 250, "bus", "#0ea5e9"),
+    ("Restauracje", 500, "utensils", "#eab308"),
+    ("Subskrypcje", 150, "tv", "#64748b"),
+    ("Prezenty", 200, "gift", "#f43f5e"),
+    ("Wynagrodzenie", 0, "wallet", "#16a34a"),
+    ("Kredyty", 0, "landmark", "#78716c"),
+]
+
+# (kategoria, kontrahenci, zakres kwot)
+MERCHANTS = [
+    ("Jedzenie", ["BIEDRONKA", "LIDL", "ZABKA", "KAUFLAND", "CARREFOUR", "AUCHAN", "NETTO"], (8, 350)),
+    ("Paliwo", ["ORLEN", "BP", "SHELL", "CIRCLE K", "MOYA"], (80, 350)),
+    ("Rachunki", ["PGE OBROT", "PGNIG", "ORANGE POLSKA", "PLAY", "UPC"], (40, 300)),
+    ("Zdrowie", ["APTEKA DOZ", "SUPER-PHARM", "LUX MED", "MEDICOVER"], (15, 400)),
+    ("Rozrywka", ["CINEMA CITY", "HELIOS", "EMPIK", "STEAM"], (20, 200)),
+    ("Ubrania", ["ZALANDO", "RESERVED", "HM", "CCC", "DECATHLON"], (40, 500)),
+    ("Dzieci", ["SMYK", "PEPCO", "SZKOLA PODSTAWOWA", "PRZEDSZKOLE"], (20, 600)),
+    ("Transport", ["JAKDOJADE", "PKP INTERCITY", "UBER", "BOLT"], (4, 150)),
+    ("Restauracje", ["MCDONALDS", "KFC", "PYSZNE.PL", "GLOVO", "STARBUCKS"], (15, 250)),
+    ("Subskrypcje", ["NETFLIX", "SPOTIFY", "DISNEY PLUS", "YOUTUBE PREMIUM"], (20, 60)),
+    ("Prezenty", ["ALLEGRO", "AMAZON", "EMPIK"], (30, 400)),
+]
+CITIES = ["WARSZAWA", "KRAKOW", "GDANSK", "POZNAN", "WROCLAW", "LODZ", "LUBLIN"]
+
+BATCH = 5000
+
+def _month_starts(first: date, last: date):
+    current = date(first.year, first.month, 1)
+    while current <= last:
+        yield current
+        current = utils.add_months(current, 1)
+
+def random_description(rng: random.Random, merchants, city: bool = True) -> str:
+    name = rng.choice(merchants)
+    suffix = f" {rng.choice(CITIES)}" if city and rng.random() < 0.7 else ""
+    return f"{name}{suffix} {rng.randint(100, 9999)}"
+
+def _insert(db, model, rows):
+    for i in range(0, len(rows), BATCH):
+        db.bulk_insert_mappings(model, rows[i:i + BATCH])
+
+def generate(db, accounts: int = 3, years: int = 3, tx_per_month: int = 150, goals: int = 5, loans: int = 3, recurring: int = 10, seed: int = 42):
+    """Wypełnia PUSTĄ bazę. Zwraca słownik z liczbą utworzonych wierszy."""
+    rng = random.Random(seed)
+    today = date.today()
+    history_start = utils.add_months(date(today.year, today.month, 1), -12 * years)
+    planned_until = utils.add_months(today, 2)
+
+    # --- Słowniki ---
+    categories = {}
+    for name, limit, icon, color in CATEGORIES:
+        cat = models.Category(name=name, monthly_limit=limit, icon_name=icon, color=color)
+        db.add(cat)
+        categories[name] = cat
+
+    ror_accounts = []
+    for i in range(max(1, accounts - 1)):
+        acc = models.Account(name=f"ROR {i + 1}", type="ROR", balance=0, is_savings=False)
+        db.add(acc)
+        ror_accounts.append(acc)
+    savings = models.Account(name="Oszczędności", type="Oszczędnościowe", balance=0, is_savings=True)
+    db.add(savings)
+
+    # Wyjątki dni wypłat: grudzień wcześniej (święta)
+    for year in range(history_start.year, planned_until.year + 1):
+        db.add(models.PaydayOverride(year=year, month=12, day=20))
+    db.flush()
+    utils.invalidate_payday_calendar()
+
+    loan_objs = []
+    for i in range(loans):
+        total = rng.choice([20000, 45000, 120000, 350000])
+        monthly = round(total / rng.choice([36, 60, 120, 300]), 2)
+        loan = models.Loan(
+            name=f"Kredyt {i + 1}", total_amount=total, remaining_amount=round(total * rng.uniform(0.3, 0.9), 2),
+            monthly_payment=monthly, next_payment_date=date(today.year, today.month, min(28, 5 + i * 5))
+        )
+        db.add(loan)
+        loan_objs.append(loan)
+    db.flush()
+
+    # --- Transakcje ---
+    rows = []
+    for month in _month_starts(history_start, planned_until):
+        payday = utils.get_actual_payday(month.year, month.month, db)
+        for acc in ror_accounts:
+            status = "zrealizowana" if payday <= today else "planowana"
+            rows.append({"amount": to_money(rng.uniform(6500, 9500)), "description": "WYNAGRODZENIE PRACODAWCA SP Z O O", "date": payday,
+                         "type": "income", "status": status, "account_id": acc.id, "category_id": categories["Wynagrodzenie"].id})
+
+            # Przelew na oszczędności dzień po wypłacie
+            transfer_day = payday + timedelta(days=1)
+            rows.append({"amount": to_money(rng.choice([300, 500, 800, 1000])), "description": "Przelew na oszczędności", "date": transfer_day,
+                         "type": "transfer", "status": "zrealizowana" if transfer_day <= today else "planowana",
+                         "account_id": acc.id, "target_account_id": savings.id})
+
+        for loan in loan_objs:
+            day = date(month.year, month.month, loan.next_payment_date.day)
+            rows.append({"amount": to_money(loan.monthly_payment), "description": f"Rata {loan.name}", "date": day, "type": "expense",
+                         "status": "zrealizowana" if day < today else "planowana", "account_id": ror_accounts[0].id,
+                         "category_id": categories["Kredyty"].id, "loan_id": loan.id})
+
+        days_in_month = (utils.add_months(month, 1) - month).days
+        for _ in range(tx_per_month):
+            day = month + timedelta(days=rng.randrange(days_in_month))
+            if day > planned_until: continue
+            cat_name, merchants, (low, high) = rng.choice(MERCHANTS)
+            rows.append({"amount": to_money(rng.uniform(low, high)), "description": random_description(rng, merchants), "date": day,
+                         "type": "expense", "status": "zrealizowana" if day <= today else "planowana",
+                         "account_id": rng.choice(ror_accounts).id, "category_id": categories[cat_name].id})
+
+    _insert(db, models.Transaction, rows)
+
+    # --- Salda i dziennik sald (z transakcji zrealizowanych) ---
+    balances = defaultdict(Decimal)
+    entries = []
+    for row in rows:
+        if row["status"] != "zrealizowana": continue
+        sign = 1 if row["type"] == "income" else -1
+        balances[row["account_id"]] += sign * row["amount"]
+        entries.append({"account_id": row["account_id"], "delta": sign * row["amount"], "date": row["date"], "kind": "transaction", "created_at": datetime.utcnow()})
+        if row["type"] == "transfer":
+            balances[row["target_account_id"]] += row["amount"]
+            entries.append({"account_id": row["target_account_id"], "delta": row["amount"], "date": row["date"], "kind": "transaction", "created_at": datetime.utcnow()})
+
+    # Saldo otwarcia, żeby ROR nie wyszły na minus przy dużej liczbie wydatków
+    for acc in ror_accounts + [savings]:
+        opening = max(Decimal("0"), -balances[acc.id]) + Decimal("5000.00")
+        entries.append({"account_id": acc.id, "delta": opening, "date": history_start, "kind": "adjustment", "created_at": datetime.utcnow()})
+        balances[acc.id] += opening
+        db.query(models.Account).filter(models.Account.id == acc.id).update({models.Account.balance: balances[acc.id]}, synchronize_session=False)
+    _insert(db, models.BalanceEntry, entries)
+
+    # --- Cele z wpłatami (miesięcznymi od startu historii) ---
+    contributions = []
+    for i in range(goals):
+        goal = models.Goal(name=f"Cel {i + 1}", target_amount=rng.choice([5000, 12000, 30000, 80000]), current_amount=0,
+                           deadline=utils.add_months(today, rng.randint(3, 60)), account_id=savings.id)
+        db.add(goal)
+        db.flush()
+        monthly = to_money(rng.uniform(50, 400))
+        for month in _month_starts(history_start, today):
+            contributions.append({"goal_id": goal.id, "amount": monthly, "date": month + timedelta(days=rng.randrange(5, 25))})
+        goal.current_amount = min(to_money(goal.target_amount), monthly * sum(1 for c in contributions if c["goal_id"] == goal.id))
+    _insert(db, models.GoalContribution, contributions)
+
+    # --- Płatności cykliczne ---
+    for i in range(recurring):
+        cat_name, merchants, (low, high) = MERCHANTS[i % len(MERCHANTS)]
+        db.add(models.RecurringTransaction(
+            name=merchants[0].title(), amount=to_money(rng.uniform(low, high)), day_of_month=rng.randint(1, 28),
+            last_run_date=utils.add_months(today, -1), is_active=True,
+            category_id=categories[cat_name].id, account_id=ror_accounts[0].id
+        ))
+
+    db.flush()
+    rollups = rollup.rebuild(db)
+    ledger.take_snapshots(db)
+    return {"transactions": len(rows), "balance_entries": len(entries), "contributions": len(contributions), "rollups": rollups}
+
+def bank_csv(rows: int, seed: int = 0, start: date = None) -> bytes:
+    """Wyciąg w formacie ING (cp1250, separator ';') z `rows` transakcjami - do podglądu/importu."""
+    rng = random.Random(seed)
+    start = start or date.today() - timedelta(days=365)
+    lines = [
+        '"Lista transakcji"',
+        '"Dokument nr 0000001"',
+        '',
+        '"Data transakcji";"Data księgowania";"Dane kontrahenta";"Tytuł";"Nr rachunku";"Nazwa banku";"Szczegóły";"Nr transakcji";'
+        '"Kwota transakcji (waluta rachunku)";"Waluta";"Kwota blokady/zwolnienie blokady";"Waluta";"Kwota płatności w walucie";"Waluta";',
+    ]
+    for i in range(rows):
+        day = start + timedelta(days=rng.randrange(365))
+        if rng.random() < 0.05:
+            description, title, amount = "PRACODAWCA SP Z O O", "Wynagrodzenie", rng.uniform(3000, 9000)
+        else:
+            _, merchants, (low, high) = rng.choice(MERCHANTS)
+            description, title, amount = random_description(rng, merchants), "Płatność kartą", -rng.uniform(low, high)
+        value = f"{amount:.2f}".replace(".", ",")
+        lines.append(f'{day.isoformat()};{day.isoformat()};"{description}";"{title} {seed}-{i}";"";"";"";"{seed:04d}{i:08d}";{value};PLN;;;;;')
+    return ("\r\n".join(lines) + "\r\n").encode("cp1250")
+
+def main():
+    parser = argparse.ArgumentParser(description="Generator danych do benchmarków")
+    parser.add_argument("--accounts", type=int, default=3)
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--tx-per-month", type=int, default=150)
+    parser.add_argument("--goals", type=int, default=5)
+    parser.add_argument("--loans", type=int, default=3)
+    parser.add_argument("--recurring", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    models.Base.metadata.create_all(bind=database.engine)
+    db = database.SessionLocal()
+    try:
+        if db.query(models.Transaction.id).first() is not None:
+            print("❌ Baza nie jest pusta - generator działa tylko na pustej bazie")
+            sys.exit(1)
+        counts = generate(db, args.accounts, args.years, args.tx_per_month, args.goals, args.loans, args.recurring, args.seed)
+        db.commit()
+        print(f"✅ Wygenerowano: {counts}")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ BŁĄD: {e}")
+        raise
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
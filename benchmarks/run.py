@@ -0,0 +1,180 @@
+"""
+Benchmark gorących ścieżek API: czasy (p50/p95) i liczba zapytań SQL per żądanie.
+
+Żądania idą przez pełny stos FastAPI (TestClient: middleware, autoryzacja, serializacja).
+Cache odpowiedzi (ETag) jest domyślnie czyszczony przed każdym żądaniem - mierzymy
+zimną ścieżkę; --warm mierzy odpowiedzi z cache.
+
+Użycie (z katalogu głównego projektu):
+    python benchmarks/run.py --generate                  # SQLite ./bench.db, świeże dane
+    python benchmarks/run.py --db mysql+mysqlconnector://root:@localhost:3306/budzet_bench --generate
+    python benchmarks/run.py --only dashboard,search --iterations 50
+    python benchmarks/run.py --csv-sizes 1000,10000,100000
+"""
+import sys
+import os
+import argparse
+import statistics
+import time
+
+sys.path.append(os.getcwd())
+
+# Silnik tworzony jest przy imporcie database.py - adres bazy trzeba ustawić wcześniej
+def _configure_db():
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--db")
+    known, _ = parser.parse_known_args()
+    os.environ["DATABASE_URL"] = known.db or os.environ.get("BENCH_DATABASE_URL", "sqlite:///./bench.db")
+
+_configure_db()
+
+from sqlalchemy import event
+from fastapi.testclient import TestClient
+import database, models, response_cache
+from benchmarks import generate_data
+
+SCENARIOS = ["dashboard", "trend", "goals", "search", "loans", "import"]
+
+class QueryCounter:
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if len(ordered) == 1: return ordered[0]
+    k = (len(ordered) - 1) * pct / 100
+    lower = int(k)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (k - lower)
+
+class Bench:
+    def __init__(self, client, headers, counter, iterations, warm):
+        self.client = client
+        self.headers = headers
+        self.counter = counter
+        self.iterations = iterations
+        self.warm = warm
+        self.results = []
+
+    def measure(self, name, method, url, iterations=None, prepare=None, **kwargs):
+        """Wykonuje żądanie N razy (po jednym rozgrzewkowym) i zapisuje czasy i liczbę zapytań."""
+        timings, queries = [], []
+        iterations = iterations or self.iterations
+        for i in range(iterations + 1):
+            if prepare: kwargs.update(prepare(i))
+            if not self.warm: response_cache.clear()
+            before = self.counter.count
+            start = time.perf_counter()
+            response = self.client.request(method, url, headers=self.headers, **kwargs)
+            elapsed = (time.perf_counter() - start) * 1000
+            if response.status_code >= 400:
+                raise RuntimeError(f"{name}: HTTP {response.status_code} {response.text[:200]}")
+            if i == 0 and iterations > 1: continue  # rozgrzewka (import modułów, pula połączeń)
+            timings.append(elapsed)
+            queries.append(self.counter.count - before)
+        self.results.append({
+            "name": name, "n": len(timings),
+            "p50": percentile(timings, 50), "p95": percentile(timings, 95), "mean": statistics.mean(timings),
+            "queries": max(queries)
+        })
+        return response
+
+    def report(self):
+        lines = [f"{'scenariusz':<42} {'n':>4} {'p50 ms':>10} {'p95 ms':>10} {'śr. ms':>10} {'SQL':>6}"]
+        lines.append("-" * len(lines[0]))
+        for r in self.results:
+            lines.append(f"{r['name']:<42} {r['n']:>4} {r['p50']:>10.1f} {r['p95']:>10.1f} {r['mean']:>10.1f} {r['queries']:>6}")
+        return "\n".join(lines)
+
+def run_scenarios(bench, only, csv_sizes, account_id, category_id):
+    if "dashboard" in only:
+        for offset in (0, -1, -6, -12, 1):
+            bench.measure(f"GET /api/dashboard?offset={offset}", "GET", "/api/dashboard", params={"offset": offset})
+    if "trend" in only:
+        for months in (6, 12, 36):
+            bench.measure(f"GET /api/stats/trend?months={months}", "GET", "/api/stats/trend", params={"months": months})
+    if "goals" in only:
+        bench.measure("GET /api/goals", "GET", "/api/goals")
+    if "loans" in only:
+        bench.measure("GET /api/loans", "GET", "/api/loans")
+    if "search" in only:
+        bench.measure("search q=biedronka", "GET", "/api/transactions/search", params={"q": "biedronka", "limit": 100})
+        bench.measure("search category + 1 rok", "GET", "/api/transactions/search",
+                      params={"category_id": category_id, "date_from": f"{time.localtime().tm_year - 1}-01-01", "limit": 100})
+        bench.measure("search account (bez limitu)", "GET", "/api/transactions/search", params={"account_id": account_id})
+    if "import" in only:
+        for size in csv_sizes:
+            iterations = max(1, min(bench.iterations, 100000 // size))
+            payload = {}
+
+            def preview_file(i, size=size):
+                return {"files": {"file": ("wyciag.csv", generate_data.bank_csv(size, seed=size * 1000 + i), "text/csv")}}
+            response = bench.measure(f"POST /api/import/preview ({size} wierszy)", "POST", "/api/import/preview", iterations, preview_file)
+            payload["rows"] = response.json()
+
+            # Każda iteracja importuje inny wyciąg (inny seed), żeby nie mierzyć samego pomijania duplikatów
+            def confirm_body(i, size=size):
+                rows = payload["rows"] if i == 0 else bench.client.post(
+                    "/api/import/preview", headers=bench.headers, **preview_file(1000 + i)
+                ).json()
+                return {"json": {"account_id": account_id, "transactions": rows}}
+            bench.measure(f"POST /api/import/confirm ({size} wierszy)", "POST", "/api/import/confirm", iterations, confirm_body)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark API domowego budżetu")
+    parser.add_argument("--db", help="Adres bazy (domyślnie BENCH_DATABASE_URL lub sqlite:///./bench.db)")
+    parser.add_argument("--generate", action="store_true", help="Wyczyść bazę i wygeneruj dane")
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--accounts", type=int, default=3)
+    parser.add_argument("--tx-per-month", type=int, default=150)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--only", default=",".join(SCENARIOS), help=f"Lista scenariuszy: {','.join(SCENARIOS)}")
+    parser.add_argument("--csv-sizes", default="1000,10000", help="Rozmiary wyciągów CSV, np. 1000,10000,100000")
+    parser.add_argument("--warm", action="store_true", help="Nie czyść cache odpowiedzi między żądaniami")
+    parser.add_argument("--output", default="bench_output.txt", help="Plik z raportem ('' = tylko konsola)")
+    args = parser.parse_args()
+
+    print(f"--- BAZA: {database.engine.url.render_as_string(hide_password=True)} ---")
+    if args.generate:
+        models.Base.metadata.drop_all(bind=database.engine)
+        models.Base.metadata.create_all(bind=database.engine)
+        db = database.SessionLocal()
+        try:
+            start = time.perf_counter()
+            counts = generate_data.generate(db, args.accounts, args.years, args.tx_per_month)
+            db.commit()
+            print(f"--- DANE: {counts} w {time.perf_counter() - start:.1f} s ---")
+        finally:
+            db.close()
+
+    import main as app_module  # create_all + startowe handlery (admin, agregaty, snapshoty)
+    only = {s.strip() for s in args.only.split(",") if s.strip()}
+    csv_sizes = [int(s) for s in args.csv_sizes.split(",") if s.strip()]
+
+    with TestClient(app_module.app) as client:
+        token = client.post("/token", data={"username": "admin", "password": "admin"}).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        db = database.SessionLocal()
+        try:
+            account_id = db.query(models.Account.id).filter(models.Account.is_savings == False).order_by(models.Account.id).first()[0]
+            category_id = db.query(models.Category.id).order_by(models.Category.id).first()[0]
+            tx_count = db.query(models.Transaction.id).count()
+        finally:
+            db.close()
+        print(f"--- TRANSAKCJI W BAZIE: {tx_count} ---")
+
+        bench = Bench(client, headers, QueryCounter(database.engine), args.iterations, args.warm)
+        run_scenarios(bench, only, csv_sizes, account_id, category_id)
+
+    report = bench.report()
+    print(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(f"Baza: {database.engine.url.render_as_string(hide_password=True)}, transakcji: {tx_count}\n{report}\n")
+
+if __name__ == "__main__":
+    main()
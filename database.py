@@ -1,17 +1,42 @@
 import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
+from starlette.concurrency import run_in_threadpool
 
 # Ładujemy zmienne z pliku .env
 load_dotenv()
+import instrumentation  # czyta SLOW_QUERY_MS / METRICS_TOKEN z .env
 
 # Pobieramy adres z pliku .env (lub używamy domyślnego, jeśli brak pliku)
 SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "mysql+mysqlconnector://root:@localhost:3306/domowy_budzet")
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+# Pula połączeń - jawne rozmiary, pre-ping (MySQL zrywa bezczynne połączenia po wait_timeout) i recykling
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+def _engine_options(url: str) -> dict:
+    if url.startswith("sqlite"):
+        # SQLite (testy/benchmarki) - bez ustawień puli, połączenie współdzielone między wątkami
+        return {"connect_args": {"check_same_thread": False}}
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": True,
+    }
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **_engine_options(SQLALCHEMY_DATABASE_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+instrumentation.instrument_engine(engine)
 
 Base = declarative_base()
 
@@ -22,6 +47,20 @@ def get_db():
     finally:
         db.close()
 
+def _run_with_session(fn, *args):
+    db = SessionLocal()
+    try:
+        return fn(db, *args)
+    finally:
+        db.close()
+
+async def run_service(fn, *args):
+    """
+    Wywołuje synchroniczną funkcję serwisu `fn(db, *args)` w puli wątków z własną sesją,
+    bez blokowania pętli zdarzeń (dla handlerów async, np. podgląd importu).
+    """
+    return await run_in_threadpool(_run_with_session, fn, *args)
+
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
@@ -30,7 +69,51 @@ import models
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+# --- CACHE PRINCIPALI (token -> użytkownik) ---
+# Zdekodowany token i rekord użytkownika trzymane krótko w pamięci procesu, żeby każde
+# żądanie API nie robiło SELECT-a na users. Unieważniane przy zmianie hasła i tworzeniu użytkownika,
+# ale tylko w procesie, który obsłużył zmianę - pozostałe workery uvicorna honorują stary
+# principal najdłużej PRINCIPAL_CACHE_TTL sekund (domyślnie 60). To jest okno nieaktualności.
+PRINCIPAL_CACHE_TTL = int(os.getenv("PRINCIPAL_CACHE_TTL", "60"))
+PRINCIPAL_CACHE_SIZE = 256
+_principal_cache = OrderedDict()  # token -> (wygasa, id, username, hashed_password)
+_principal_lock = threading.Lock()
+
+def invalidate_principals(username: Optional[str] = None):
+    """Usuwa z cache wpisy danego użytkownika (lub wszystkie, gdy username=None) - w tym procesie"""
+    with _principal_lock:
+        if username is None:
+            _principal_cache.clear()
+            return
+        for token in [t for t, entry in _principal_cache.items() if entry[2] == username]:
+            del _principal_cache[token]
+
+def _cached_principal(token: str):
+    with _principal_lock:
+        entry = _principal_cache.get(token)
+        if entry is None:
+            return None
+        if entry[0] < time.time():
+            del _principal_cache[token]
+            return None
+        _principal_cache.move_to_end(token)
+    # Obiekt odłączony od sesji - handler, który zmienia użytkownika, musi go pobrać z bazy
+    return models.User(id=entry[1], username=entry[2], hashed_password=entry[3])
+
+def _remember_principal(token: str, payload: dict, user):
+    expires = time.time() + PRINCIPAL_CACHE_TTL
+    if payload.get("exp"):
+        expires = min(expires, float(payload["exp"]))
+    with _principal_lock:
+        _principal_cache[token] = (expires, user.id, user.username, user.hashed_password)
+        while len(_principal_cache) > PRINCIPAL_CACHE_SIZE:
+            _principal_cache.popitem(last=False)
+
 def get_current_user(token: str = Depends(oauth2_scheme), db: SessionLocal = Depends(get_db)):
+    cached = _cached_principal(token)
+    if cached is not None:
+        return cached
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Nieprawidłowe dane logowania",
@@ -46,4 +129,5 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: SessionLocal = Dep
     user = db.query(models.User).filter(models.User.username == username).first()
     if user is None:
         raise credentials_exception
+    _remember_principal(token, payload, user)
     return user
@@ -0,0 +1,65 @@
+"""
+Uruchamia EXPLAIN na zapytaniach faktycznie wysyłanych przez dashboard, trend i wyszukiwarkę.
+Zapytania są przechwytywane z silnika SQLAlchemy podczas wywołania serwisów, więc plan
+dotyczy dokładnie tych SQL-i, które idą na produkcję.
+
+Użycie:  python explain_queries.py [--offset 0] [--q tekst]
+"""
+import sys
+import os
+import argparse
+
+sys.path.append(os.getcwd())
+
+from sqlalchemy import event
+import database
+from services import dashboard, transaction
+
+def capture_queries(fn, *args):
+    captured = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            captured.append((statement, parameters))
+
+    event.listen(database.engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        db = database.SessionLocal()
+        try:
+            fn(db, *args)
+        finally:
+            db.close()
+    finally:
+        event.remove(database.engine, "before_cursor_execute", before_cursor_execute)
+    return captured
+
+def explain(statement, parameters):
+    prefix = "EXPLAIN QUERY PLAN " if database.engine.dialect.name == "sqlite" else "EXPLAIN "
+    with database.engine.connect() as conn:
+        result = conn.exec_driver_sql(prefix + statement, parameters)
+        return list(result.keys()), result.fetchall()
+
+def main():
+    parser = argparse.ArgumentParser(description="EXPLAIN dla zapytań dashboardu, trendu i wyszukiwania")
+    parser.add_argument("--offset", type=int, default=0, help="Offset okresu dla dashboardu")
+    parser.add_argument("--q", default=None, help="Fraza dla wyszukiwarki")
+    args = parser.parse_args()
+
+    scenarios = [
+        ("dashboard", dashboard.get_dashboard_data, (args.offset,)),
+        ("trend", dashboard.get_trend_data, ()),
+        ("search", transaction.search_transactions, (args.q, None, None, None, None, None, None, None, 100, None)),
+    ]
+
+    for name, fn, fn_args in scenarios:
+        print(f"\n===== {name.upper()} =====")
+        for statement, parameters in capture_queries(fn, *fn_args):
+            print(f"\n--- SQL ---\n{statement.strip()}")
+            columns, rows = explain(statement, parameters)
+            print("--- PLAN ---")
+            print(" | ".join(columns))
+            for row in rows:
+                print(" | ".join(str(v) for v in row))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import event
+
+# --- INSTRUMENTACJA (liczniki SQL, wolne zapytania, /metrics) ---
+# Zdarzenia silnika SQLAlchemy zliczają zapytania i czas bazy w obiekcie przypiętym do bieżącego
+# żądania (ContextVar). Obiekt jest mutowalny, bo handlery synchroniczne działają w puli wątków
+# na kopii kontekstu - kopia wskazuje na ten sam obiekt, więc liczniki wracają do middleware.
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")  # Bez tokenu /metrics jest wyłączone (404)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+logger = logging.getLogger("budzet.sql")
+
+class RequestStats:
+    __slots__ = ("route", "queries", "db_time")
+
+    def __init__(self, route: str):
+        self.route = route
+        self.queries = 0
+        self.db_time = 0.0
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+def start_request(route: str):
+    stats = RequestStats(route)
+    return stats, _current.set(stats)
+
+def end_request(token):
+    _current.reset(token)
+
+def current_stats() -> Optional[RequestStats]:
+    return _current.get()
+
+# --- ZDARZENIA SILNIKA ---
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("query_start")
+    if not starts: return
+    elapsed = time.perf_counter() - starts.pop()
+
+    stats = _current.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_time += elapsed
+
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        route = stats.route if stats is not None else "-"
+        logger.warning("Wolne zapytanie %.1f ms [%s]: %s", elapsed * 1000, route, " ".join(statement.split())[:500])
+
+def instrument_engine(engine):
+    """Podpina liczniki pod silnik"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+# --- HISTOGRAMY ---
+class _Histogram:
+    __slots__ = ("buckets", "counts", "total", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.total += value
+        self.count += 1
+
+_lock = threading.Lock()
+_latency = {}     # (metoda, trasa, status) -> histogram czasu żądania [s]
+_queries = {}     # (metoda, trasa) -> histogram liczby zapytań
+_db_seconds = {}  # (metoda, trasa) -> suma czasu w bazie [s]
+
+def observe_request(method: str, stats: RequestStats, status_code: int, elapsed: float):
+    key = (method, stats.route)
+    with _lock:
+        _latency.setdefault((method, stats.route, str(status_code)), _Histogram(LATENCY_BUCKETS)).observe(elapsed)
+        _queries.setdefault(key, _Histogram(QUERY_BUCKETS)).observe(stats.queries)
+        _db_seconds[key] = _db_seconds.get(key, 0.0) + stats.db_time
+
+def _labels(**labels) -> str:
+    parts = []
+    for name, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{name}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+def _render_histogram(lines, name, histograms, label_names):
+    for key, hist in sorted(histograms.items()):
+        labels = dict(zip(label_names, key))
+        for bound, count in zip(hist.buckets, hist.counts):
+            lines.append(f"{name}_bucket{_labels(**labels, le=bound)} {count}")
+        lines.append(f"{name}_bucket{_labels(**labels, le='+Inf')} {hist.count}")
+        lines.append(f"{name}_sum{_labels(**labels)} {hist.total}")
+        lines.append(f"{name}_count{_labels(**labels)} {hist.count}")
+
+def render_metrics() -> str:
+    """Metryki w formacie tekstowym Prometheusa (text/plain; version=0.0.4)"""
+    lines = []
+    with _lock:
+        lines.append("# HELP http_request_duration_seconds Czas obsługi żądania HTTP.")
+        lines.append("# TYPE http_request_duration_seconds histogram")
+        _render_histogram(lines, "http_request_duration_seconds", _latency, ("method", "route", "status"))
+        lines.append("# HELP http_request_db_queries Liczba zapytań SQL na żądanie.")
+        lines.append("# TYPE http_request_db_queries histogram")
+        _render_histogram(lines, "http_request_db_queries", _queries, ("method", "route"))
+        lines.append("# HELP http_request_db_seconds_total Łączny czas zapytań SQL.")
+        lines.append("# TYPE http_request_db_seconds_total counter")
+        for (method, route), total in sorted(_db_seconds.items()):
+            lines.append(f"http_request_db_seconds_total{_labels(method=method, route=route)} {total}")
+    return "\n".join(lines) + "\n"
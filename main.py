@@ -1,12 +1,21 @@
 from fastapi import FastAPI, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, JSONResponse
-import models, database, auth
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse
+import models, database, auth, instrumentation
 from routers import auth as auth_router
 from routers import finance as finance_router
 from routers import recurring as recurring_router
+from services import rollup, ledger, scheduler
+import asyncio
 from collections import defaultdict
 from datetime import datetime, timedelta
+import logging
+import os
+import time
+
+# Logi aplikacji (loggery "budzet.*"): domyślnie tylko ostrzeżenia, diagnostyka przez LOG_LEVEL=DEBUG
+logging.basicConfig(format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+logging.getLogger("budzet").setLevel(os.getenv("LOG_LEVEL", "WARNING").upper())
 
 # Prosta implementacja rate limiting
 login_attempts = defaultdict(list)
@@ -47,6 +56,23 @@ async def rate_limit_middleware(request: Request, call_next):
     
     response = await call_next(request)
     return response
+
+# Instrumentacja: czas żądania, liczba i czas zapytań SQL per trasa (/metrics)
+@app.middleware("http")
+async def metrics_middleware(request: Request, call_next):
+    stats, token = instrumentation.start_request(request.url.path)
+    start = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        # Szablon trasy (np. /api/goals/{goal_id}) zamiast ścieżki - stała liczba serii
+        route = request.scope.get("route")
+        stats.route = route.path if route is not None else "nieznana"
+        instrumentation.observe_request(request.method, stats, status_code, time.perf_counter() - start)
+        instrumentation.end_request(token)
     
     # Security Headers Middleware
 @app.middleware("http")
@@ -93,6 +119,42 @@ def create_default_user():
         db.commit()
     db.close()
 
+# Agregaty okresów (period_rollups) - przebudowa, jeśli tabela jest pusta
+@app.on_event("startup")
+def build_period_rollups():
+    db = database.SessionLocal()
+    try:
+        rollup.ensure_built(db)
+    finally:
+        db.close()
+
+# Snapshot sald na koniec wczorajszego dnia (jeśli jeszcze go nie ma)
+@app.on_event("startup")
+def snapshot_balances():
+    db = database.SessionLocal()
+    try:
+        yesterday = datetime.now().date() - timedelta(days=1)
+        if not db.query(models.BalanceSnapshot.id).filter(models.BalanceSnapshot.date == yesterday).first():
+            ledger.take_snapshots(db, yesterday)
+            db.commit()
+    finally:
+        db.close()
+
+# Harmonogram zadań dziennych w procesie aplikacji (płatności cykliczne, realizacja planowanych, snapshoty)
+# Przy kilku workerach uvicorna lepiej osobny proces: python worker.py
+_scheduler_task = None
+
+@app.on_event("startup")
+async def start_scheduler():
+    global _scheduler_task
+    if os.getenv("SCHEDULER_ENABLED", "0") == "1":
+        _scheduler_task = asyncio.create_task(scheduler.run_forever())
+
+@app.on_event("shutdown")
+async def stop_scheduler():
+    if _scheduler_task is not None:
+        _scheduler_task.cancel()
+
 # Pliki statyczne (Frontend)
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
@@ -100,6 +162,15 @@ app.mount("/static", StaticFiles(directory="static"), name="static")
 async def read_index():
     return FileResponse('static/index.html')
 
+# Metryki Prometheusa - tylko z METRICS_TOKEN (nagłówek Authorization: Bearer <token>)
+@app.get("/metrics", include_in_schema=False)
+def metrics(request: Request):
+    if not instrumentation.METRICS_TOKEN:
+        return JSONResponse(status_code=404, content={"detail": "Not Found"})
+    if request.headers.get("authorization") != f"Bearer {instrumentation.METRICS_TOKEN}":
+        return JSONResponse(status_code=401, content={"detail": "Brak dostępu"})
+    return PlainTextResponse(instrumentation.render_metrics(), media_type="text/plain; version=0.0.4")
+
 @app.get("/sw.js")
 async def service_worker():
     return FileResponse('static/sw.js', media_type='application/javascript')
@@ -1,7 +1,7 @@
-from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey, DECIMAL, Boolean
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, ForeignKey, DECIMAL, Boolean, Index
 from sqlalchemy.orm import relationship
 from database import Base
-from datetime import date
+from datetime import date, datetime
 
 class Account(Base):
     __tablename__ = "accounts"
@@ -29,6 +29,7 @@ class Loan(Base):
     remaining_amount = Column(DECIMAL(10, 2))
     monthly_payment = Column(DECIMAL(10, 2))
     next_payment_date = Column(Date)
+    interest_rate = Column(DECIMAL(6, 3), default=0)  # Oprocentowanie roczne w % (projekcja spłaty)
 
 class Goal(Base):
     __tablename__ = "goals"
@@ -49,6 +50,11 @@ class GoalContribution(Base):
     
     goal = relationship("Goal")
 
+    __table_args__ = (
+        # Wpłaty celu w okresie rozliczeniowym (monthly_need)
+        Index("ix_goal_contributions_goal_date", "goal_id", "date"),
+    )
+
 class Transaction(Base):
     __tablename__ = "transactions"
     id = Column(Integer, primary_key=True, index=True)
@@ -68,6 +74,20 @@ class Transaction(Base):
     category = relationship("Category")
     loan = relationship("Loan")
 
+    __table_args__ = (
+        # Dashboard / trend: sumy po typie i statusie w oknie dat
+        Index("ix_transactions_type_status_date", "type", "status", "date"),
+        # Historia i wyszukiwanie per konto (również jako konto docelowe transferu)
+        Index("ix_transactions_account_date", "account_id", "date"),
+        Index("ix_transactions_target_account_date", "target_account_id", "date"),
+        # Trend kategorii i limity budżetów
+        Index("ix_transactions_category_type_status_date", "category_id", "type", "status", "date"),
+        # Alerty kredytów: planowane raty per kredyt
+        Index("ix_transactions_loan_status_date", "loan_id", "status", "date"),
+        # Wyszukiwanie po opisie i auto-kategoryzacja importu (MySQL FULLTEXT)
+        Index("ix_transactions_description_ft", "description", mysql_prefix="FULLTEXT"),
+    )
+
 class PaydayOverride(Base):
     __tablename__ = "payday_overrides"
     id = Column(Integer, primary_key=True, index=True)
@@ -95,3 +115,54 @@ class RecurringTransaction(Base):
     
     category = relationship("Category")
     account = relationship("Account")
+
+# Sumy transakcji per okres rozliczeniowy - utrzymywane przyrostowo przez services/rollup.py
+class PeriodRollup(Base):
+    __tablename__ = "period_rollups"
+    id = Column(Integer, primary_key=True, index=True)
+    period_start = Column(Date)  # Data wypłaty rozpoczynająca okres
+    category_id = Column(Integer, nullable=True)
+    type = Column(String(20))
+    status = Column(String(20))
+    account_id = Column(Integer, nullable=True)
+    total = Column(DECIMAL(12, 2), default=0)
+    tx_count = Column(Integer, default=0)
+
+    __table_args__ = (
+        Index("ix_period_rollups_key", "period_start", "category_id", "type", "status", "account_id"),
+        Index("ix_period_rollups_category_period", "category_id", "period_start"),
+    )
+
+# Dziennik zmian sald (append-only) - każda zmiana Account.balance zostawia tu swoją deltę
+class BalanceEntry(Base):
+    __tablename__ = "balance_entries"
+    id = Column(Integer, primary_key=True, index=True)
+    account_id = Column(Integer)
+    delta = Column(DECIMAL(12, 2))
+    date = Column(Date)  # Data księgowa (data transakcji)
+    kind = Column(String(20), default="transaction")  # transaction / adjustment / reconcile
+    transaction_id = Column(Integer, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_balance_entries_account_date", "account_id", "date"),
+    )
+
+# Saldo konta na koniec dnia - punkt startowy dla salda historycznego
+class BalanceSnapshot(Base):
+    __tablename__ = "balance_snapshots"
+    id = Column(Integer, primary_key=True, index=True)
+    account_id = Column(Integer)
+    date = Column(Date)
+    balance = Column(DECIMAL(12, 2))
+
+    __table_args__ = (
+        Index("ix_balance_snapshots_account_date", "account_id", "date"),
+    )
+
+# Wersja danych (jeden wiersz, id = 1) - wspólna dla wszystkich procesów, podbijana przy każdym
+# zapisującym COMMIT; unieważnia cache odpowiedzi i indeksy w pamięci (response_cache.py)
+class DataVersion(Base):
+    __tablename__ = "data_versions"
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, default=0, nullable=False)
@@ -0,0 +1,45 @@
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from typing import Annotated
+from pydantic import BeforeValidator, PlainSerializer
+
+# --- KWOTY PIENIĘŻNE ---
+# Kwoty w całej aplikacji to Decimal z dokładnością do grosza (jak kolumny DECIMAL w bazie).
+# Float pojawia się wyłącznie na granicy JSON (frontend liczy na liczbach).
+CENT = Decimal("0.01")
+ZERO = Decimal("0.00")
+
+def to_money(value) -> Decimal:
+    """Decimal zaokrąglony do grosza. Float przez repr (najkrótszy zapis), żeby 0.1 nie stało się 0.1000000000000000055..."""
+    if value is None: return ZERO
+    if isinstance(value, float): value = Decimal(float.__repr__(value))  # także np.float64
+    elif not isinstance(value, Decimal): value = Decimal(str(value).strip())
+    if not value.is_finite(): raise InvalidOperation(f"Kwota nieskończona: {value}")
+    return value.quantize(CENT, rounding=ROUND_HALF_UP)
+
+def _validate_money(value) -> Decimal:
+    """Walidator pól Money: błędna lub nieskończona kwota -> ValueError (422), null nie staje się zerem."""
+    if value is None: raise ValueError("Kwota jest wymagana")
+    if isinstance(value, bool): raise ValueError("Nieprawidłowa kwota")
+    try:
+        money = to_money(value)
+    except (InvalidOperation, ValueError, TypeError):
+        raise ValueError(f"Nieprawidłowa kwota: {value!r}")
+    return money
+
+def money_sum(values) -> Decimal:
+    """Suma kwot (None pomijane) - bez pośrednich floatów."""
+    total = ZERO
+    for value in values:
+        if value is not None: total += to_money(value)
+    return total
+
+def to_json(value) -> float:
+    return float(to_money(value))
+
+def json_default(obj):
+    """`default=` dla json.dumps (strumień NDJSON podglądu importu)."""
+    if isinstance(obj, Decimal): return float(obj)
+    raise TypeError(f"Nieobsługiwany typ: {type(obj).__name__}")
+
+# Typ pól w schemas.py: wejście (liczba/tekst) -> Decimal do grosza, wyjście JSON -> liczba
+Money = Annotated[Decimal, BeforeValidator(_validate_money), PlainSerializer(to_json, return_type=float, when_used="json")]
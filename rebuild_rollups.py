@@ -0,0 +1,24 @@
+import sys
+import os
+
+sys.path.append(os.getcwd())
+
+from database import SessionLocal
+from services import rollup
+
+def rebuild_rollups():
+    db = SessionLocal()
+    try:
+        print("--- PRZEBUDOWA period_rollups ---")
+        count = rollup.rebuild(db)
+        db.commit()
+        print(f"✅ Zapisano {count} agregatów")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ BŁĄD: {e}")
+        raise
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    rebuild_rollups()
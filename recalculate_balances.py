@@ -1,72 +1,37 @@
-from sqlalchemy.orm import Session
+import sys
+import os
+import time
+sys.path.append(os.getcwd())
+
 from database import SessionLocal
-import models
+from services import reconcile
 
-def recalculate_balances():
+# Weryfikacja sald wszystkich kont jednym zapytaniem (bez --fix tylko raport)
+# Użycie: python recalculate_balances.py [--fix]
+def recalculate_balances(fix: bool = False):
     db = SessionLocal()
-    
-    # Dla każdego konta
-    accounts = db.query(models.Account).all()
-    
-    for acc in accounts:
-        print(f"\n🔍 Przeliczam konto: {acc.name}")
-        print(f"   Obecne saldo: {acc.balance}")
-        
-        # Suma przychodów (income na to konto)
-        income = db.query(models.Transaction).filter(
-            models.Transaction.account_id == acc.id,
-            models.Transaction.type == 'income',
-            models.Transaction.status == 'zrealizowana'
-        ).all()
-        
-        income_sum = sum(float(t.amount) for t in income)
-        
-        # Suma wydatków (expense z tego konta)
-        expenses = db.query(models.Transaction).filter(
-            models.Transaction.account_id == acc.id,
-            models.Transaction.type == 'expense',
-            models.Transaction.status == 'zrealizowana'
-        ).all()
-        
-        expense_sum = sum(float(t.amount) for t in expenses)
-        
-        # Transfery wychodzące (z tego konta)
-        transfers_out = db.query(models.Transaction).filter(
-            models.Transaction.account_id == acc.id,
-            models.Transaction.type == 'transfer',
-            models.Transaction.status == 'zrealizowana'
-        ).all()
-        
-        transfers_out_sum = sum(float(t.amount) for t in transfers_out)
-        
-        # Transfery przychodzące (na to konto)
-        transfers_in = db.query(models.Transaction).filter(
-            models.Transaction.target_account_id == acc.id,
-            models.Transaction.type == 'transfer',
-            models.Transaction.status == 'zrealizowana'
-        ).all()
-        
-        transfers_in_sum = sum(float(t.amount) for t in transfers_in)
-        
-        # Oblicz prawidłowe saldo
-        correct_balance = income_sum - expense_sum - transfers_out_sum + transfers_in_sum
-        
-        print(f"   Przychody: +{income_sum}")
-        print(f"   Wydatki: -{expense_sum}")
-        print(f"   Transfery OUT: -{transfers_out_sum}")
-        print(f"   Transfery IN: +{transfers_in_sum}")
-        print(f"   PRAWIDŁOWE saldo: {correct_balance}")
-        
-        if abs(float(acc.balance) - correct_balance) > 0.01:
-            print(f"   ⚠️  RÓŻNICA: {float(acc.balance) - correct_balance:.2f} zł")
-            print(f"   🔧 POPRAWIAM...")
-            acc.balance = correct_balance
-        else:
-            print(f"   ✅ Saldo poprawne")
-    
-    db.commit()
-    db.close()
-    print("\n✅ Przeliczenie zakończone!")
+    try:
+        start = time.perf_counter()
+        report = reconcile.check(db)
+        elapsed = (time.perf_counter() - start) * 1000
+
+        for row in report:
+            if row["ok"]:
+                print(f"✅ {row['name']}: {row['balance']} zł")
+            else:
+                print(f"⚠️  {row['name']}: saldo {row['balance']} zł, oczekiwane {row['expected']} zł, RÓŻNICA {row['drift']} zł")
+
+        drifting = sum(1 for row in report if not row["ok"])
+        print(f"\n🔍 Sprawdzono {len(report)} kont w {elapsed:.1f} ms, rozbieżności: {drifting}")
+
+        if fix and drifting:
+            fixed = reconcile.repair(db, report)
+            db.commit()
+            print(f"🔧 Poprawiono {fixed} kont (wpisy 'reconcile' w dzienniku sald)")
+        elif drifting:
+            print("ℹ️  Uruchom z --fix, aby poprawić salda")
+    finally:
+        db.close()
 
 if __name__ == "__main__":
-    recalculate_balances()
+    recalculate_balances(fix="--fix" in sys.argv)
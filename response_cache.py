@@ -0,0 +1,86 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from datetime import date
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+# --- CACHE ODPOWIEDZI (ETag) ---
+# Wersja danych to licznik w tabeli data_versions, wspólny dla wszystkich procesów (kilka workerów
+# uvicorna, worker.py). Każda transakcja, która coś zapisała (INSERT/UPDATE/DELETE - ORM, bulk
+# i Core), podbija go tuż przed COMMIT, w tej samej transakcji. Wpis cache jest ważny tylko
+# dla wersji, przy której powstał - odczyt wersji to jedno zapytanie po kluczu głównym.
+MAX_ENTRIES = 256
+
+_lock = threading.Lock()
+_entries = OrderedDict()  # klucz -> (wersja, etag, body)
+
+_WRITES = ("INSERT", "UPDATE", "DELETE", "REPLACE")
+
+def data_version(db: Session) -> int:
+    return db.execute(text("SELECT version FROM data_versions WHERE id = 1")).scalar() or 0
+
+def clear():
+    with _lock:
+        _entries.clear()
+
+# Nasłuch na klasie Engine - obejmuje wszystkie silniki (aplikacja, skrypty, benchmarki)
+@event.listens_for(Engine, "before_cursor_execute")
+def _mark_write(conn, cursor, statement, parameters, context, executemany):
+    if statement.lstrip()[:7].upper().startswith(_WRITES) and "data_versions" not in statement:
+        conn.info["data_changed"] = True
+
+@event.listens_for(Engine, "commit")
+def _bump_on_commit(conn):
+    if not conn.info.pop("data_changed", False): return
+    # Kursor DBAPI bezpośrednio: zdarzenie commit jest wewnątrz zatwierdzania transakcji SQLAlchemy
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        cursor.execute("UPDATE data_versions SET version = version + 1 WHERE id = 1")
+        if cursor.rowcount == 0:
+            cursor.execute("INSERT INTO data_versions (id, version) VALUES (1, 1)")
+    finally:
+        cursor.close()
+
+@event.listens_for(Engine, "rollback")
+def _forget_on_rollback(conn):
+    conn.info.pop("data_changed", None)
+
+def _render(content) -> bytes:
+    # Ten sam format co domyślny JSONResponse FastAPI
+    return json.dumps(jsonable_encoder(content), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+def cached_json(request: Request, db: Session, builder) -> Response:
+    """
+    Zwraca odpowiedź z cache (klucz: ścieżka + parametry + dzisiejsza data) albo buduje ją
+    przez `builder()`. Klient z aktualnym If-None-Match dostaje 304 bez body.
+    """
+    key = (request.url.path, tuple(sorted(request.query_params.multi_items())), date.today().isoformat())
+    version = data_version(db)  # Wersja sprzed budowania - zapis w trakcie da nowszą wersję
+
+    with _lock:
+        entry = _entries.get(key)
+        if entry and entry[0] == version:
+            _entries.move_to_end(key)
+        else:
+            entry = None
+
+    if entry is None:
+        body = _render(builder())
+        etag = '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+        entry = (version, etag, body)
+        with _lock:
+            _entries[key] = entry
+            while len(_entries) > MAX_ENTRIES:
+                _entries.popitem(last=False)
+
+    _, etag, body = entry
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -30,12 +30,16 @@ def create_user(user: schemas.UserCreate, db: Session = Depends(database.get_db)
     new_user = models.User(username=user.username, hashed_password=hashed_pwd)
     db.add(new_user)
     db.commit()
+    database.invalidate_principals(user.username)
     return {"status": "created", "user": user.username}
 
 @router.post("/api/users/change-password")
 def change_password(pwd: schemas.PasswordChange, db: Session = Depends(database.get_db), current_user: models.User = Depends(database.get_current_user)):
-    if not auth.verify_password(pwd.old_password, current_user.hashed_password):
+    # current_user może pochodzić z cache principali (odłączony od sesji) - zmieniamy rekord z bazy
+    user = db.query(models.User).filter(models.User.id == current_user.id).first()
+    if not user or not auth.verify_password(pwd.old_password, user.hashed_password):
         raise HTTPException(status_code=400, detail="Stare hasło jest nieprawidłowe")
-    current_user.hashed_password = auth.get_password_hash(pwd.new_password)
+    user.hashed_password = auth.get_password_hash(pwd.new_password)
     db.commit()
+    database.invalidate_principals(user.username)
     return {"status": "password_changed"}
@@ -1,18 +1,44 @@
 ### routers/finance.py
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from datetime import date, timedelta
+from decimal import Decimal
 from typing import Optional
-import database, models, schemas, utils
-from services import dashboard, transaction, goal as goal_service, bank_import
+import logging
+import database, models, schemas, utils, response_cache
+from money import to_money, ZERO
+from services import dashboard, transaction, goal as goal_service, bank_import, categorizer, rollup, import_jobs, ledger, reconcile, loan_projection
+
+logger = logging.getLogger("budzet.loans")  # Diagnostyka alertów - poziom DEBUG, domyślnie wyłączona
 
 router = APIRouter(prefix="/api", tags=["Finance"])
 
 # --- IMPORT CSV ---
 @router.post("/import/preview")
-async def preview_import(file: UploadFile = File(...), db: Session = Depends(database.get_db), current_user: models.User = Depends(database.get_current_user)):
-    return await bank_import.parse_bank_csv(db, file)
+async def preview_import(file: UploadFile = File(...), current_user: models.User = Depends(database.get_current_user)):
+    # Parsowanie i zapytania do bazy poza pętlą zdarzeń (pula wątków)
+    return await database.run_service(bank_import.parse_bank_csv, file.file)
+
+@router.post("/import/preview/jobs")
+def start_preview_job(file: UploadFile = File(...), current_user: models.User = Depends(database.get_current_user)):
+    return {"job_id": import_jobs.submit_preview(file.file)}
+
+@router.get("/import/jobs/{job_id}")
+def get_preview_job(job_id: str, current_user: models.User = Depends(database.get_current_user)):
+    return import_jobs.get_status(job_id)
+
+@router.get("/import/jobs/{job_id}/result")
+def get_preview_job_result(job_id: str, current_user: models.User = Depends(database.get_current_user)):
+    return import_jobs.get_result(job_id)
+
+@router.post("/import/preview/stream")
+def preview_import_stream(file: UploadFile = File(...), db: Session = Depends(database.get_db), current_user: models.User = Depends(database.get_current_user)):
+    # Nagłówek i klasyfikator przygotowane przed startem odpowiedzi - błędy wracają jako zwykłe 400
+    columns, rows = bank_import.open_bank_csv(file.file)
+    keyword_index = categorizer.get_keyword_index(db)
+    return StreamingResponse(bank_import.iter_preview_ndjson(rows, columns, keyword_index), media_type="application/x-ndjson")
 
 @router.post("/import/confirm")
 def confirm_import(data: schemas.ImportConfirm, db: Session = Depends(database.get_db), current_user: models.User = Depends(database.get_current_user)):
@@ -20,20 +46,17 @@ def confirm_import(data: schemas.ImportConfirm, db: Session = Depends(database.g
 
 # --- DASHBOARD & STATS ---
 @router.get("/dashboard")
-def get_dashboard(offset: int = 0, db: Session = Depends(database.get_db), current_user: models.User = Depends(database.get_current_user)):
-    data = dashboard.get_dashboard_data(db, offset)
-    # Uzupełniamy transakcje o ikony i kolory
-    for tx in data["recent_transactions"]:
-        if tx["category_name"] and tx["category_name"] != "-" and tx["category_name"] != "Transfer":
-            cat = db.query(models.Category).filter(models.Category.name == tx["category_name"]).first()
-            if cat:
-                tx["category_icon"] = cat.icon_name
-                tx["category_color"] = cat.color
-    return data
+def get_dashboard(request: Request, offset: int = 0, db: Session = Depends(database.get_db), current_user: models.User = Depends(database.get_current_user)):
+    # Ikony i kolory kategorii dołącza serwis (z relacji joinedload)
+    return response_cache.cached_json(request, db, lambda: dashboard.get_dashboard_data(db, offset))
 
 @router.get("/stats/trend")
-def get_trend(db: Session = Depends(database.get_db), current_user: models.User = Depends(database.get_current_user)):
-    return dashboard.get_trend_data(db)
+def get_trend(request: Request, months: int = Query(6, ge=1, le=120), db: Session = Depends(database.get_db), current_user: models.User = Depends(database.get_current_user)):
+    return response_cache.cached_json(request, db, lambda: dashboard.get_trend_data(db, months))
+
+@router.get("/stats/budgets")
+def get_budgets(offset: int = 0, db: Session = Depends(database.get_db), current_user: models.User = Depends(database.get_current_user)):
+    return dashboard.get_budget_data(db, offset)
 
 # --- TRANSAKCJE ---
 @router.post("/transactions")
@@ -56,42 +79,22 @@ def search_transactions(
     q: Optional[str] = None, date_from: Optional[date] = None, date_to: Optional[date] = None,
     category_id: Optional[int] = None, account_id: Optional[int] = None, type: Optional[str] = None,
     min_amount: Optional[float] = None, max_amount: Optional[float] = None,
+    limit: Optional[int] = Query(None, ge=1, le=500), cursor: Optional[str] = None,
     db: Session = Depends(database.get_db), current_user: models.User = Depends(database.get_current_user)
 ):
-    result = transaction.search_transactions(db, q, date_from, date_to, category_id, account_id, type, min_amount, max_amount)
-    for tx in result["transactions"]:
-        if tx["category"] and tx["category"] != "-" and tx["category"] != "Transfer":
-            cat = db.query(models.Category).filter(models.Category.name == tx["category"]).first()
-            if cat:
-                tx["category_icon"] = cat.icon_name
-                tx["category_color"] = cat.color
-    return result
+    return transaction.search_transactions(db, q, date_from, date_to, category_id, account_id, type, min_amount, max_amount, limit, cursor)
 
 # --- CELE ---
 @router.get("/goals")
-def get_goals(db: Session = Depends(database.get_db), current_user: models.User = Depends(database.get_current_user)):
+def get_goals(request: Request, db: Session = Depends(database.get_db), current_user: models.User = Depends(database.get_current_user)):
+    return response_cache.cached_json(request, db, lambda: _build_goals(db))
+
+def _build_goals(db: Session):
     goals = db.query(models.Goal).filter(models.Goal.is_archived == False).all()
-    start_date, end_date = utils.get_billing_period(db, 0)
+    needs = goal_service.calculate_monthly_needs(db, goals, 0)
     result = []
     for g in goals:
-        goal_data = {"id": g.id, "name": g.name, "target_amount": float(g.target_amount), "current_amount": float(g.current_amount), "deadline": str(g.deadline), "account_id": g.account_id, "monthly_need": 0.0}
-        remaining = float(g.target_amount) - float(g.current_amount)
-        if remaining > 0:
-            cycles_left = 1; check_offset = 0
-            while True:
-                _, cycle_end = utils.get_billing_period(db, check_offset)
-                if cycle_end >= g.deadline: break
-                cycles_left += 1; check_offset += 1
-                if cycles_left > 120: break
-            contribs = db.query(func.sum(models.GoalContribution.amount)).filter(models.GoalContribution.goal_id == g.id, models.GoalContribution.date >= start_date, models.GoalContribution.date <= end_date).scalar()
-            paid_this_cycle = float(contribs) if contribs else 0.0
-            virtual_start_amount = float(g.current_amount) - paid_this_cycle
-            total_missing_at_start = float(g.target_amount) - virtual_start_amount
-            rate_per_cycle = total_missing_at_start / cycles_left
-            actual_need = rate_per_cycle - paid_this_cycle
-            if actual_need < 0: actual_need = 0.0
-            goal_data["monthly_need"] = actual_need
-        result.append(goal_data)
+        result.append({"id": g.id, "name": g.name, "target_amount": float(g.target_amount), "current_amount": float(g.current_amount), "deadline": str(g.deadline), "account_id": g.account_id, "monthly_need": needs[g.id]})
     return result
 
 @router.post("/goals")
@@ -156,120 +159,95 @@ def delete_goal(goal_id: int, db: Session = Depends(database.get_db), current_us
         raise HTTPException(status_code=500, detail=f"Błąd serwera: {str(e)}")
 
 @router.get("/loans")
-def get_loans(db: Session = Depends(database.get_db), current_user: models.User = Depends(database.get_current_user)):
-    loans = db.query(models.Loan).order_by(models.Loan.next_payment_date).all()
+def get_loans(request: Request, db: Session = Depends(database.get_db), current_user: models.User = Depends(database.get_current_user)):
+    return response_cache.cached_json(request, db, lambda: _build_loans(db))
+
+def _build_loans(db: Session):
     today = date.today()
-    
-    print(f"\n🔍 ===== GET /api/loans wywołane, dziś: {today} =====")
-    
+
+    # Kredyty z informacją, czy jest już zaplanowana przyszła rata - jedno zapytanie (LEFT JOIN)
+    planned = db.query(
+        models.Transaction.loan_id.label("loan_id"),
+        func.count(models.Transaction.id).label("planned_count")
+    ).filter(
+        models.Transaction.loan_id.isnot(None),
+        models.Transaction.status == 'planowana',
+        models.Transaction.date >= today  # Tylko przyszłe/dzisiejsze
+    ).group_by(models.Transaction.loan_id).subquery()
+
+    rows = db.query(models.Loan, planned.c.planned_count).outerjoin(
+        planned, planned.c.loan_id == models.Loan.id
+    ).order_by(models.Loan.next_payment_date).all()
+
     # Kategorie alertów
-    overdue = []      # Przeterminowane (< today)
-    urgent = []       # Pilne (0-7 dni)
-    upcoming = []     # Zbliżające się (8-30 dni)
+    alerts = {"overdue": [], "urgent": [], "upcoming": []}  # < dziś / 0-7 dni / 8-30 dni
+    totals = {"overdue": ZERO, "urgent": ZERO, "upcoming": ZERO}
     all_loans = []
-    
-    total_overdue = 0.0
-    total_urgent = 0.0
-    total_upcoming = 0.0
-    
-    for l in loans:
-        # Dodaj do listy wszystkich
+
+    for l, planned_count in rows:
         all_loans.append({
             "id": l.id,
             "name": l.name,
-            "total": float(l.total_amount),
-            "remaining": float(l.remaining_amount),
-            "monthly": float(l.monthly_payment),
-            "next_date": str(l.next_payment_date)
+            "total": l.total_amount,
+            "remaining": l.remaining_amount,
+            "monthly": l.monthly_payment,
+            "next_date": str(l.next_payment_date),
+            "interest_rate": l.interest_rate or 0
         })
-        
-        # Jeśli kredyt spłacony - pomiń alerty
-        if l.remaining_amount <= 0:
-            print(f"   ⏭️ {l.name}: spłacony (remaining=0)")
-            continue
-        
-        print(f"\n   📋 Sprawdzam kredyt: {l.name} (ID: {l.id})")
-        print(f"      Next payment: {l.next_payment_date}")
-        
-       # Sprawdź czy płatność już jest planowana (w przyszłości, bez ograniczenia do cyklu)
-        print(f"      Szukam planowanej transakcji dla loan_id={l.id}")
-
-        existing_planned = db.query(models.Transaction).filter(
-            models.Transaction.loan_id == l.id,
-            models.Transaction.status == 'planowana',
-            models.Transaction.date >= today  # Tylko przyszłe/dzisiejsze
-        ).first()
-        
-        print(f"      Szukam planowanej transakcji dla loan_id={l.id}, status='planowana'")
-        print(f"      Znaleziono: {existing_planned is not None}")
-        
-        if existing_planned:
-            print(f"      ✅ Jest planowana: '{existing_planned.description}' (data: {existing_planned.date})")
-            print(f"      ⏭️ POMIJAM ALERT")
+
+        # Spłacony albo rata już zaplanowana - bez alertu
+        if l.remaining_amount <= 0 or planned_count or not l.next_payment_date:
+            logger.debug("Kredyt %s (ID %s): pominięty (pozostało=%s, planowane=%s)", l.name, l.id, l.remaining_amount, planned_count or 0)
             continue
-        else:
-            print(f"      ⚠️ BRAK planowanej - DODAM DO ALERTÓW")
-        
-        # Oblicz dni do płatności
+
         days_until = (l.next_payment_date - today).days
-        print(f"      Dni do płatności: {days_until}")
-        
-        payment_info = {
+        if days_until < 0: level = "overdue"
+        elif days_until <= 7: level = "urgent"
+        elif days_until <= 30: level = "upcoming"
+        else:
+            logger.debug("Kredyt %s (ID %s): rata za %s dni - za daleko", l.name, l.id, days_until)
+            continue
+
+        logger.debug("Kredyt %s (ID %s): alert %s (%s dni)", l.name, l.id, level, days_until)
+        alerts[level].append({
             "loan_id": l.id,
             "name": l.name,
-            "amount": float(l.monthly_payment),
+            "amount": l.monthly_payment,
             "date": str(l.next_payment_date),
             "days_until": days_until
-        }
-        
-        # Kategoryzuj według pilności
-        if days_until < 0:
-            print(f"      🔴 OVERDUE (przeterminowane)")
-            overdue.append(payment_info)
-            total_overdue += float(l.monthly_payment)
-        elif days_until <= 7:
-            print(f"      🟡 URGENT (pilne 0-7 dni)")
-            urgent.append(payment_info)
-            total_urgent += float(l.monthly_payment)
-        elif days_until <= 30:
-            print(f"      🔵 UPCOMING (zbliżające się 8-30 dni)")
-            upcoming.append(payment_info)
-            total_upcoming += float(l.monthly_payment)
-        else:
-            print(f"      ⏭️ Za daleko ({days_until} dni) - pomijam")
-    
-    print(f"\n📊 Podsumowanie alertów:")
-    print(f"   Overdue: {len(overdue)} ({total_overdue} zł)")
-    print(f"   Urgent: {len(urgent)} ({total_urgent} zł)")
-    print(f"   Upcoming: {len(upcoming)} ({total_upcoming} zł)")
-    print(f"   has_alerts: {len(overdue) > 0 or len(urgent) > 0 or len(upcoming) > 0}")
-    print(f"===== KONIEC GET /api/loans =====\n")
-    
+        })
+        totals[level] += to_money(l.monthly_payment)
+
+    has_alerts = any(alerts.values())
+    logger.debug("Alerty kredytów: overdue=%s, urgent=%s, upcoming=%s", len(alerts["overdue"]), len(alerts["urgent"]), len(alerts["upcoming"]))
+
     return {
         "loans": all_loans,
         "alerts": {
-            "overdue": overdue,
-            "urgent": urgent,
-            "upcoming": upcoming,
-            "total_overdue": total_overdue,
-            "total_urgent": total_urgent,
-            "total_upcoming": total_upcoming,
-            "has_alerts": len(overdue) > 0 or len(urgent) > 0 or len(upcoming) > 0
+            **alerts,
+            "total_overdue": totals["overdue"],
+            "total_urgent": totals["urgent"],
+            "total_upcoming": totals["upcoming"],
+            "has_alerts": has_alerts
         }
     }
     
+@router.get("/loans/projection")
+def get_loans_projection(request: Request, schedule: bool = False, db: Session = Depends(database.get_db), current_user: models.User = Depends(database.get_current_user)):
+    return response_cache.cached_json(request, db, lambda: loan_projection.get_projections(db, schedule))
+
 @router.post("/loans")
 def create_loan(loan: schemas.LoanCreate, db: Session = Depends(database.get_db), current_user: models.User = Depends(database.get_current_user)): db_loan = models.Loan(**loan.dict()); db.add(db_loan); db.commit(); return {"status": "ok"}
 @router.put("/loans/{loan_id}")
 def update_loan(loan_id: int, loan: schemas.LoanUpdate, db: Session = Depends(database.get_db), current_user: models.User = Depends(database.get_current_user)):
     db_loan = db.query(models.Loan).filter(models.Loan.id == loan_id).first()
     if not db_loan: raise HTTPException(status_code=404)
-    db_loan.name = loan.name; db_loan.total_amount = loan.total_amount; db_loan.remaining_amount = loan.remaining_amount; db_loan.monthly_payment = loan.monthly_payment; db_loan.next_payment_date = loan.next_payment_date; db.commit(); return {"status": "updated"}
+    db_loan.name = loan.name; db_loan.total_amount = loan.total_amount; db_loan.remaining_amount = loan.remaining_amount; db_loan.monthly_payment = loan.monthly_payment; db_loan.next_payment_date = loan.next_payment_date; db_loan.interest_rate = loan.interest_rate; db.commit(); return {"status": "updated"}
 
 # --- KATEGORIE (POPRAWIONE) ---
 @router.get("/categories")
-def get_categories(db: Session = Depends(database.get_db), current_user: models.User = Depends(database.get_current_user)):
-    return db.query(models.Category).order_by(models.Category.name).all()
+def get_categories(request: Request, db: Session = Depends(database.get_db), current_user: models.User = Depends(database.get_current_user)):
+    return response_cache.cached_json(request, db, lambda: db.query(models.Category).order_by(models.Category.name).all())
 
 @router.post("/categories")
 def create_category(cat: schemas.CategoryCreate, db: Session = Depends(database.get_db), current_user: models.User = Depends(database.get_current_user)):
@@ -299,66 +277,84 @@ def add_payday_override(ov: schemas.PaydayOverrideCreate, db: Session = Depends(
     existing = db.query(models.PaydayOverride).filter(models.PaydayOverride.year == ov.year, models.PaydayOverride.month == ov.month).first()
     if existing: existing.day = ov.day
     else: db.add(models.PaydayOverride(year=ov.year, month=ov.month, day=ov.day))
-    db.commit(); return {"status": "ok"}
+    db.commit(); utils.invalidate_payday_calendar()
+    # Zmiana dnia wypłaty przesuwa granice okresów - agregaty liczone od nowa
+    rollup.rebuild(db); db.commit(); return {"status": "ok"}
 @router.delete("/settings/payday-overrides/{id}")
-def delete_payday_override(id: int, db: Session = Depends(database.get_db), current_user: models.User = Depends(database.get_current_user)): db.query(models.PaydayOverride).filter(models.PaydayOverride.id == id).delete(); db.commit(); return {"status": "deleted"}
+def delete_payday_override(id: int, db: Session = Depends(database.get_db), current_user: models.User = Depends(database.get_current_user)):
+    db.query(models.PaydayOverride).filter(models.PaydayOverride.id == id).delete(); db.commit(); utils.invalidate_payday_calendar()
+    rollup.rebuild(db); db.commit(); return {"status": "deleted"}
 @router.put("/accounts/{account_id}")
 def update_account(account_id: int, acc: schemas.AccountUpdate, db: Session = Depends(database.get_db), current_user: models.User = Depends(database.get_current_user)):
     db_acc = db.query(models.Account).filter(models.Account.id == account_id).first()
     if not db_acc: raise HTTPException(status_code=404)
-    db_acc.name = acc.name; db_acc.type = acc.type; db_acc.balance = acc.balance; db_acc.is_savings = acc.is_savings; db.commit(); return {"status": "updated"}
+    db_acc.name = acc.name; db_acc.type = acc.type; db_acc.is_savings = acc.is_savings
+    # Ręczna zmiana salda trafia do dziennika jako korekta (delta), a nie nadpisanie
+    delta = acc.balance - to_money(db_acc.balance)
+    utils.apply_balance_delta(db, account_id, delta, kind="adjustment"); db.commit(); return {"status": "updated"}
 @router.get("/accounts")
-def get_accounts(db: Session = Depends(database.get_db), current_user: models.User = Depends(database.get_current_user)):
+def get_accounts(request: Request, db: Session = Depends(database.get_db), current_user: models.User = Depends(database.get_current_user)):
+    return response_cache.cached_json(request, db, lambda: _build_accounts(db))
+
+def _build_accounts(db: Session):
     accounts = db.query(models.Account).all()
     result = []
     for acc in accounts:
-        reserved = 0.0
+        reserved = ZERO
         if acc.is_savings:
-            res_val = db.query(func.sum(models.Goal.current_amount)).filter(models.Goal.account_id == acc.id).scalar()
-            reserved = float(res_val) if res_val else 0.0
-        result.append({"id": acc.id, "name": acc.name, "type": acc.type, "balance": float(acc.balance), "is_savings": acc.is_savings, "available": float(acc.balance) - reserved})
+            reserved = to_money(db.query(func.sum(models.Goal.current_amount)).filter(models.Goal.account_id == acc.id).scalar())
+        balance = to_money(acc.balance)
+        result.append({"id": acc.id, "name": acc.name, "type": acc.type, "balance": balance, "is_savings": acc.is_savings, "available": balance - reserved})
     return result
 @router.delete("/accounts/{account_id}")
-def delete_account(account_id: int, db: Session = Depends(database.get_db), current_user: models.User = Depends(database.get_current_user)): db.query(models.Transaction).filter(models.Transaction.account_id == account_id).delete(); db.query(models.Account).filter(models.Account.id == account_id).delete(); db.commit(); return {"status": "deleted"}
+def delete_account(account_id: int, db: Session = Depends(database.get_db), current_user: models.User = Depends(database.get_current_user)): db.query(models.Transaction).filter(models.Transaction.account_id == account_id).delete(); db.query(models.Account).filter(models.Account.id == account_id).delete(); rollup.remove_account(db, account_id); ledger.remove_account(db, account_id); db.commit(); categorizer.invalidate(); return {"status": "deleted"}
 @router.post("/accounts")
-def create_account(acc: schemas.AccountUpdate, db: Session = Depends(database.get_db), current_user: models.User = Depends(database.get_current_user)): db_acc = models.Account(name=acc.name, type=acc.type, balance=acc.balance, is_savings=acc.is_savings); db.add(db_acc); db.commit(); return {"status": "ok"}
+def create_account(acc: schemas.AccountUpdate, db: Session = Depends(database.get_db), current_user: models.User = Depends(database.get_current_user)):
+    db_acc = models.Account(name=acc.name, type=acc.type, balance=0, is_savings=acc.is_savings); db.add(db_acc); db.flush()
+    utils.apply_balance_delta(db, db_acc.id, acc.balance, kind="adjustment"); db.commit(); return {"status": "ok"}
+@router.get("/accounts/{account_id}/balance")
+def get_account_balance(account_id: int, as_of: Optional[date] = Query(None, alias="date"), db: Session = Depends(database.get_db), current_user: models.User = Depends(database.get_current_user)):
+    day = as_of or date.today()
+    balance = ledger.balance_as_of(db, account_id, day)
+    if balance is None: raise HTTPException(status_code=404, detail="Konto nie istnieje")
+    return {"account_id": account_id, "date": str(day), "balance": float(balance)}
+
+# --- WERYFIKACJA SALD ---
+@router.get("/admin/balances/reconcile")
+def check_balances(db: Session = Depends(database.get_db), current_user: models.User = Depends(database.get_current_user)):
+    return reconcile.to_json(reconcile.check(db))
+@router.post("/admin/balances/reconcile")
+def reconcile_balances(repair: bool = Query(False), db: Session = Depends(database.get_db), current_user: models.User = Depends(database.get_current_user)):
+    report = reconcile.check(db)
+    fixed = reconcile.repair(db, report) if repair else 0
+    db.commit(); return {"accounts": reconcile.to_json(report), "fixed": fixed}
 
 # --- TREND KATEGORII ---
 @router.get("/categories/{cat_id}/trend")
-def get_category_trend(cat_id: int, db: Session = Depends(database.get_db), current_user: models.User = Depends(database.get_current_user)):
-    """Zwraca trend wydatków dla kategorii (ostatnie 6 miesięcy)"""
+def get_category_trend(cat_id: int, months: int = Query(6, ge=1, le=120), db: Session = Depends(database.get_db), current_user: models.User = Depends(database.get_current_user)):
+    """Zwraca trend wydatków dla kategorii (domyślnie ostatnie 6 miesięcy)"""
     
     category = db.query(models.Category).filter(models.Category.id == cat_id).first()
     if not category:
         raise HTTPException(status_code=404, detail="Kategoria nie istnieje")
     
     data = []
-    total_sum = 0.0
+    total_sum = ZERO
     months_with_data = 0
     
-    # Ostatnie 6 okresów rozliczeniowych
-    for i in range(5, -1, -1):
-        offset = -i  # -5, -4, -3, -2, -1, 0
-        start, end = utils.get_billing_period(db, offset)
-        
-        # Suma wydatków w tej kategorii w tym okresie
-        raw_sum = db.query(func.sum(models.Transaction.amount)).filter(
-            models.Transaction.category_id == cat_id,
-            models.Transaction.type == 'expense',
-            models.Transaction.status == 'zrealizowana',
-            models.Transaction.date >= start,
-            models.Transaction.date <= end
-        ).scalar()
-        
-        amount = float(raw_sum) if raw_sum is not None else 0.0
+    # Ostatnie okresy rozliczeniowe - sumy z period_rollups jednym zapytaniem
+    periods = utils.get_billing_periods(db, -(months - 1), months)
+    sums = rollup.sums_by_period(db, [start for start, _ in periods], types=('expense',), category_id=cat_id)
+    
+    for start, end in periods:
+        amount = sums.get((start, 'expense'), ZERO)
         
         if amount > 0:
             total_sum += amount
             months_with_data += 1
         
         # Label miesiąca
-        months = ["Sty", "Lut", "Mar", "Kwi", "Maj", "Cze", "Lip", "Sie", "Wrz", "Paź", "Lis", "Gru"]
-        label = f"{months[start.month - 1]}"
+        label = f"{dashboard.MONTH_LABELS[start.month - 1]}"
         
         data.append({
             "label": label,
@@ -368,15 +364,15 @@ def get_category_trend(cat_id: int, db: Session = Depends(database.get_db), curr
         })
     
     # Oblicz średnią (tylko miesiące z danymi)
-    average = total_sum / months_with_data if months_with_data > 0 else 0.0
+    average = to_money(total_sum / months_with_data) if months_with_data > 0 else ZERO
     
     # Sugestia limitu (średnia + 10% bufor)
-    suggested_limit = average * 1.1 if average > 0 else 0.0
+    suggested_limit = to_money(average * Decimal("1.1"))
     
     return {
         "category_name": category.name,
         "trend": data,
         "average": average,
         "suggested_limit": suggested_limit,
-        "current_limit": float(category.monthly_limit)
+        "current_limit": to_money(category.monthly_limit)
     }
@@ -1,7 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session, joinedload
-from datetime import date
-import database, models, schemas, utils
+from typing import Optional
+import database, models, schemas
+from services import categorizer, rollup, recurring_schedule
 from sqlalchemy import func
 
 router = APIRouter(prefix="/api/recurring", tags=["Recurring"])
@@ -30,6 +31,54 @@ def create_recurring(rec: schemas.RecurringCreate, db: Session = Depends(databas
     db.add(new_rec); db.commit()
     return {"status": "created"}
     
+# --- OPERACJE ZBIORCZE (przed trasami /{id}) ---
+@router.post("/process-batch")
+def process_recurring_batch(data: schemas.RecurringBatch, db: Session = Depends(database.get_db), current_user: models.User = Depends(database.get_current_user)):
+    return _run_batch(db, data.items, process=True)
+
+@router.post("/skip-batch")
+def skip_recurring_batch(data: schemas.RecurringBatch, db: Session = Depends(database.get_db), current_user: models.User = Depends(database.get_current_user)):
+    return _run_batch(db, data.items, process=False)
+
+def _run_batch(db: Session, items, process: bool):
+    """Wszystkie pozycje w jednej transakcji (jeden bulk insert planowanych); wynik per pozycja."""
+    try:
+        recs = {r.id: r for r in db.query(models.RecurringTransaction).filter(
+            models.RecurringTransaction.id.in_({item.id for item in items})
+        ).all()}
+        results, planned, seen = [], [], set()
+        for item in items:
+            rec = recs.get(item.id)
+            if rec is None:
+                results.append({"id": item.id, "status": "not_found"}); continue
+            if item.id in seen:
+                results.append({"id": item.id, "status": "duplicate"}); continue
+            seen.add(item.id)
+            # Brak daty: najbliższe niewykonane wystąpienie (zawsze w granicach swojego cyklu)
+            occurrence = item.date or recurring_schedule.next_occurrence(db, rec)
+            if occurrence is None:
+                results.append({"id": item.id, "status": "no_occurrence"}); continue
+            if process:
+                if recurring_schedule.already_run(db, rec, occurrence):
+                    results.append({"id": item.id, "status": "already_processed", "date": str(rec.last_run_date)}); continue
+                planned.append((rec, occurrence))
+                results.append({"id": item.id, "status": "processed", "date": str(occurrence)})
+            else:
+                rec.last_run_date = occurrence
+                results.append({"id": item.id, "status": "skipped", "date": str(rec.last_run_date)})
+
+        recurring_schedule.create_planned(db, planned)
+        db.commit()
+        if planned: categorizer.invalidate()
+        return {"results": results, "processed": len(planned), "skipped": sum(1 for r in results if r["status"] == "skipped")}
+    except HTTPException:
+        db.rollback()
+        raise
+    except Exception as e:
+        db.rollback()
+        print(f"❌ BŁĄD operacji zbiorczej na płatnościach cyklicznych: {e}")
+        raise HTTPException(status_code=500, detail=f"Błąd serwera: {str(e)}")
+
 @router.put("/{id}")
 def update_recurring(id: int, rec: schemas.RecurringCreate, db: Session = Depends(database.get_db), current_user: models.User = Depends(database.get_current_user)):
     db_rec = db.query(models.RecurringTransaction).filter(models.RecurringTransaction.id == id).first()
@@ -64,78 +113,17 @@ def delete_recurring(id: int, db: Session = Depends(database.get_db), current_us
     return {"status": "deleted"}
 
 @router.get("/check")
-def check_due_payments(db: Session = Depends(database.get_db), current_user: models.User = Depends(database.get_current_user)):
-    """Sprawdza płatności wymagalne w OBECNYM CYKLU ROZLICZENIOWYM."""
-    import calendar
-    
-    today = date.today()
-    start_date, end_date = utils.get_billing_period(db, 0)
-    
-    all_recs = db.query(models.RecurringTransaction).filter(
-        models.RecurringTransaction.is_active == True
-    ).all()
-    
-    due = []
-    
-    for r in all_recs:
-        # Ustal datę płatności dla TEGO CYKLU:
-        # Jeśli day < 25 (przed wypłatą) - płatność w kolejnym miesiącu kalendarzowym od start_date
-        # Jeśli day >= 25 (po wypłacie) - płatność w tym samym miesiącu co start_date
-        
-        payday = 25  # Dzień wypłaty (możesz pobrać z utils jeśli dynamiczny)
-        
-        if r.day_of_month < payday:
-            # Płatność PRZED wypłatą = kolejny miesiąc kalendarzowy od początku cyklu
-            base_month = start_date.month + 1
-            base_year = start_date.year
-            if base_month > 12:
-                base_month = 1
-                base_year += 1
-        else:
-            # Płatność PO wypłacie = ten sam miesiąc co początek cyklu
-            base_month = start_date.month
-            base_year = start_date.year
-        
-        try:
-            payment_date = date(base_year, base_month, r.day_of_month)
-        except ValueError:
-            # Dzień nie istnieje (np. 31 lutego)
-            last_day = calendar.monthrange(base_year, base_month)[1]
-            payment_date = date(base_year, base_month, last_day)
-        
-        # Sprawdź czy payment jest W CYKLU:
-        if not (start_date <= payment_date <= end_date):
-            continue
-        
-        # Sprawdź czy płatność jest w przedziale: dziś do +7 dni:
-        days_until = (payment_date - today).days
-
-        if days_until > 7:
-            continue  # Za daleko (>7 dni) - nie pokazuj jeszcze
-            
-        if days_until < 0:
-            continue  # Przeterminowana (minęła) - nie pokazuj już
-        
-        # Sprawdź czy była już wykonana W TYM CYKLU:
-        if r.last_run_date and r.last_run_date >= start_date:
-            continue
-        
-        due.append({
-            "id": r.id,
-            "name": r.name,
-            "amount": float(r.amount),
-            "category": r.category.name if r.category else "Inne",
-            "account_id": r.account_id,
-            "payment_date": str(payment_date),
-            "days_until": days_until  # NOWE
-        })
-    
-    return due
+def check_due_payments(days: int = Query(7, ge=0, le=recurring_schedule.HORIZON_DAYS), db: Session = Depends(database.get_db), current_user: models.User = Depends(database.get_current_user)):
+    """Płatności wymagalne od dziś do +`days` dni (nie wykonane jeszcze w swoim cyklu rozliczeniowym)."""
+    return recurring_schedule.due_payments(db, days)
 
 @router.post("/{id}/process")
 def process_recurring(id: int, data: schemas.RecurringExecute, db: Session = Depends(database.get_db), current_user: models.User = Depends(database.get_current_user)):
     rec = db.query(models.RecurringTransaction).filter(models.RecurringTransaction.id == id).first()
     if not rec: raise HTTPException(status_code=404)
+    # Np. zaplanowana już przez harmonogram (worker.py) - drugi raz byłby duplikatem
+    if recurring_schedule.already_run(db, rec, data.date):
+        raise HTTPException(status_code=409, detail="Płatność została już wykonana w tym cyklu")
     
     # 1. Dodaj transakcję jako PLANOWANĄ
     tx = models.Transaction(
@@ -148,19 +136,25 @@ def process_recurring(id: int, data: schemas.RecurringExecute, db: Session = Dep
         status="planowana"
     )
     db.add(tx)
+    rollup.add(db, tx)
     
     # 2. Zaktualizuj datę ostatniego wykonania
     rec.last_run_date = data.date
     db.commit()
+    categorizer.invalidate()
     return {"status": "processed"}
 
 # NOWE: Endpoint do pomijania płatności w tym miesiącu
 @router.post("/{id}/skip")
-def skip_recurring(id: int, db: Session = Depends(database.get_db), current_user: models.User = Depends(database.get_current_user)):
+def skip_recurring(id: int, data: Optional[schemas.RecurringSkip] = None, db: Session = Depends(database.get_db), current_user: models.User = Depends(database.get_current_user)):
     rec = db.query(models.RecurringTransaction).filter(models.RecurringTransaction.id == id).first()
     if not rec: raise HTTPException(status_code=404)
     
-    # Tylko aktualizujemy datę, nie tworzymy transakcji
-    rec.last_run_date = date.today()
+    # Tylko aktualizujemy datę, nie tworzymy transakcji. Data wystąpienia (a nie dziś), żeby
+    # pominięta płatność z kolejnego cyklu zniknęła z /check.
+    skip_date = (data.date if data else None) or recurring_schedule.next_occurrence(db, rec)
+    if skip_date is None:
+        raise HTTPException(status_code=409, detail="Brak niewykonanej płatności do pominięcia")
+    rec.last_run_date = skip_date
     db.commit()
-    return {"status": "skipped"}
+    return {"status": "skipped", "date": str(skip_date)}
@@ -1,6 +1,9 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List
+import datetime
 from datetime import date
+from decimal import Decimal
+from money import Money, ZERO
 
 # --- DTO (Data Transfer Objects) ---
 
@@ -13,7 +16,7 @@ class PasswordChange(BaseModel):
     new_password: str
 
 class TransactionCreate(BaseModel):
-    amount: float
+    amount: Money
     description: str
     date: date
     type: str
@@ -26,22 +29,24 @@ class TransactionCreate(BaseModel):
 class AccountUpdate(BaseModel):
     name: str
     type: str
-    balance: float
+    balance: Money
     is_savings: bool = False
 
 class LoanCreate(BaseModel):
     name: str
-    total_amount: float
-    remaining_amount: float
-    monthly_payment: float
+    total_amount: Money
+    remaining_amount: Money
+    monthly_payment: Money
     next_payment_date: date
+    interest_rate: Decimal = Field(Decimal("0"), ge=0, lt=1000)  # % rocznie (DECIMAL(6,3))
 
 class LoanUpdate(BaseModel):
     name: str
-    total_amount: float
-    remaining_amount: float
-    monthly_payment: float
+    total_amount: Money
+    remaining_amount: Money
+    monthly_payment: Money
     next_payment_date: date
+    interest_rate: Decimal = Field(Decimal("0"), ge=0, lt=1000)  # % rocznie (DECIMAL(6,3))
 
 class PaydayOverrideCreate(BaseModel):
     year: int
@@ -50,13 +55,13 @@ class PaydayOverrideCreate(BaseModel):
 
 class CategoryCreate(BaseModel):
     name: str
-    monthly_limit: float = 0.0
+    monthly_limit: Money = ZERO
     icon: str = "tag"       # Domyślna ikona
     color: str = "#94a3b8"  # Domyślny kolor
     
 class RecurringCreate(BaseModel):
     name: str
-    amount: float
+    amount: Money
     day_of_month: int
     category_name: str
     account_id: int
@@ -64,28 +69,39 @@ class RecurringCreate(BaseModel):
 class RecurringExecute(BaseModel):
     date: date
 
+class RecurringSkip(BaseModel):
+    date: Optional[datetime.date] = None  # Brak daty: najbliższe niewykonane wystąpienie
+
+class RecurringBatchItem(BaseModel):
+    id: int
+    # datetime.date, bo przy domyślnej wartości nazwa pola `date` przesłania typ w adnotacji
+    date: Optional[datetime.date] = None  # Brak daty: najbliższe niewykonane wystąpienie
+
+class RecurringBatch(BaseModel):
+    items: List[RecurringBatchItem]
+
 class GoalCreate(BaseModel):
     name: str
-    target_amount: float
+    target_amount: Money
     deadline: date
     account_id: int
 
 class GoalFund(BaseModel):
-    amount: float
+    amount: Money
     source_account_id: int
     target_savings_id: Optional[int] = None
 
 class GoalTransfer(BaseModel):
-    amount: float
+    amount: Money
     target_goal_id: int
     
 class GoalWithdraw(BaseModel):
-    amount: float
+    amount: Money
     target_account_id: int
     
 class GoalUpdate(BaseModel):
     name: str
-    target_amount: float
+    target_amount: Money
     deadline: date
     account_id: int
 
@@ -93,7 +109,7 @@ class GoalUpdate(BaseModel):
 class TransactionImport(BaseModel):
     date: date
     description: str
-    amount: float
+    amount: Money
     type: str
     category_id: Optional[int] = None
     ignore: bool = False
@@ -1,22 +1,31 @@
-import io
+import codecs
+import csv
+import itertools
+import json
+import logging
 import re
 from datetime import datetime
+from decimal import Decimal, InvalidOperation
 from typing import Tuple, Optional, List
 from sqlalchemy.orm import Session
-from fastapi import UploadFile, HTTPException
+from fastapi import HTTPException
 import models, schemas
+from money import to_money, json_default, ZERO
 import utils
+from services import description_search, categorizer, rollup
 
-def normalize_amount(value: str) -> float:
+logger = logging.getLogger("budzet.import")
+
+def normalize_amount(value: str) -> Decimal:
     """
     Parsuje kwotę z różnych formatów ING:
     - "-157 99" (spacja/tab między zł a gr)
     - "-157,99" (przecinek)
     - "-157.99" (kropka)
-    Zwraca float z ZACHOWANIEM ZNAKU (+ lub -)
+    Zwraca Decimal (do grosza) z ZACHOWANIEM ZNAKU (+ lub -)
     """
     if not value:
-        return 0.0
+        return ZERO
     
     # 1. Usuń śmieci
     val = value.replace('PLN', '').replace('EUR', '').strip()
@@ -39,14 +48,14 @@ def normalize_amount(value: str) -> float:
     val = val.replace(',', '.')
     
     try:
-        result = float(val)
+        result = to_money(val)
         # Przywróć znak minus jeśli był
         return -result if is_negative else result
-    except ValueError:
-        print(f"⚠️ WARNING: Nie można sparsować kwoty: '{value}'")
-        return 0.0
+    except InvalidOperation:
+        logger.warning("Nie można sparsować kwoty: %r", value)
+        return ZERO
 
-def auto_categorize(db: Session, description: str, amount: float) -> Tuple[Optional[int], str]:
+def auto_categorize(db: Session, description: str, amount: Decimal) -> Tuple[Optional[int], str]:
     """
     Auto-kategoryzacja na podstawie historii.
     TYP (income/expense) jest ZAWSZE określany przez ZNAK kwoty z CSV!
@@ -61,7 +70,7 @@ def auto_categorize(db: Session, description: str, amount: float) -> Tuple[Optio
 
     keyword = words[0]
     similar_tx = db.query(models.Transaction)\
-        .filter(models.Transaction.description.ilike(f"%{keyword}%"))\
+        .filter(description_search.description_filter(db, keyword, words=True))\
         .filter(models.Transaction.category_id.isnot(None))\
         .order_by(models.Transaction.date.desc())\
         .first()
@@ -73,143 +82,180 @@ def auto_categorize(db: Session, description: str, amount: float) -> Tuple[Optio
     
     return None, tx_type
 
-async def parse_bank_csv(db: Session, file: UploadFile):
-    content = await file.read()
-    
-    # 1. Wykrywanie kodowania
-    text = ""
+# --- PARSOWANIE STRUMIENIOWE ---
+CHUNK_SIZE = 64 * 1024        # Porcja czytana z pliku
+PREVIEW_BATCH_SIZE = 200      # Wierszy na partię podglądu
+HEADER_SCAN_ROWS = 100        # Nagłówek ING jest zawsze na początku pliku
+
+def _detect_encoding(prefix: bytes) -> str:
+    """Kodowanie wykrywane na początku pliku (ta sama kolejność prób co wcześniej dla całości)"""
     for enc in ['cp1250', 'utf-8', 'latin-1']:
         try:
-            text = content.decode(enc)
-            break
+            codecs.getincrementaldecoder(enc)().decode(prefix, final=False)
+            return enc
         except UnicodeDecodeError:
             continue
-            
-    if not text:
-        raise HTTPException(status_code=400, detail="Nieznane kodowanie pliku")
+    raise HTTPException(status_code=400, detail="Nieznane kodowanie pliku")
 
-    lines = text.splitlines()
-    
-    # 2. Szukanie nagłówka
-    header_row_idx = -1
-    for i, line in enumerate(lines):
+def _iter_text_lines(fileobj):
+    """Czyta plik porcjami i zwraca kolejne linie tekstu - pamięć stała niezależnie od rozmiaru"""
+    chunk = fileobj.read(CHUNK_SIZE)
+    decoder = codecs.getincrementaldecoder(_detect_encoding(chunk))(errors="replace")
+    pending = ""
+    while chunk:
+        pending += decoder.decode(chunk)
+        lines = pending.splitlines(keepends=True)
+        pending = lines.pop() if lines and not lines[-1].endswith(("\n", "\r")) else ""
+        yield from lines
+        chunk = fileobj.read(CHUNK_SIZE)
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+def _clean_row(row):
+    return [r.strip().strip('"').strip("'") for r in row]
+
+def open_bank_csv(fileobj):
+    """
+    Szuka nagłówka i mapuje kolumny. Zwraca (kolumny, iterator wierszy danych).
+    Błędy nagłówka zgłaszane od razu (HTTPException), zanim ruszy przetwarzanie wierszy.
+    """
+    rows = csv.reader(_iter_text_lines(fileobj), delimiter=';', quotechar='"')
+
+    # 1. Szukanie nagłówka (w pierwszych HEADER_SCAN_ROWS wierszach)
+    scanned = []
+    headers = None
+    for row in rows:
+        scanned.append(row)
+        line = ";".join(row)
         if "Data transakcji" in line or "Data operacji" in line:
-            header_row_idx = i
+            headers = row
             break
-    
+        if len(scanned) >= HEADER_SCAN_ROWS:
+            break
+
     # Fallback
-    if header_row_idx == -1:
-        for i, line in enumerate(lines):
+    if headers is None:
+        for idx, row in enumerate(scanned):
+            line = ";".join(row)
             if "Data" in line and "Kwota" in line:
-                header_row_idx = i
+                headers = row
+                # Wiersze po nagłówku, które już przeczytaliśmy, wracają do strumienia
+                rows = itertools.chain(scanned[idx + 1:], rows)
                 break
 
-    if header_row_idx == -1:
+    if headers is None:
         raise HTTPException(status_code=400, detail="Nie znaleziono nagłówka 'Data transakcji'")
 
-    # 3. Parsowanie nagłówka
-    header_line = lines[header_row_idx]
-    clean_header = header_line.replace('"', '').replace("'", "")
-    headers = clean_header.split(';')
-    
-    # 4. Mapowanie kolumn (Szukamy WSZYSTKICH potencjalnych kolumn z kwotą)
-    col_date = -1
-    col_desc_1 = -1
-    col_desc_2 = -1
-    
-    # Lista priorytetowa kolumn z kwotami
-    col_amount_main = -1   # "Kwota transakcji"
-    col_amount_block = -1  # "Kwota blokady"
-    col_amount_curr = -1   # "Kwota płatności w walucie"
-    
+    # 2. Mapowanie kolumn (Szukamy WSZYSTKICH potencjalnych kolumn z kwotą)
+    headers = [h.replace('"', '').replace("'", "") for h in headers]
+    columns = {
+        "date": -1, "desc_1": -1, "desc_2": -1,
+        "amount_main": -1,   # "Kwota transakcji"
+        "amount_block": -1,  # "Kwota blokady"
+        "amount_curr": -1,   # "Kwota płatności w walucie"
+    }
+
     clean_headers = [h.strip().lower() for h in headers]
     
     for idx, h in enumerate(clean_headers):
-        if "data transakcji" in h: col_date = idx
-        elif "dane kontrahenta" in h: col_desc_1 = idx
-        elif "tytuł" in h or "tytul" in h: col_desc_2 = idx
+        if "data transakcji" in h: columns["date"] = idx
+        elif "dane kontrahenta" in h: columns["desc_1"] = idx
+        elif "tytuł" in h or "tytul" in h: columns["desc_2"] = idx
         
         # Mapowanie kwot
-        elif "kwota transakcji" in h: col_amount_main = idx
-        elif "kwota blokady" in h: col_amount_block = idx
-        elif "kwota płatności" in h: col_amount_curr = idx
-        elif "kwota" in h and col_amount_main == -1: col_amount_main = idx
+        elif "kwota transakcji" in h: columns["amount_main"] = idx
+        elif "kwota blokady" in h: columns["amount_block"] = idx
+        elif "kwota płatności" in h: columns["amount_curr"] = idx
+        elif "kwota" in h and columns["amount_main"] == -1: columns["amount_main"] = idx
         
-    if col_date == -1:
+    if columns["date"] == -1:
         raise HTTPException(status_code=400, detail=f"Nie znaleziono kolumny 'Data'. Nagłówki: {headers}")
     
     # Jeśli nie znaleziono głównej, użyjemy którejkolwiek innej jako głównej
-    if col_amount_main == -1:
-        if col_amount_block != -1: col_amount_main = col_amount_block
-        elif col_amount_curr != -1: col_amount_main = col_amount_curr
+    if columns["amount_main"] == -1:
+        if columns["amount_block"] != -1: columns["amount_main"] = columns["amount_block"]
+        elif columns["amount_curr"] != -1: columns["amount_main"] = columns["amount_curr"]
         else:
             raise HTTPException(status_code=400, detail=f"Nie znaleziono kolumny 'Kwota'. Nagłówki: {headers}")
 
-    # 5. Przetwarzanie danych
-    preview_data = []
-    errors_log = []
-    rows_processed = 0
+    return columns, rows
+
+def _parse_row(row, columns):
+    """Zamienia wiersz CSV na (data, opis, kwota ze znakiem) lub None dla wierszy technicznych"""
+    row = _clean_row(row)
+    col_date = columns["date"]
+    col_amount_main = columns["amount_main"]
+    col_amount_block = columns["amount_block"]
+    col_amount_curr = columns["amount_curr"]
+    col_desc_1 = columns["desc_1"]
+    col_desc_2 = columns["desc_2"]
+
+    # Sprawdzamy czy wiersz jest wystarczająco długi dla daty
+    if len(row) <= col_date: return None
+
+    raw_date = row[col_date].strip()
+    if not raw_date or len(raw_date) < 8: return None
+
+    # --- LOGIKA WYBORU KWOTY ---
+    raw_amount = ""
     
-    for line in lines[header_row_idx+1:]:
-        if not line.strip(): continue
+    # 1. Sprawdź główną kolumnę (Kwota transakcji)
+    if len(row) > col_amount_main and row[col_amount_main].strip():
+        raw_amount = row[col_amount_main].strip()
+    
+    # 2. Jeśli pusta, sprawdź Kwotę Blokady (dla płatności kartą)
+    if not raw_amount and col_amount_block != -1 and len(row) > col_amount_block:
+        raw_amount = row[col_amount_block].strip()
         
-        try:
-            row = line.split(';')
-            row = [r.strip().strip('"').strip("'") for r in row]
-            
-            # Sprawdzamy czy wiersz jest wystarczająco długi dla daty
-            if len(row) <= col_date: continue
+    # 3. Jeśli nadal pusta, sprawdź Kwotę w walucie
+    if not raw_amount and col_amount_curr != -1 and len(row) > col_amount_curr:
+        raw_amount = row[col_amount_curr].strip()
+    
+    # Jeśli nadal pusta, to prawdopodobnie wiersz techniczny -> pomiń
+    if not raw_amount:
+        return None
+    # ---------------------------
 
-            raw_date = row[col_date].strip()
-            if not raw_date or len(raw_date) < 8: continue
+    # Opis
+    desc_parts = []
+    if col_desc_1 != -1 and len(row) > col_desc_1: desc_parts.append(row[col_desc_1].strip())
+    if col_desc_2 != -1 and len(row) > col_desc_2: desc_parts.append(row[col_desc_2].strip())
+    description = " | ".join([p for p in desc_parts if p])
+    if not description: description = "Importowana transakcja"
 
-            # --- LOGIKA WYBORU KWOTY ---
-            raw_amount = ""
-            
-            # 1. Sprawdź główną kolumnę (Kwota transakcji)
-            if len(row) > col_amount_main and row[col_amount_main].strip():
-                raw_amount = row[col_amount_main].strip()
-            
-            # 2. Jeśli pusta, sprawdź Kwotę Blokady (dla płatności kartą)
-            if not raw_amount and col_amount_block != -1 and len(row) > col_amount_block:
-                raw_amount = row[col_amount_block].strip()
-                
-            # 3. Jeśli nadal pusta, sprawdź Kwotę w walucie
-            if not raw_amount and col_amount_curr != -1 and len(row) > col_amount_curr:
-                raw_amount = row[col_amount_curr].strip()
-            
-            # Jeśli nadal pusta, to prawdopodobnie wiersz techniczny -> pomiń
-            if not raw_amount:
-                continue
-            # ---------------------------
+    # Kwota
+    amount = normalize_amount(raw_amount)
+    
+    # Data
+    date_obj = None
+    clean_date_str = raw_date[:10]
+    for fmt in ["%Y-%m-%d", "%d.%m.%Y", "%Y.%m.%d"]:
+        try:
+            date_obj = datetime.strptime(clean_date_str, fmt).date()
+            break
+        except ValueError:
+            continue
+    
+    if not date_obj:
+        raise ValueError(f"Niepoprawny format daty '{raw_date}'")
 
-            # Opis
-            desc_parts = []
-            if col_desc_1 != -1 and len(row) > col_desc_1: desc_parts.append(row[col_desc_1].strip())
-            if col_desc_2 != -1 and len(row) > col_desc_2: desc_parts.append(row[col_desc_2].strip())
-            description = " | ".join([p for p in desc_parts if p])
-            if not description: description = "Importowana transakcja"
+    return date_obj, description, amount
 
-            # Kwota
-            amount = normalize_amount(raw_amount)
-            
-            # Data
-            date_obj = None
-            clean_date_str = raw_date[:10]
-            for fmt in ["%Y-%m-%d", "%d.%m.%Y", "%Y.%m.%d"]:
-                try:
-                    date_obj = datetime.strptime(clean_date_str, fmt).date()
-                    break
-                except ValueError:
-                    continue
-            
-            if not date_obj:
-                errors_log.append(f"Niepoprawny format daty '{raw_date}'")
-                continue
+def iter_preview_batches(rows, columns, keyword_index: dict, errors_log: list, batch_size: int = PREVIEW_BATCH_SIZE):
+    """Generator partii podglądu (już skategoryzowanych) - pierwsze wiersze dostępne przed końcem pliku"""
+    batch = []
+    for row in rows:
+        if not any(cell.strip() for cell in row): continue
+        
+        try:
+            parsed = _parse_row(row, columns)
+            if parsed is None: continue
+            date_obj, description, amount = parsed
 
-            cat_id, tx_type = auto_categorize(db, description, amount)
+            cat_id, tx_type = categorizer.categorize(keyword_index, description, amount)
 
-            preview_data.append({
+            batch.append({
                 "date": str(date_obj),
                 "description": description,
                 "amount": abs(amount),
@@ -217,12 +263,41 @@ async def parse_bank_csv(db: Session, file: UploadFile):
                 "category_id": cat_id,
                 "ignore": False
             })
-            rows_processed += 1
-            
+        except ValueError as e:
+            errors_log.append(str(e))
+            continue
         except Exception as e:
             errors_log.append(f"Błąd: {str(e)}")
             continue
 
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+
+    if batch:
+        yield batch
+
+def iter_preview_ndjson(rows, columns, keyword_index: dict):
+    """Podgląd jako NDJSON: linia {"rows": [...]} na partię, na końcu {"done": true, ...}"""
+    errors_log = []
+    count = 0
+    for batch in iter_preview_batches(rows, columns, keyword_index, errors_log):
+        count += len(batch)
+        yield json.dumps({"rows": batch}, ensure_ascii=False, default=json_default) + "\n"
+    yield json.dumps({"done": True, "count": count, "errors": errors_log[:3]}, ensure_ascii=False) + "\n"
+
+def parse_bank_csv(db: Session, fileobj):
+    """Pełny podgląd pliku (synchronicznie) - wołany przez database.run_service w puli wątków"""
+    columns, rows = open_bank_csv(fileobj)
+
+    # Klasyfikator słów kluczowych budowany raz na import (zamiast zapytania per wiersz)
+    keyword_index = categorizer.get_keyword_index(db)
+    preview_data = []
+    errors_log = []
+
+    for batch in iter_preview_batches(rows, columns, keyword_index, errors_log):
+        preview_data.extend(batch)
+
     if not preview_data:
         msg = "Nie udało się odczytać transakcji."
         if errors_log:
@@ -231,14 +306,20 @@ async def parse_bank_csv(db: Session, file: UploadFile):
 
     return preview_data
 
+def _fingerprint(tx_date, amount, description, tx_type):
+    """Klucz duplikatu - opis porównujemy jak MySQL (bez wielkości liter i spacji na końcu)"""
+    return (tx_date, to_money(amount), (description or "").lower().rstrip(), tx_type)
+
 def save_imported_transactions(db: Session, account_id: int, transactions: List[schemas.TransactionImport]):
     """Importuje transakcje z atomowym zapisem (albo wszystko, albo nic)"""
     
     count = 0
     skipped = 0
-    print(f"--- PRÓBA ZAPISU {len(transactions)} TRANSAKCJI ---")
+    logger.info("Próba zapisu %d transakcji", len(transactions))
     
     try:
+        # 1. Walidacja i normalizacja wierszy
+        candidates = []
         for tx in transactions:
             if tx.ignore:
                 continue
@@ -249,52 +330,71 @@ def save_imported_transactions(db: Session, account_id: int, transactions: List[
                 cat_id = None
             
             # Walidacja kwoty
-            amount = float(tx.amount)
+            amount = abs(tx.amount)
             
             # Walidacja daty
             tx_date = tx.date
             if isinstance(tx_date, str):
                 tx_date = datetime.strptime(tx_date, "%Y-%m-%d").date()
 
-            # Sprawdzenie duplikatu
-            existing = db.query(models.Transaction).filter(
-                models.Transaction.date == tx_date,
-                models.Transaction.amount == abs(amount),
-                models.Transaction.description == tx.description,
-                models.Transaction.account_id == account_id,
-                models.Transaction.type == tx.type
-            ).first()
-            
-            if existing:
-                print(f"⏭️  SKIP: Duplikat '{tx.description}' z {tx_date} ({abs(amount)} zł)")
+            candidates.append((tx_date, amount, tx.description, tx.type, cat_id))
+
+        if not candidates:
+            return {"imported": 0, "skipped": 0}
+
+        # 2. Istniejące odciski (data, kwota, opis, typ) z zakresu dat pliku - jednym zapytaniem
+        date_from = min(c[0] for c in candidates)
+        date_to = max(c[0] for c in candidates)
+        existing = db.query(
+            models.Transaction.date,
+            models.Transaction.amount,
+            models.Transaction.description,
+            models.Transaction.type
+        ).filter(
+            models.Transaction.account_id == account_id,
+            models.Transaction.date >= date_from,
+            models.Transaction.date <= date_to
+        ).all()
+        seen = {_fingerprint(*row) for row in existing}
+
+        # 3. Odfiltrowanie duplikatów (również w obrębie samego pliku) i zbiorczy zapis
+        new_rows = []
+        balance_deltas = {}
+        for tx_date, amount, description, tx_type, cat_id in candidates:
+            key = _fingerprint(tx_date, amount, description, tx_type)
+            if key in seen:
                 skipped += 1
                 continue
+            seen.add(key)
 
-            # Dodaj transakcję
-            new_tx = models.Transaction(
-                amount=abs(amount),
-                description=tx.description,
-                date=tx_date,
-                type=tx.type,
-                account_id=account_id,
-                category_id=cat_id,
-                status="zrealizowana"
-            )
-            
-            db.add(new_tx)
-            db.flush()  # Flush (nie commit) - dostaniemy ID
-            
-            # Aktualizacja salda
-            utils.update_balance(db, account_id, abs(amount), tx.type, None, is_reversal=False)
-            count += 1
+            new_rows.append({
+                "amount": amount,
+                "description": description,
+                "date": tx_date,
+                "type": tx_type,
+                "account_id": account_id,
+                "category_id": cat_id,
+                "status": "zrealizowana"
+            })
+            sign = 1 if tx_type == 'income' else -1 if tx_type == 'expense' else 0
+            balance_deltas[tx_date] = balance_deltas.get(tx_date, ZERO) + sign * amount
+
+        if new_rows:
+            # render_nulls: wiersze z kategorią i bez idą jednym INSERT-em wsadowym (bez podziału na grupy kluczy)
+            db.bulk_insert_mappings(models.Transaction, new_rows, render_nulls=True)
+            rollup.add_rows(db, new_rows)
+            count = len(new_rows)
+
+            # 4. Jedna zbiorcza korekta salda konta zamiast aktualizacji per wiersz (w dzienniku - wpis per dzień)
+            utils.apply_balance_deltas(db, account_id, balance_deltas)
         
         # COMMIT WSZYSTKICH transakcji naraz (atomowo)
         db.commit()
-        print(f"--- ✅ SUKCES: ZAPISANO {count} TRANSAKCJI, POMINIĘTO {skipped} DUPLIKATÓW ---")
+        categorizer.invalidate()
+        logger.info("Zapisano %d transakcji, pominięto %d duplikatów", count, skipped)
         return {"imported": count, "skipped": skipped}
         
     except Exception as e:
         db.rollback()
-        print(f"--- ❌ BŁĄD: {e} ---")
-        print(f"--- 🔄 ROLLBACK: Cofnięto wszystkie zmiany ---")
+        logger.exception("Błąd importu - cofnięto wszystkie zmiany")
         raise HTTPException(status_code=500, detail=f"Błąd importu: {str(e)}")
@@ -0,0 +1,68 @@
+import re
+import threading
+from decimal import Decimal
+from typing import Tuple, Optional
+from sqlalchemy.orm import Session
+import models, response_cache
+
+# Słownik słowo -> kategoria najnowszej transakcji zawierającej to słowo.
+# Budowany raz (jedno zapytanie po historii), trzymany w pamięci procesu między importami.
+# Ważny dla wersji danych (response_cache.data_version) - zapis w innym procesie (worker.py,
+# kolejny worker uvicorna) też go unieważnia; invalidate() czyści go od razu w tym procesie.
+_keyword_index = None  # (wersja danych, słownik)
+_index_lock = threading.Lock()
+
+def _words(description: str):
+    """Słowa opisu tak jak w auto_categorize (podział po białych znakach) + ich wersje bez interpunkcji"""
+    words = set()
+    for w in re.split(r'\s+', description.lower()):
+        if not w: continue
+        words.add(w)
+        words.update(re.findall(r"\w+", w))
+    return words
+
+def invalidate():
+    global _keyword_index
+    with _index_lock:
+        _keyword_index = None
+
+def get_keyword_index(db: Session) -> dict:
+    global _keyword_index
+    version = response_cache.data_version(db)
+    cached = _keyword_index
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    with _index_lock:
+        if _keyword_index is None or _keyword_index[0] != version:
+            index = {}
+            rows = db.query(models.Transaction.description, models.Transaction.category_id)\
+                .filter(models.Transaction.category_id.isnot(None))\
+                .order_by(models.Transaction.date, models.Transaction.id)\
+                .yield_per(1000)
+            # Rosnąco po dacie - nowsze transakcje nadpisują starsze
+            for description, category_id in rows:
+                if not description: continue
+                for w in _words(description):
+                    index[w] = category_id
+            _keyword_index = (version, index)
+        return _keyword_index[1]
+
+def categorize(index: dict, description: str, amount: Decimal) -> Tuple[Optional[int], str]:
+    """
+    Odpowiednik auto_categorize bez zapytań do bazy.
+    TYP (income/expense) zawsze ze ZNAKU kwoty, z historii bierzemy tylko KATEGORIĘ.
+    """
+    tx_type = "expense" if amount < 0 else "income"
+
+    words = [w for w in re.split(r'\s+', description) if len(w) > 3]
+    if not words:
+        return None, tx_type
+
+    keyword = words[0].lower()
+    cat_id = index.get(keyword)
+    if cat_id is None:
+        for token in re.findall(r"\w+", keyword):
+            cat_id = index.get(token)
+            if cat_id is not None: break
+
+    return cat_id, tx_type
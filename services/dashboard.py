@@ -1,99 +1,78 @@
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func
+from sqlalchemy.orm import Session, joinedload, aliased
+from sqlalchemy import func, case
 import models, utils
+from money import to_money, ZERO
+from services import goal as goal_service, rollup
 from datetime import date
 
 def get_dashboard_data(db: Session, offset: int):
     start_date, end_date = utils.get_billing_period(db, offset)
     
-    def get_sum(query_filter):
-        result = db.query(func.sum(models.Transaction.amount)).filter(query_filter).scalar()
-        return float(result) if result is not None else 0.0
+    # 1. Salda i zadłużenie - jedno zapytanie zamiast trzech
+    balances = db.query(
+        func.sum(models.Account.balance),
+        func.sum(case((models.Account.is_savings == False, models.Account.balance), else_=0)),
+        db.query(func.sum(models.Loan.remaining_amount)).scalar_subquery()
+    ).one()
+    total_balance = to_money(balances[0])
+    disposable_balance = to_money(balances[1])
+    total_debt = to_money(balances[2])
 
-    # 1. Salda
-    raw_total = db.query(func.sum(models.Account.balance)).scalar()
-    total_balance = float(raw_total) if raw_total is not None else 0.0
-    
-    raw_ror = db.query(func.sum(models.Account.balance)).filter(models.Account.is_savings == False).scalar()
-    disposable_balance = float(raw_ror) if raw_ror is not None else 0.0
-
-    raw_debt = db.query(func.sum(models.Loan.remaining_amount)).scalar()
-    total_debt = float(raw_debt) if raw_debt is not None else 0.0
-    
-    # 2. Przychody i Wydatki (Realizowane i Planowane)
-    inc_realized = get_sum((models.Transaction.type == 'income') & (models.Transaction.status == 'zrealizowana') & (models.Transaction.date >= start_date) & (models.Transaction.date <= end_date))
-    inc_planned = get_sum((models.Transaction.type == 'income') & (models.Transaction.status == 'planowana') & (models.Transaction.date >= start_date) & (models.Transaction.date <= end_date))
-    
-    exp_realized = get_sum((models.Transaction.type == 'expense') & (models.Transaction.status == 'zrealizowana') & (models.Transaction.date >= start_date) & (models.Transaction.date <= end_date))
-    exp_planned = get_sum((models.Transaction.type == 'expense') & (models.Transaction.status == 'planowana') & (models.Transaction.date >= start_date) & (models.Transaction.date <= end_date))
-
-    # 3. Prognoza ROR
-    forecast_ror = disposable_balance + inc_planned - exp_planned
-
-    # 4. Transfery na oszczędności (do wskaźnika oszczędności)
-    period_transfers = db.query(models.Transaction).options(
-        joinedload(models.Transaction.account),
-        joinedload(models.Transaction.target_account)
+    # 2. Przychody, wydatki i oszczędności - jeden przebieg GROUP BY (type, status) po oknie okresu
+    # Transfer ROR -> oszczędnościowe liczymy w tym samym skanie (złączenie z kontami źródłowym i docelowym)
+    source_acc = aliased(models.Account)
+    target_acc = aliased(models.Account)
+    is_savings_transfer = (models.Transaction.type == 'transfer') & (source_acc.is_savings == False) & (target_acc.is_savings == True)
+    rows = db.query(
+        models.Transaction.type,
+        models.Transaction.status,
+        func.sum(models.Transaction.amount),
+        func.sum(case((is_savings_transfer, models.Transaction.amount), else_=0))
+    ).outerjoin(
+        source_acc, models.Transaction.account_id == source_acc.id
+    ).outerjoin(
+        target_acc, models.Transaction.target_account_id == target_acc.id
     ).filter(
-        models.Transaction.type == 'transfer',
-        models.Transaction.status == 'zrealizowana',
         models.Transaction.date >= start_date,
         models.Transaction.date <= end_date
+    ).group_by(
+        models.Transaction.type,
+        models.Transaction.status
     ).all()
-    
-    savings_realized = 0.0
-    for t in period_transfers:
-        if t.account and not t.account.is_savings and t.target_account and t.target_account.is_savings:
-            savings_realized += float(t.amount)
 
+    totals = {}
+    savings_realized = ZERO
+    for tx_type, tx_status, amount_sum, savings_sum in rows:
+        totals[(tx_type, tx_status)] = to_money(amount_sum)
+        if tx_type == 'transfer' and tx_status == 'zrealizowana':
+            savings_realized += to_money(savings_sum)
+
+    inc_realized = totals.get(('income', 'zrealizowana'), ZERO)
+    inc_planned = totals.get(('income', 'planowana'), ZERO)
+    exp_realized = totals.get(('expense', 'zrealizowana'), ZERO)
+    exp_planned = totals.get(('expense', 'planowana'), ZERO)
+
+    # 3. Prognoza ROR
+    forecast_ror = disposable_balance + inc_planned - exp_planned
+
+    # 4. Wskaźnik oszczędności
     savings_rate = 0.0
     if inc_realized > 0:
-        savings_rate = ((inc_realized - exp_realized) / inc_realized) * 100
+        savings_rate = float((inc_realized - exp_realized) / inc_realized * 100)
 
     # 5. Cele - obliczanie monthly_need
     goals = db.query(models.Goal).filter(models.Goal.is_archived == False).all()
-    goals_monthly_need = 0.0
-    goals_total_saved = 0.0
+    goals_monthly_need = ZERO
+    goals_total_saved = ZERO
     
     for g in goals:
-        current = float(g.current_amount)
-        target = float(g.target_amount)
-        goals_total_saved += current
-        
-        # ===== DLA PRZESZŁOŚCI: Nie obliczaj monthly_need =====
-        if offset < 0:
-            # Przeszłość - nie pokazujemy danych (nie da się dokładnie odtworzyć)
-            continue  # Pomijamy ten cel w sumowaniu monthly_need
-        # =====================================================
-        
-        remaining = target - current
-        if remaining > 0:
-            cycles_left = 1
-            check_offset = offset  # Start od wybranego okresu
-            while True:
-                _, cycle_end = utils.get_billing_period(db, check_offset)
-                if cycle_end >= g.deadline:
-                    break
-                cycles_left += 1
-                check_offset += 1
-                if cycles_left > 120:
-                    break
-            
-            contribs = db.query(func.sum(models.GoalContribution.amount)).filter(
-                models.GoalContribution.goal_id == g.id,
-                models.GoalContribution.date >= start_date,
-                models.GoalContribution.date <= end_date
-            ).scalar()
-            paid_this_cycle = float(contribs) if contribs else 0.0
-            
-            virtual_start_amount = current - paid_this_cycle
-            total_missing_at_start = target - virtual_start_amount
-            rate_per_cycle = total_missing_at_start / cycles_left if cycles_left > 0 else 0
-            actual_need = rate_per_cycle - paid_this_cycle
-            
-            if actual_need < 0:
-                actual_need = 0
-            goals_monthly_need += actual_need
+        goals_total_saved += to_money(g.current_amount)
+
+    # ===== DLA PRZESZŁOŚCI: Nie obliczaj monthly_need =====
+    # Przeszłość - nie pokazujemy danych (nie da się dokładnie odtworzyć)
+    if offset >= 0:
+        goals_monthly_need = sum(goal_service.calculate_monthly_needs(db, goals, offset).values(), ZERO)
+    # =====================================================
 
     # ===== Jeśli przeszłość, ustaw na null =====
     if offset < 0:
@@ -118,10 +97,10 @@ def get_dashboard_data(db: Session, offset: int):
         if t.type == 'transfer':
             cat_name = "Transfer"
         
-        tx_list.append({
+        tx_data = {
             "id": t.id,
             "desc": t.description,
-            "amount": float(t.amount),
+            "amount": t.amount,
             "type": t.type,
             "category": cat_name,
             "date": str(t.date),
@@ -130,7 +109,12 @@ def get_dashboard_data(db: Session, offset: int):
             "category_name": cat_name,
             "status": t.status,
             "loan_id": t.loan_id
-        })
+        }
+        # Ikona i kolor z relacji załadowanej joinedload (bez zapytania per wiersz)
+        if t.category and t.type != 'transfer':
+            tx_data["category_icon"] = t.category.icon_name
+            tx_data["category_color"] = t.category.color
+        tx_list.append(tx_data)
 
     return {
         "total_balance": total_balance,
@@ -150,16 +134,36 @@ def get_dashboard_data(db: Session, offset: int):
         "period_end": str(end_date)
     }
 
-def get_trend_data(db: Session):
+MONTH_LABELS = ["Sty", "Lut", "Mar", "Kwi", "Maj", "Cze", "Lip", "Sie", "Wrz", "Paź", "Lis", "Gru"]
+
+def get_trend_data(db: Session, months: int = 6):
+    # Okresy z kalendarza w pamięci, sumy z period_rollups - jedno zapytanie niezależnie od horyzontu
+    periods = utils.get_billing_periods(db, -(months - 1), months)
+    sums = rollup.sums_by_period(db, [start for start, _ in periods])
     data = []
-    for i in range(5, -1, -1):
-        offset = -i
-        start, end = utils.get_billing_period(db, offset)
-        raw_inc = db.query(func.sum(models.Transaction.amount)).filter(models.Transaction.type == 'income', models.Transaction.status == 'zrealizowana', models.Transaction.date >= start, models.Transaction.date <= end).scalar()
-        raw_exp = db.query(func.sum(models.Transaction.amount)).filter(models.Transaction.type == 'expense', models.Transaction.status == 'zrealizowana', models.Transaction.date >= start, models.Transaction.date <= end).scalar()
-        inc = float(raw_inc) if raw_inc is not None else 0.0
-        exp = float(raw_exp) if raw_exp is not None else 0.0
-        months = ["Sty", "Lut", "Mar", "Kwi", "Maj", "Cze", "Lip", "Sie", "Wrz", "Paź", "Lis", "Gru"]
-        label = f"{months[start.month - 1]}"
+    for start, end in periods:
+        inc = sums.get((start, 'income'), ZERO)
+        exp = sums.get((start, 'expense'), ZERO)
+        label = f"{MONTH_LABELS[start.month - 1]}"
         data.append({"label": label, "income": inc, "expense": exp})
     return data
+
+def get_budget_data(db: Session, offset: int = 0):
+    """Wydatki per kategoria w okresie vs limit miesięczny (z period_rollups)"""
+    start_date, end_date = utils.get_billing_period(db, offset)
+    spent = rollup.category_sums(db, start_date)
+    result = []
+    for cat in db.query(models.Category).order_by(models.Category.name).all():
+        limit = to_money(cat.monthly_limit)
+        amount = spent.get(cat.id, ZERO)
+        if limit <= 0 and amount <= 0: continue
+        result.append({
+            "category_id": cat.id,
+            "name": cat.name,
+            "icon": cat.icon_name,
+            "color": cat.color,
+            "spent": amount,
+            "limit": limit,
+            "percent": float(amount / limit * 100) if limit > 0 else None
+        })
+    return {"period_start": str(start_date), "period_end": str(end_date), "categories": result}
@@ -0,0 +1,31 @@
+import re
+from sqlalchemy.orm import Session
+import models
+
+# innodb_ft_min_token_size (domyślnie 3) - krótsze słowa nie trafiają do indeksu FULLTEXT
+FULLTEXT_MIN_TOKEN = 3
+
+def _tokens(text: str):
+    return re.findall(r"\w+", text.lower())
+
+def description_filter(db: Session, text: str, words: bool = False):
+    """
+    Filtr opisu transakcji.
+    Domyślnie: opis zawiera `text` w dowolnym miejscu (ILIKE '%text%', także w środku słowa -
+    "onka" znajduje "Biedronka"). FULLTEXT tego nie potrafi, więc tu go nie używamy.
+    `words=True`: każde słowo `text` jako początek słowa w opisie (wyszukiwanie po słowach,
+    np. kategoryzacja). Na MySQL zawęża kandydatów indeksem FULLTEXT (MATCH ... AGAINST w trybie
+    boolean), a frazę sprawdza ILIKE; na innych bazach to samo samym LIKE - wynik bez zależności od bazy.
+    """
+    substring = models.Transaction.description.ilike(f"%{text}%")
+    if not words:
+        return substring
+
+    # Fraza od początku opisu albo od początku słowa (po spacji)
+    word_start = models.Transaction.description.ilike(f"{text}%") | models.Transaction.description.ilike(f"% {text}%")
+    tokens = _tokens(text)
+    if db.get_bind().dialect.name != "mysql" or not tokens or any(len(t) < FULLTEXT_MIN_TOKEN for t in tokens):
+        return word_start
+
+    against = " ".join(f"+{t}*" for t in tokens)
+    return models.Transaction.description.match(against) & word_start
@@ -2,7 +2,49 @@ from sqlalchemy.orm import Session
 from sqlalchemy import func
 from fastapi import HTTPException
 from datetime import date
+from bisect import bisect_left
 import models, schemas, utils
+from money import to_money, ZERO
+from services import rollup
+
+MAX_PLANNING_CYCLES = 120
+
+def calculate_monthly_needs(db: Session, goals, offset: int = 0):
+    """
+    Zwraca {goal_id: monthly_need} dla podanych celów w okresie `offset`.
+    Kalendarz okresów liczony raz na żądanie, liczba pozostałych cykli
+    szukana binarnie, wpłaty w okresie pobierane jednym zapytaniem GROUP BY.
+    """
+    pending = [g for g in goals if to_money(g.target_amount) - to_money(g.current_amount) > 0]
+    needs = {g.id: ZERO for g in goals}
+    if not pending:
+        return needs
+
+    periods = utils.get_billing_periods(db, offset, MAX_PLANNING_CYCLES)
+    start_date, end_date = periods[0]
+    period_ends = [end for _, end in periods]
+
+    contribs = dict(db.query(
+        models.GoalContribution.goal_id,
+        func.sum(models.GoalContribution.amount)
+    ).filter(
+        models.GoalContribution.goal_id.in_([g.id for g in pending]),
+        models.GoalContribution.date >= start_date,
+        models.GoalContribution.date <= end_date
+    ).group_by(models.GoalContribution.goal_id).all())
+
+    for g in pending:
+        # Pierwszy okres, którego koniec obejmuje deadline (maks. 120 cykli w przód)
+        cycles_left = min(bisect_left(period_ends, g.deadline), MAX_PLANNING_CYCLES) + 1
+
+        paid_this_cycle = to_money(contribs.get(g.id))
+        virtual_start_amount = to_money(g.current_amount) - paid_this_cycle
+        total_missing_at_start = to_money(g.target_amount) - virtual_start_amount
+        rate_per_cycle = total_missing_at_start / cycles_left
+        actual_need = to_money(rate_per_cycle - paid_this_cycle)
+        needs[g.id] = actual_need if actual_need > 0 else ZERO
+
+    return needs
 
 def fund_goal(db: Session, goal_id: int, fund: schemas.GoalFund):
     """Zasila cel z atomową aktualizacją sald i transferów"""
@@ -19,8 +61,7 @@ def fund_goal(db: Session, goal_id: int, fund: schemas.GoalFund):
         # Walidacja dostępnych środków (jeśli źródło to konto oszczędnościowe)
         if source_acc.is_savings:
             reserved = db.query(func.sum(models.Goal.current_amount)).filter(models.Goal.account_id == source_acc.id).scalar()
-            reserved_amount = float(reserved) if reserved else 0.0
-            available = float(source_acc.balance) - reserved_amount
+            available = to_money(source_acc.balance) - to_money(reserved)
             if fund.amount > available:
                 raise HTTPException(status_code=400, detail=f"Brak wolnych środków. Dostępne: {available:.2f} zł")
 
@@ -45,9 +86,10 @@ def fund_goal(db: Session, goal_id: int, fund: schemas.GoalFund):
             )
             db.add(transfer_tx)
             db.flush()
+            rollup.add(db, transfer_tx)
             
             # Aktualizuj salda
-            utils.update_balance(db, source_acc.id, fund.amount, "transfer", target_acc.id, is_reversal=False)
+            utils.update_balance(db, source_acc.id, fund.amount, "transfer", target_acc.id, is_reversal=False, tx_date=transfer_tx.date, transaction_id=transfer_tx.id)
         
         # Dodaj wpłatę do celu
         contribution = models.GoalContribution(
@@ -58,7 +100,7 @@ def fund_goal(db: Session, goal_id: int, fund: schemas.GoalFund):
         db.add(contribution)
         
         # Zwiększ current_amount
-        goal.current_amount = float(goal.current_amount) + fund.amount
+        goal.current_amount = to_money(goal.current_amount) + fund.amount
         
         db.commit()  # COMMIT wszystkiego naraz
         
@@ -78,7 +120,7 @@ def withdraw_goal(db: Session, goal_id: int, withdraw: schemas.GoalWithdraw):
     if not goal:
         raise HTTPException(status_code=404, detail="Cel nie istnieje")
     
-    if float(goal.current_amount) < withdraw.amount:
+    if to_money(goal.current_amount) < withdraw.amount:
         raise HTTPException(status_code=400, detail="Brak wystarczających środków na celu")
     
     target_acc = db.query(models.Account).filter(models.Account.id == withdraw.target_account_id).first()
@@ -87,7 +129,7 @@ def withdraw_goal(db: Session, goal_id: int, withdraw: schemas.GoalWithdraw):
 
     try:
         # Zmniejsz current_amount
-        goal.current_amount = float(goal.current_amount) - withdraw.amount
+        goal.current_amount = to_money(goal.current_amount) - withdraw.amount
         
         # Dodaj ujemną wpłatę (audyt)
         db.add(models.GoalContribution(
@@ -111,8 +153,9 @@ def withdraw_goal(db: Session, goal_id: int, withdraw: schemas.GoalWithdraw):
             )
             db.add(tx)
             db.flush()
+            rollup.add(db, tx)
             
-            utils.update_balance(db, source_acc.id, withdraw.amount, "transfer", target_acc.id, is_reversal=False)
+            utils.update_balance(db, source_acc.id, withdraw.amount, "transfer", target_acc.id, is_reversal=False, tx_date=tx.date, transaction_id=tx.id)
         
         db.commit()
         
@@ -134,15 +177,15 @@ def transfer_goal(db: Session, goal_id: int, transfer: schemas.GoalTransfer):
     if not source or not target:
         raise HTTPException(status_code=404, detail="Cel nie istnieje")
     
-    if float(source.current_amount) < transfer.amount:
+    if to_money(source.current_amount) < transfer.amount:
         raise HTTPException(status_code=400, detail="Brak środków na celu źródłowym")
     
     try:
         # Zmniejsz source
-        source.current_amount = float(source.current_amount) - transfer.amount
+        source.current_amount = to_money(source.current_amount) - transfer.amount
         
         # Zwiększ target
-        target.current_amount = float(target.current_amount) + transfer.amount
+        target.current_amount = to_money(target.current_amount) + transfer.amount
         
         # Dodaj wpłaty (audyt)
         db.add(models.GoalContribution(
@@ -0,0 +1,152 @@
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException
+from database import SessionLocal
+from money import json_default
+from services import bank_import, categorizer
+
+# --- PODGLĄD IMPORTU W TLE ---
+# Parsowanie + kategoryzacja w osobnej puli wątków (nie w pętli zdarzeń ani w puli żądań).
+# Pula wątków, nie procesów: klasyfikator słów kluczowych jest współdzielony w pamięci procesu.
+# Stan zadań w plikach w katalogu tymczasowym (<job_id>.json + <job_id>.rows.json po zakończeniu),
+# więc odpytywanie działa niezależnie od tego, który worker uvicorna przyjął upload.
+MAX_WORKERS = 2
+JOB_TTL_SECONDS = 60 * 60
+JOB_STALE_SECONDS = 24 * 60 * 60  # Zadanie "w toku" tak długo = proces, który je wykonywał, nie żyje
+JOBS_DIR = os.getenv("IMPORT_JOBS_DIR", os.path.join(tempfile.gettempdir(), "budzet-import-jobs"))
+
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="import-preview")
+_JOB_ID = re.compile(r"[0-9a-f]{32}")
+
+def _path(job_id: str, suffix: str = ".json") -> str:
+    return os.path.join(JOBS_DIR, job_id + suffix)
+
+def _write(path: str, data):
+    # Zapis atomowy - inny proces nigdy nie czyta połowy pliku
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, default=json_default)
+    os.replace(tmp, path)
+
+def _read(job_id: str):
+    try:
+        with open(_path(job_id), encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+def _remove(job_id: str):
+    for suffix in (".json", ".rows.json"):
+        try:
+            os.remove(_path(job_id, suffix))
+        except FileNotFoundError:
+            pass
+
+def _cleanup_expired():
+    """Usuwa zakończone zadania starsze niż TTL. Oczekujące i trwające zostają (chyba że porzucone)."""
+    now = time.time()
+    for name in os.listdir(JOBS_DIR):
+        job_id = name[:-len(".json")]
+        if not name.endswith(".json") or not _JOB_ID.fullmatch(job_id): continue
+        job = _read(job_id)
+        if job is None: continue
+        age = now - job["created"]
+        if (job["status"] in ("done", "error") and age > JOB_TTL_SECONDS) or age > JOB_STALE_SECONDS:
+            _remove(job_id)
+
+def submit_preview(fileobj) -> str:
+    """Kopiuje upload do pliku tymczasowego (porcjami) i zleca podgląd. Zwraca job_id."""
+    os.makedirs(JOBS_DIR, exist_ok=True)
+    _cleanup_expired()
+
+    tmp = tempfile.TemporaryFile()
+    shutil.copyfileobj(fileobj, tmp, bank_import.CHUNK_SIZE)
+    size = tmp.tell()
+    tmp.seek(0)
+
+    job_id = uuid.uuid4().hex
+    _write(_path(job_id), {
+        "status": "pending",
+        "progress": 0,
+        "rows_processed": 0,
+        "error": None,
+        "created": time.time()
+    })
+    _executor.submit(_run_preview, job_id, tmp, size)
+    return job_id
+
+def _run_preview(job_id: str, tmp, size: int):
+    job = _read(job_id)
+    if job is None:
+        tmp.close()  # Usunięte, zanim pula je podjęła - nie ma komu oddać wyniku
+        return
+    db = SessionLocal()
+    try:
+        job["status"] = "running"
+        _write(_path(job_id), job)
+        columns, rows = bank_import.open_bank_csv(tmp)
+        keyword_index = categorizer.get_keyword_index(db)
+        errors_log = []
+        preview = []
+
+        for batch in bank_import.iter_preview_batches(rows, columns, keyword_index, errors_log):
+            preview.extend(batch)
+            job["rows_processed"] = len(preview)
+            job["progress"] = min(99, int(tmp.tell() * 100 / size)) if size else 99
+            _write(_path(job_id), job)
+
+        if not preview:
+            msg = "Nie udało się odczytać transakcji."
+            if errors_log:
+                msg += f" Przykładowe błędy: {'; '.join(errors_log[:3])}"
+            raise HTTPException(status_code=400, detail=msg)
+
+        _write(_path(job_id, ".rows.json"), preview)
+        job["progress"] = 100
+        job["status"] = "done"
+    except HTTPException as e:
+        job["error"] = e.detail
+        job["status"] = "error"
+    except Exception as e:
+        print(f"❌ BŁĄD podglądu importu {job_id}: {e}")
+        job["error"] = f"Błąd importu: {str(e)}"
+        job["status"] = "error"
+    finally:
+        db.close()
+        tmp.close()
+    _write(_path(job_id), job)
+
+def _get(job_id: str):
+    job = _read(job_id) if _JOB_ID.fullmatch(job_id) else None
+    if not job:
+        raise HTTPException(status_code=404, detail="Zadanie importu nie istnieje")
+    return job
+
+def get_status(job_id: str):
+    job = _get(job_id)
+    return {
+        "job_id": job_id,
+        "status": job["status"],
+        "progress": job["progress"],
+        "rows_processed": job["rows_processed"],
+        "error": job["error"]
+    }
+
+def get_result(job_id: str):
+    job = _get(job_id)
+    if job["status"] == "error":
+        raise HTTPException(status_code=400, detail=job["error"])
+    if job["status"] != "done":
+        raise HTTPException(status_code=409, detail="Podgląd jeszcze się przetwarza")
+    try:
+        with open(_path(job_id, ".rows.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Zadanie importu nie istnieje")
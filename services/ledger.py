@@ -0,0 +1,46 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func
+from datetime import date, timedelta
+from decimal import Decimal
+import models
+
+# Dziennik sald: Account.balance to bieżąca suma, balance_entries - historia delt,
+# balance_snapshots - saldo na koniec dnia, od którego liczymy saldo historyczne.
+
+def _entries_sum(db: Session, account_id: int, after=None, until=None) -> Decimal:
+    query = db.query(func.coalesce(func.sum(models.BalanceEntry.delta), 0)).filter(models.BalanceEntry.account_id == account_id)
+    if after is not None: query = query.filter(models.BalanceEntry.date > after)
+    if until is not None: query = query.filter(models.BalanceEntry.date <= until)
+    return Decimal(str(query.scalar()))
+
+def balance_as_of(db: Session, account_id: int, day: date) -> Decimal:
+    """Saldo konta na koniec podanego dnia: najbliższy snapshot + wpisy po nim (albo saldo bieżące - wpisy późniejsze)."""
+    account = db.query(models.Account.balance).filter(models.Account.id == account_id).first()
+    if account is None: return None
+
+    snapshot = db.query(models.BalanceSnapshot).filter(
+        models.BalanceSnapshot.account_id == account_id,
+        models.BalanceSnapshot.date <= day
+    ).order_by(models.BalanceSnapshot.date.desc()).first()
+    if snapshot:
+        return Decimal(str(snapshot.balance)) + _entries_sum(db, account_id, after=snapshot.date, until=day)
+    return Decimal(str(account.balance or 0)) - _entries_sum(db, account_id, after=day)
+
+def take_snapshots(db: Session, day: date = None) -> int:
+    """Zapisuje saldo każdego konta na koniec dnia (domyślnie wczoraj). Nie commituje."""
+    day = day or date.today() - timedelta(days=1)
+    later = dict(db.query(models.BalanceEntry.account_id, func.sum(models.BalanceEntry.delta)).filter(
+        models.BalanceEntry.date > day
+    ).group_by(models.BalanceEntry.account_id).all())
+
+    db.query(models.BalanceSnapshot).filter(models.BalanceSnapshot.date == day).delete(synchronize_session=False)
+    rows = [
+        {"account_id": acc_id, "date": day, "balance": Decimal(str(balance or 0)) - Decimal(str(later.get(acc_id) or 0))}
+        for acc_id, balance in db.query(models.Account.id, models.Account.balance).all()
+    ]
+    if rows: db.bulk_insert_mappings(models.BalanceSnapshot, rows)
+    return len(rows)
+
+def remove_account(db: Session, account_id: int):
+    db.query(models.BalanceEntry).filter(models.BalanceEntry.account_id == account_id).delete(synchronize_session=False)
+    db.query(models.BalanceSnapshot).filter(models.BalanceSnapshot.account_id == account_id).delete(synchronize_session=False)
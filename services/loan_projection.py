@@ -0,0 +1,111 @@
+import threading
+from datetime import date
+import numpy as np
+from sqlalchemy.orm import Session
+import models
+from money import to_money
+
+# --- PROJEKCJA SPŁATY KREDYTÓW ---
+# Harmonogramy (rata annuitetowa, kapitalizacja miesięczna) liczone macierzowo dla wszystkich
+# kredytów naraz: wiersz = kredyt, kolumna = kolejna rata. Saldo po k ratach z wzoru zamkniętego
+#   B_k = P(1+r)^k - A((1+r)^k - 1)/r     (dla r = 0: B_k = P - kA)
+# zamiast pętli miesiąc po miesiącu. Wynik trzymany w pamięci per wersja kredytu.
+MAX_MONTHS = 600  # 50 lat - kredyt, którego rata nie pokrywa odsetek, nie zostanie spłacony
+
+_cache = {}  # loan_id -> (wersja, projekcja)
+_lock = threading.Lock()
+
+def _version(loan):
+    return (loan.name, loan.remaining_amount, loan.monthly_payment, loan.interest_rate, loan.next_payment_date)
+
+def _month_dates(first_dates, months: int):
+    """Daty kolejnych rat: ten sam dzień miesiąca (obcięty do długości miesiąca), [kredyty x miesiące]"""
+    first = np.array(first_dates, dtype="datetime64[D]")
+    base_month = first.astype("datetime64[M]")
+    day_offset = (first - base_month.astype("datetime64[D]")).astype(int)
+    month = base_month[:, None] + np.arange(months)
+    month_start = month.astype("datetime64[D]")
+    days_in_month = ((month + 1).astype("datetime64[D]") - month_start).astype(int)
+    return month_start + np.minimum(day_offset[:, None], days_in_month - 1)
+
+def _project(loans):
+    """Harmonogramy dla listy kredytów (jedno przeliczenie macierzowe)"""
+    principal = np.array([float(l.remaining_amount or 0) for l in loans])
+    payment = np.array([float(l.monthly_payment or 0) for l in loans])
+    rate = np.array([float(l.interest_rate or 0) for l in loans]) / 1200  # % rocznie -> ułamek miesięcznie
+
+    # Liczba rat do spłaty (wzór zamknięty); rata <= odsetki -> brak spłaty w horyzoncie
+    with np.errstate(divide="ignore", invalid="ignore"):
+        interest_only = principal * rate
+        payable = (payment > interest_only) & (payment > 0)
+        n_interest = np.where(rate > 0, -np.log1p(-interest_only / payment) / np.log1p(rate), 0)
+        n_zero = principal / payment
+        n_payments = np.ceil(np.round(np.where(rate > 0, n_interest, n_zero), 9))
+    n_payments = np.where(payable, n_payments, MAX_MONTHS)
+    n_payments = np.where(principal <= 0, 0, np.minimum(n_payments, MAX_MONTHS)).astype(int)
+
+    months = max(int(n_payments.max(initial=0)), 1)
+    k = np.arange(months + 1)
+    growth = (1 + rate[:, None]) ** k
+    with np.errstate(divide="ignore", invalid="ignore"):
+        annuity = np.where(rate[:, None] > 0, (growth - 1) / rate[:, None], k)
+    balance = np.maximum(principal[:, None] * growth - payment[:, None] * annuity, 0)
+
+    opening = balance[:, :-1]
+    interest = opening * rate[:, None]
+    # Ostatnia rata pokrywa tylko resztę długu; po spłacie zera
+    active = k[1:] <= n_payments[:, None]
+    paid = np.where(active, np.minimum(payment[:, None], opening + interest), 0)
+    interest = np.where(active, interest, 0)
+    closing = np.where(active, opening + interest - paid, 0)
+    dates = _month_dates([l.next_payment_date or date.today() for l in loans], months)
+
+    result = {}
+    for i, loan in enumerate(loans):
+        n = int(n_payments[i])
+        paid_off = bool(payable[i]) or principal[i] <= 0
+        shown = n if paid_off else 0  # Bez spłaty harmonogram (rosnące saldo) nic nie mówi
+        result[loan.id] = {
+            "loan_id": loan.id,
+            "name": loan.name,
+            "interest_rate": float(loan.interest_rate or 0),
+            "remaining": to_money(principal[i]),
+            "payments_left": n if paid_off else None,
+            "payoff_date": (str(dates[i, n - 1]) if n else str(date.today())) if paid_off else None,
+            "total_interest": to_money(interest[i, :n].sum()) if paid_off else None,
+            "total_paid": to_money(paid[i, :n].sum()) if paid_off else None,
+            "schedule": {
+                "date": dates[i, :shown].astype(str).tolist(),
+                "payment": np.round(paid[i, :shown], 2).tolist(),
+                "interest": np.round(interest[i, :shown], 2).tolist(),
+                "principal": np.round(paid[i, :shown] - interest[i, :shown], 2).tolist(),
+                "balance": np.round(closing[i, :shown], 2).tolist(),
+            },
+        }
+    return result
+
+def get_projections(db: Session, include_schedule: bool = False):
+    loans = db.query(models.Loan).order_by(models.Loan.next_payment_date).all()
+
+    with _lock:
+        stale = [l for l in loans if _cache.get(l.id, (None,))[0] != _version(l)]
+    if stale:
+        fresh = _project(stale)
+        with _lock:
+            for l in stale:
+                _cache[l.id] = (_version(l), fresh[l.id])
+            for loan_id in set(_cache) - {l.id for l in loans}:
+                del _cache[loan_id]
+
+    with _lock:
+        projections = [_cache[l.id][1] for l in loans]
+
+    # Data wolności od długów: ostatnia spłata spośród kredytów (None, gdy któryś się nie spłaca)
+    payoff_dates = [p["payoff_date"] for p in projections]
+    debt_free_date = max(payoff_dates) if payoff_dates and None not in payoff_dates else None
+
+    return {
+        "debt_free_date": debt_free_date if projections else str(date.today()),
+        "total_interest": sum((p["total_interest"] for p in projections if p["total_interest"] is not None), to_money(0)),
+        "loans": [p if include_schedule else {key: v for key, v in p.items() if key != "schedule"} for p in projections],
+    }
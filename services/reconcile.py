@@ -0,0 +1,62 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func, case, union_all, select, literal
+from decimal import Decimal
+import models, utils
+
+# Weryfikacja sald: saldo oczekiwane = transakcje zrealizowane + korekty ręczne z dziennika
+# (wpisy 'reconcile' są pomijane - to właśnie naprawy dryfu). Wszystko jednym zapytaniem
+# grupującym po stronie bazy, na DECIMAL-ach.
+
+TOLERANCE = Decimal("0.005")
+
+def _movements():
+    """Ruchy sald jako (account_id, delta) - strona źródłowa, strona docelowa transferu, korekty."""
+    tx = models.Transaction
+    source = select(
+        tx.account_id.label("account_id"),
+        case((tx.type == "income", tx.amount), else_=-tx.amount).label("delta")
+    ).where(tx.status == "zrealizowana", tx.type.in_(("income", "expense", "transfer")))
+    target = select(
+        tx.target_account_id.label("account_id"),
+        tx.amount.label("delta")
+    ).where(tx.status == "zrealizowana", tx.type == "transfer", tx.target_account_id.isnot(None))
+    adjustments = select(
+        models.BalanceEntry.account_id.label("account_id"),
+        models.BalanceEntry.delta.label("delta")
+    ).where(models.BalanceEntry.kind == "adjustment")
+    return union_all(source, target, adjustments).subquery("movements")
+
+def check(db: Session, account_ids=None):
+    """Zwraca listę kont z saldem bieżącym, oczekiwanym i różnicą."""
+    movements = _movements()
+    expected = func.coalesce(func.sum(movements.c.delta), literal(0))
+    query = db.query(
+        models.Account.id, models.Account.name, models.Account.balance, expected
+    ).outerjoin(movements, movements.c.account_id == models.Account.id).group_by(
+        models.Account.id, models.Account.name, models.Account.balance
+    ).order_by(models.Account.id)
+    if account_ids: query = query.filter(models.Account.id.in_(account_ids))
+
+    result = []
+    for acc_id, name, balance, expected_balance in query.all():
+        balance = Decimal(str(balance or 0))
+        expected_balance = Decimal(str(expected_balance or 0)).quantize(Decimal("0.01"))
+        drift = balance - expected_balance
+        result.append({
+            "account_id": acc_id, "name": name,
+            "balance": balance, "expected": expected_balance, "drift": drift,
+            "ok": abs(drift) < TOLERANCE
+        })
+    return result
+
+def repair(db: Session, report) -> int:
+    """Wyrównuje salda z dryfem wpisem 'reconcile' w dzienniku. Nie commituje."""
+    fixed = 0
+    for row in report:
+        if row["ok"]: continue
+        utils.apply_balance_delta(db, row["account_id"], -row["drift"], kind="reconcile")
+        fixed += 1
+    return fixed
+
+def to_json(report):
+    return [{**row, "balance": float(row["balance"]), "expected": float(row["expected"]), "drift": float(row["drift"])} for row in report]
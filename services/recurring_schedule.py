@@ -0,0 +1,123 @@
+import calendar
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import date, timedelta
+from sqlalchemy.orm import Session, joinedload
+import models, utils, response_cache
+from services import rollup
+
+# --- HARMONOGRAM PŁATNOŚCI CYKLICZNYCH ---
+# Najbliższe wystąpienia wszystkich aktywnych płatności (na HORIZON_DAYS dni) materializowane raz
+# do posortowanej listy; "wymagalne w ciągu N dni" to jedno wyszukiwanie binarne zakresu.
+# Indeks ważny dla (wersja danych, dzisiejsza data) - zapis w dowolnym procesie lub nowy dzień go unieważnia.
+HORIZON_DAYS = 62
+
+_lock = threading.Lock()
+_index = {"key": None, "dates": [], "items": []}
+
+def payment_date_in_cycle(day_of_month: int, cycle_start: date) -> date:
+    """Pierwszy dzień `day_of_month` (obcięty do długości miesiąca) od początku cyklu (dnia wypłaty)"""
+    year, month = cycle_start.year, cycle_start.month
+    if day_of_month < cycle_start.day:
+        # Płatność PRZED dniem wypłaty = kolejny miesiąc kalendarzowy
+        month += 1
+        if month > 12: month, year = 1, year + 1
+    return date(year, month, min(day_of_month, calendar.monthrange(year, month)[1]))
+
+def next_occurrence(db: Session, rec, cycles: int = 2):
+    """Najbliższe niewykonane wystąpienie płatności w bieżącym lub następnym cyklu (jak w /check) albo None"""
+    if not rec.day_of_month: return None
+    for start, end in utils.get_billing_periods(db, 0, cycles):
+        payment_date = payment_date_in_cycle(rec.day_of_month, start)
+        if not (start <= payment_date <= end): continue
+        if rec.last_run_date and rec.last_run_date >= start: continue
+        return payment_date
+    return None
+
+def already_run(db: Session, rec, payment_date: date) -> bool:
+    """Płatność wykonana / pominięta już w cyklu zawierającym `payment_date` (ponowne dodanie = duplikat)"""
+    return bool(rec.last_run_date) and rec.last_run_date >= rollup.period_start_for(db, payment_date)
+
+def _build(db: Session, today: date):
+    recs = db.query(models.RecurringTransaction).options(
+        joinedload(models.RecurringTransaction.category)
+    ).filter(models.RecurringTransaction.is_active == True).all()
+
+    # Cykle od bieżącego do końca horyzontu - z kalendarza wypłat w pamięci
+    periods = []
+    for start, end in utils.get_billing_periods(db, 0, 4):
+        periods.append((start, end))
+        if end >= today + timedelta(days=HORIZON_DAYS): break
+
+    occurrences = []
+    for r in recs:
+        if not r.day_of_month: continue
+        for start, end in periods:
+            payment_date = payment_date_in_cycle(r.day_of_month, start)
+            if not (start <= payment_date <= end) or payment_date < today: continue
+            # Już wykonana / pominięta w tym cyklu
+            if r.last_run_date and r.last_run_date >= start: continue
+            occurrences.append((payment_date, r.id, {
+                "id": r.id,
+                "name": r.name,
+                "amount": r.amount,
+                "category": r.category.name if r.category else "Inne",
+                "account_id": r.account_id,
+                "payment_date": str(payment_date),
+                "cycle_start": str(start),
+            }))
+    occurrences.sort(key=lambda o: (o[0], o[1]))
+    return [o[0] for o in occurrences], [o[2] for o in occurrences]
+
+def due_payments(db: Session, days: int = 7, today: date = None):
+    """Płatności wymagalne od dziś do dziś + `days` (włącznie)"""
+    today = today or date.today()
+    key = (response_cache.data_version(db), today)
+    with _lock:
+        index = _index if _index["key"] == key else None
+    if index is None:
+        dates, items = _build(db, today)
+        index = {"key": key, "dates": dates, "items": items}
+        with _lock:
+            _index.update(index)
+
+    lo = bisect_left(index["dates"], today)
+    hi = bisect_right(index["dates"], today + timedelta(days=min(days, HORIZON_DAYS)))
+    return [{**item, "days_until": (index["dates"][i] - today).days} for i, item in enumerate(index["items"][lo:hi], start=lo)]
+
+def create_planned(db: Session, items):
+    """
+    Zapisuje płatności cykliczne jako transakcje PLANOWANE jednym bulk insertem.
+    `items` to pary (RecurringTransaction, data płatności). Aktualizuje last_run_date. Nie commituje.
+    """
+    rows = [{
+        "description": rec.name,
+        "amount": rec.amount,
+        "date": payment_date,
+        "type": "expense",
+        "account_id": rec.account_id,
+        "category_id": rec.category_id,
+        "status": "planowana"
+    } for rec, payment_date in items]
+    if not rows: return 0
+    db.bulk_insert_mappings(models.Transaction, rows)
+    rollup.add_rows(db, rows)
+    for rec, payment_date in items:
+        rec.last_run_date = payment_date
+    return len(rows)
+
+def generate_due(db: Session, ahead_days: int = 7, today: date = None) -> int:
+    """Planuje płatności bieżącego cyklu wymagalne do dziś + `ahead_days`. Idempotentne (last_run_date)."""
+    today = today or date.today()
+    start, end = utils.get_billing_period(db, 0)
+    recs = db.query(models.RecurringTransaction).filter(
+        models.RecurringTransaction.is_active == True,
+        (models.RecurringTransaction.last_run_date == None) | (models.RecurringTransaction.last_run_date < start)
+    ).all()
+    items = []
+    for r in recs:
+        if not r.day_of_month: continue
+        payment_date = payment_date_in_cycle(r.day_of_month, start)
+        if payment_date <= end and payment_date <= today + timedelta(days=ahead_days):
+            items.append((r, payment_date))
+    return create_planned(db, items)
@@ -0,0 +1,184 @@
+from contextlib import contextmanager
+from sqlalchemy.orm import Session
+from sqlalchemy import bindparam, func, text
+from datetime import date, timedelta
+from decimal import Decimal
+from collections import defaultdict
+import models, utils
+from money import to_money
+
+# Klucz agregatu: (początek okresu, kategoria, typ, status, konto)
+
+def period_start_for(db: Session, day: date) -> date:
+    """Początek okresu rozliczeniowego zawierającego `day` (z kalendarza wypłat w pamięci)"""
+    payday = utils.get_actual_payday(day.year, day.month, db)
+    if day >= payday:
+        return payday
+    prev = day.replace(day=1) - timedelta(days=1)
+    return utils.get_actual_payday(prev.year, prev.month, db)
+
+def _apply(db: Session, key, amount: Decimal, count: int):
+    period_start, category_id, tx_type, status, account_id = key
+    # UPDATE ... SET total = total + :delta - bez read-modify-write
+    updated = db.query(models.PeriodRollup).filter(
+        models.PeriodRollup.period_start == period_start,
+        models.PeriodRollup.category_id == category_id,
+        models.PeriodRollup.type == tx_type,
+        models.PeriodRollup.status == status,
+        models.PeriodRollup.account_id == account_id
+    ).update({
+        models.PeriodRollup.total: models.PeriodRollup.total + amount,
+        models.PeriodRollup.tx_count: models.PeriodRollup.tx_count + count
+    }, synchronize_session=False)
+    if not updated:
+        db.add(models.PeriodRollup(
+            period_start=period_start, category_id=category_id, type=tx_type,
+            status=status, account_id=account_id, total=amount, tx_count=count
+        ))
+        db.flush()
+
+def _apply_many(db: Session, totals: dict):
+    """
+    Wiele kluczy naraz (import): jeden SELECT istniejących wierszy, jeden UPDATE wsadowy
+    (executemany po id) i jeden INSERT wsadowy brakujących kluczy - zamiast UPDATE/INSERT per klucz.
+    """
+    if not totals: return
+    table = models.PeriodRollup.__table__
+    existing = {}
+    for row in db.query(
+        models.PeriodRollup.id, models.PeriodRollup.period_start, models.PeriodRollup.category_id,
+        models.PeriodRollup.type, models.PeriodRollup.status, models.PeriodRollup.account_id
+    ).filter(models.PeriodRollup.period_start.in_({key[0] for key in totals})):
+        existing.setdefault(tuple(row[1:]), row[0])  # Klucze z NULL-ami dopasowane w Pythonie
+
+    updates, inserts = [], []
+    for key, (amount, count) in totals.items():
+        if key in existing:
+            updates.append({"rollup_id": existing[key], "delta_total": amount, "delta_count": count})
+        else:
+            period_start, category_id, tx_type, status, account_id = key
+            inserts.append({"period_start": period_start, "category_id": category_id, "type": tx_type,
+                            "status": status, "account_id": account_id, "total": amount, "tx_count": count})
+    if updates:
+        db.execute(table.update().where(table.c.id == bindparam("rollup_id")).values(
+            total=table.c.total + bindparam("delta_total"),
+            tx_count=table.c.tx_count + bindparam("delta_count")
+        ), updates)
+    if inserts:
+        db.execute(table.insert(), inserts)
+
+def _key(db: Session, tx_date, category_id, tx_type, status, account_id):
+    return (period_start_for(db, tx_date), category_id, tx_type, status, account_id)
+
+def add(db: Session, tx):
+    """Dolicza transakcję (obiekt z polami date/category_id/type/status/account_id/amount)"""
+    _apply(db, _key(db, tx.date, tx.category_id, tx.type, tx.status, tx.account_id), to_money(tx.amount), 1)
+
+def remove(db: Session, tx):
+    """Odejmuje transakcję - wołać PRZED zmianą jej pól"""
+    _apply(db, _key(db, tx.date, tx.category_id, tx.type, tx.status, tx.account_id), -to_money(tx.amount), -1)
+
+def add_rows(db: Session, rows):
+    """Zbiorcze doliczenie słowników transakcji (import) - kilka zapytań niezależnie od liczby kluczy"""
+    totals = defaultdict(lambda: [Decimal("0"), 0])
+    for row in rows:
+        key = _key(db, row["date"], row.get("category_id"), row["type"], row.get("status", "zrealizowana"), row["account_id"])
+        totals[key][0] += to_money(row["amount"])
+        totals[key][1] += 1
+    _apply_many(db, totals)
+
+def remove_account(db: Session, account_id: int):
+    """Usunięcie konta kasuje jego transakcje, więc i agregaty"""
+    db.query(models.PeriodRollup).filter(models.PeriodRollup.account_id == account_id).delete(synchronize_session=False)
+
+def rebuild(db: Session):
+    """Pełne przeliczenie tabeli z transakcji (np. po zmianie dni wypłat). Nie commituje."""
+    db.query(models.PeriodRollup).delete(synchronize_session=False)
+
+    # Agregacja w SQL per dzień, potem zwinięcie dni do okresów w pamięci
+    rows = db.query(
+        models.Transaction.date,
+        models.Transaction.category_id,
+        models.Transaction.type,
+        models.Transaction.status,
+        models.Transaction.account_id,
+        func.sum(models.Transaction.amount),
+        func.count(models.Transaction.id)
+    ).filter(models.Transaction.date.isnot(None)).group_by(
+        models.Transaction.date,
+        models.Transaction.category_id,
+        models.Transaction.type,
+        models.Transaction.status,
+        models.Transaction.account_id
+    ).all()
+
+    totals = defaultdict(lambda: [Decimal("0"), 0])
+    for tx_date, category_id, tx_type, status, account_id, amount, count in rows:
+        key = _key(db, tx_date, category_id, tx_type, status, account_id)
+        totals[key][0] += Decimal(amount or 0)
+        totals[key][1] += count
+
+    db.bulk_insert_mappings(models.PeriodRollup, [
+        {"period_start": k[0], "category_id": k[1], "type": k[2], "status": k[3], "account_id": k[4], "total": v[0], "tx_count": v[1]}
+        for k, v in totals.items()
+    ])
+    return len(totals)
+
+@contextmanager
+def _rebuild_lock(db: Session):
+    """
+    Blokada przebudowy między procesami (kilka workerów startuje naraz). Na MySQL GET_LOCK na
+    osobnym połączeniu - sesja może po drodze commitować i oddać swoje połączenie do puli.
+    Inne bazy (SQLite w testach) działają w jednym procesie - bez blokady.
+    """
+    engine = db.get_bind()
+    if engine.dialect.name != "mysql":
+        yield True
+        return
+    with engine.connect() as conn:
+        acquired = conn.execute(text("SELECT GET_LOCK('period_rollups_rebuild', 600)")).scalar() == 1
+        try:
+            yield acquired
+        finally:
+            if acquired: conn.execute(text("SELECT RELEASE_LOCK('period_rollups_rebuild')"))
+
+def _needs_build(db: Session) -> bool:
+    return db.query(models.PeriodRollup.id).first() is None and db.query(models.Transaction.id).first() is not None
+
+def ensure_built(db: Session):
+    """Przy starcie: pusta tabela agregatów przy niepustej historii -> przebudowa (raz, pod blokadą)"""
+    if not _needs_build(db): return
+    db.rollback()  # Nowa transakcja po blokadzie - widzi przebudowę zrobioną przez inny proces
+    with _rebuild_lock(db) as acquired:
+        if not acquired or not _needs_build(db): return
+        count = rebuild(db)
+        db.commit()
+        print(f"--- PERIOD ROLLUPS: przebudowano {count} agregatów ---")
+
+def sums_by_period(db: Session, period_starts, status: str = 'zrealizowana', types=('income', 'expense'), category_id=None):
+    """{(period_start, type): suma} dla wielu okresów jednym zapytaniem"""
+    query = db.query(
+        models.PeriodRollup.period_start,
+        models.PeriodRollup.type,
+        func.sum(models.PeriodRollup.total)
+    ).filter(
+        models.PeriodRollup.period_start.in_(period_starts),
+        models.PeriodRollup.status == status,
+        models.PeriodRollup.type.in_(types)
+    )
+    if category_id is not None:
+        query = query.filter(models.PeriodRollup.category_id == category_id)
+    rows = query.group_by(models.PeriodRollup.period_start, models.PeriodRollup.type).all()
+    return {(period_start, tx_type): to_money(total) for period_start, tx_type, total in rows}
+
+def category_sums(db: Session, period_start: date, tx_type: str = 'expense', status: str = 'zrealizowana'):
+    """{category_id: suma} w jednym okresie - do widoku limitów budżetów"""
+    rows = db.query(
+        models.PeriodRollup.category_id,
+        func.sum(models.PeriodRollup.total)
+    ).filter(
+        models.PeriodRollup.period_start == period_start,
+        models.PeriodRollup.type == tx_type,
+        models.PeriodRollup.status == status
+    ).group_by(models.PeriodRollup.category_id).all()
+    return {category_id: to_money(total) for category_id, total in rows}
@@ -0,0 +1,90 @@
+import asyncio
+import logging
+import os
+from datetime import date, datetime, timedelta
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+import database, models, utils
+from services import categorizer, ledger, recurring_schedule, rollup
+
+# --- HARMONOGRAM ZADAŃ W TLE ---
+# Raz na dobę (o SCHEDULER_HOUR) i raz przy starcie: planowanie wymagalnych płatności cyklicznych,
+# opcjonalnie realizacja zaległych transakcji planowanych (AUTO_REALIZE_PLANNED=1) i snapshot sald.
+# Wszystkie kroki są idempotentne - ponowne uruchomienie tego samego dnia niczego nie dubluje.
+SCHEDULER_HOUR = int(os.getenv("SCHEDULER_HOUR", "3"))
+RECURRING_AHEAD_DAYS = int(os.getenv("RECURRING_AHEAD_DAYS", "7"))
+AUTO_REALIZE_PLANNED = os.getenv("AUTO_REALIZE_PLANNED", "0") == "1"
+PROMOTE_BATCH_SIZE = 500
+
+logger = logging.getLogger("budzet.scheduler")
+
+def promote_planned(db: Session, today: date = None, batch_size: int = PROMOTE_BATCH_SIZE) -> int:
+    """Transakcje planowane z datą <= dziś -> zrealizowane (salda, kredyty, agregaty). Commit per partia."""
+    today = today or date.today()
+    promoted = 0
+    while True:
+        batch = db.query(models.Transaction).filter(
+            models.Transaction.status == 'planowana',
+            models.Transaction.date <= today
+        ).order_by(models.Transaction.date, models.Transaction.id).limit(batch_size).all()
+        if not batch: break
+
+        for tx in batch:
+            rollup.remove(db, tx)
+            tx.status = 'zrealizowana'
+            rollup.add(db, tx)
+            utils.update_balance(db, tx.account_id, tx.amount, tx.type, tx.target_account_id, is_reversal=False, tx_date=tx.date, transaction_id=tx.id)
+            if tx.loan_id and tx.type == 'expense':
+                utils.update_loan_balance(db, tx.loan_id, tx.amount, is_reversal=False)
+        db.commit()
+        promoted += len(batch)
+    return promoted
+
+def run_daily(db: Session, today: date = None) -> dict:
+    """Jeden przebieg wszystkich zadań dziennych"""
+    today = today or date.today()
+    result = {"planned": 0, "realized": 0, "snapshots": 0}
+    try:
+        result["planned"] = recurring_schedule.generate_due(db, RECURRING_AHEAD_DAYS, today)
+        db.commit()
+
+        if AUTO_REALIZE_PLANNED:
+            result["realized"] = promote_planned(db, today)
+
+        yesterday = today - timedelta(days=1)
+        if not db.query(models.BalanceSnapshot.id).filter(models.BalanceSnapshot.date == yesterday).first():
+            result["snapshots"] = ledger.take_snapshots(db, yesterday)
+            db.commit()
+    except Exception:
+        db.rollback()
+        logger.exception("Błąd zadań dziennych")
+        raise
+    finally:
+        if result["planned"] or result["realized"]:
+            categorizer.invalidate()
+
+    logger.info("Zadania dzienne %s: %s", today, result)
+    return result
+
+def run_daily_once():
+    db = database.SessionLocal()
+    try:
+        return run_daily(db)
+    finally:
+        db.close()
+
+def seconds_until_next_run(now: datetime = None) -> float:
+    now = now or datetime.now()
+    next_run = now.replace(hour=SCHEDULER_HOUR, minute=0, second=0, microsecond=0)
+    if next_run <= now: next_run += timedelta(days=1)
+    return (next_run - now).total_seconds()
+
+async def run_forever():
+    """Pętla harmonogramu: przebieg od razu (nadrobienie), potem codziennie o SCHEDULER_HOUR"""
+    while True:
+        try:
+            # Zapytania synchroniczne poza pętlą zdarzeń
+            await run_in_threadpool(run_daily_once)
+        except Exception:
+            pass  # Już zalogowane - kolejna próba przy następnym przebiegu
+        await asyncio.sleep(seconds_until_next_run())
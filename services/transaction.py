@@ -3,7 +3,9 @@ from fastapi import HTTPException
 from typing import Optional
 from datetime import date
 import models, schemas, utils
-from sqlalchemy import func
+from money import to_money
+from services import description_search, categorizer, rollup
+from sqlalchemy import func, case
 
 def create_transaction(db: Session, tx: schemas.TransactionCreate):
     """Tworzy nową transakcję z atomową aktualizacją sald"""
@@ -50,13 +52,15 @@ def create_transaction(db: Session, tx: schemas.TransactionCreate):
         )
         db.add(new_tx)
         db.flush()
+        rollup.add(db, new_tx)
         
         if tx.status == 'zrealizowana':
-            utils.update_balance(db, tx.account_id, tx.amount, tx.type, tx.target_account_id, is_reversal=False)
+            utils.update_balance(db, tx.account_id, tx.amount, tx.type, tx.target_account_id, is_reversal=False, tx_date=tx.date, transaction_id=new_tx.id)
             if tx.loan_id and tx.type == 'expense':
                 utils.update_loan_balance(db, tx.loan_id, tx.amount, is_reversal=False)
         
         db.commit()
+        categorizer.invalidate()
         return new_tx
         
     except Exception as e:
@@ -72,8 +76,9 @@ def update_transaction(db: Session, tx_id: int, tx_data: schemas.TransactionCrea
     
     try:
         # 1. Cofnij skutki starej transakcji
+        rollup.remove(db, old_tx)
         if old_tx.status == 'zrealizowana':
-            utils.update_balance(db, old_tx.account_id, old_tx.amount, old_tx.type, old_tx.target_account_id, is_reversal=True)
+            utils.update_balance(db, old_tx.account_id, old_tx.amount, old_tx.type, old_tx.target_account_id, is_reversal=True, tx_date=old_tx.date, transaction_id=old_tx.id)
             if old_tx.loan_id and old_tx.type == 'expense':
                 utils.update_loan_balance(db, old_tx.loan_id, old_tx.amount, is_reversal=True)
         
@@ -112,14 +117,16 @@ def update_transaction(db: Session, tx_id: int, tx_data: schemas.TransactionCrea
         old_tx.category_id = cat_id
         old_tx.status = tx_data.status
         old_tx.loan_id = tx_data.loan_id
+        rollup.add(db, old_tx)
         
         # 4. Zastosuj skutki nowej transakcji
         if tx_data.status == 'zrealizowana':
-            utils.update_balance(db, tx_data.account_id, tx_data.amount, tx_data.type, tx_data.target_account_id, is_reversal=False)
+            utils.update_balance(db, tx_data.account_id, tx_data.amount, tx_data.type, tx_data.target_account_id, is_reversal=False, tx_date=tx_data.date, transaction_id=old_tx.id)
             if tx_data.loan_id and tx_data.type == 'expense':
                 utils.update_loan_balance(db, tx_data.loan_id, tx_data.amount, is_reversal=False)
         
         db.commit()
+        categorizer.invalidate()
         return old_tx
         
     except Exception as e:
@@ -136,8 +143,9 @@ def delete_transaction(db: Session, tx_id: int):
     
     try:
         # Cofnij skutki transakcji (jeśli była zrealizowana)
+        rollup.remove(db, tx)
         if tx.status == 'zrealizowana':
-            utils.update_balance(db, tx.account_id, tx.amount, tx.type, tx.target_account_id, is_reversal=True)
+            utils.update_balance(db, tx.account_id, tx.amount, tx.type, tx.target_account_id, is_reversal=True, tx_date=tx.date, transaction_id=tx.id)
             if tx.loan_id and tx.type == 'expense':
                 utils.update_loan_balance(db, tx.loan_id, tx.amount, is_reversal=True)
         
@@ -145,45 +153,89 @@ def delete_transaction(db: Session, tx_id: int):
         db.delete(tx)
         
         db.commit()  # COMMIT jeśli wszystko OK
+        categorizer.invalidate()
         
     except Exception as e:
         db.rollback()
         print(f"❌ BŁĄD delete_transaction: {e}")
         raise HTTPException(status_code=500, detail=f"Błąd usuwania transakcji: {str(e)}")
 
-def search_transactions(db: Session, q, date_from, date_to, category_id, account_id, type, min_amount, max_amount):
-    query = db.query(models.Transaction).options(joinedload(models.Transaction.category)).filter(models.Transaction.status == 'zrealizowana')
+def _encode_cursor(t):
+    return f"{t.date.isoformat()}_{t.id}"
 
-    if q: query = query.filter(models.Transaction.description.ilike(f"%{q}%"))
-    if date_from: query = query.filter(models.Transaction.date >= date_from)
-    if date_to: query = query.filter(models.Transaction.date <= date_to)
-    if category_id: query = query.filter(models.Transaction.category_id == category_id)
-    if account_id: query = query.filter((models.Transaction.account_id == account_id) | (models.Transaction.target_account_id == account_id))
-    if type: query = query.filter(models.Transaction.type == type)
-    if min_amount is not None: query = query.filter(models.Transaction.amount >= min_amount)
-    if max_amount is not None: query = query.filter(models.Transaction.amount <= max_amount)
+def _decode_cursor(cursor: str):
+    try:
+        raw_date, raw_id = cursor.split("_", 1)
+        return date.fromisoformat(raw_date), int(raw_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Niepoprawny kursor")
+
+def search_transactions(db: Session, q, date_from, date_to, category_id, account_id, type, min_amount, max_amount, limit: Optional[int] = None, cursor: Optional[str] = None):
+    """
+    Wyszukiwanie z paginacją keyset po (date, id) malejąco.
+    Bez `limit` zwraca cały wynik (zgodność wsteczna). Podsumowanie liczone
+    osobnym agregatem SQL - tylko dla pierwszej strony (bez kursora).
+    """
+    filters = [models.Transaction.status == 'zrealizowana']
+    if q: filters.append(description_search.description_filter(db, q))
+    if date_from: filters.append(models.Transaction.date >= date_from)
+    if date_to: filters.append(models.Transaction.date <= date_to)
+    if category_id: filters.append(models.Transaction.category_id == category_id)
+    if account_id: filters.append((models.Transaction.account_id == account_id) | (models.Transaction.target_account_id == account_id))
+    if type: filters.append(models.Transaction.type == type)
+    if min_amount is not None: filters.append(models.Transaction.amount >= min_amount)
+    if max_amount is not None: filters.append(models.Transaction.amount <= max_amount)
+
+    query = db.query(models.Transaction).options(joinedload(models.Transaction.category)).filter(*filters)
+    if cursor:
+        cursor_date, cursor_id = _decode_cursor(cursor)
+        query = query.filter(
+            (models.Transaction.date < cursor_date) |
+            ((models.Transaction.date == cursor_date) & (models.Transaction.id < cursor_id))
+        )
+    query = query.order_by(models.Transaction.date.desc(), models.Transaction.id.desc())
+
+    next_cursor = None
+    if limit:
+        results = query.limit(limit + 1).all()
+        if len(results) > limit:
+            results = results[:limit]
+            next_cursor = _encode_cursor(results[-1])
+    else:
+        results = query.all()
 
-    results = query.order_by(models.Transaction.date.desc(), models.Transaction.id.desc()).all()
-    
-    total_income = sum(float(t.amount) for t in results if t.type == 'income')
-    total_expense = sum(float(t.amount) for t in results if t.type == 'expense')
-    
     tx_list = []
     for t in results:
         cat_name = t.category.name if t.category else "-"
         if t.type == 'transfer': cat_name = "Transfer"
-        tx_list.append({
-            "id": t.id, "desc": t.description, "amount": float(t.amount),
+        tx_data = {
+            "id": t.id, "desc": t.description, "amount": t.amount,
             "type": t.type, "category": cat_name, "date": str(t.date),
             "account_id": t.account_id, "target_account_id": t.target_account_id
-        })
+        }
+        if t.category and t.type != 'transfer':
+            tx_data["category_icon"] = t.category.icon_name
+            tx_data["category_color"] = t.category.color
+        tx_list.append(tx_data)
 
-    return {
-        "transactions": tx_list,
-        "summary": {
+    summary = None
+    if not cursor:
+        raw_income, raw_expense, count = db.query(
+            func.sum(case((models.Transaction.type == 'income', models.Transaction.amount), else_=0)),
+            func.sum(case((models.Transaction.type == 'expense', models.Transaction.amount), else_=0)),
+            func.count(models.Transaction.id)
+        ).filter(*filters).one()
+        total_income = to_money(raw_income)
+        total_expense = to_money(raw_expense)
+        summary = {
             "income": total_income,
             "expense": total_expense,
             "balance": total_income - total_expense,
-            "count": len(tx_list)
+            "count": count
         }
+
+    return {
+        "transactions": tx_list,
+        "summary": summary,
+        "next_cursor": next_cursor
     }
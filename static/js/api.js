@@ -96,10 +96,14 @@ export const goals = {
         }
 };
 
+// Puste pole oprocentowania ("" z inputa number) -> 0, zamiast 422 z walidacji backendu
+const loanPayload = data => JSON.stringify({ ...data, interest_rate: data.interest_rate === '' || data.interest_rate == null ? 0 : data.interest_rate });
+
 export const loans = {
     async getAll() { return (await authFetch('/api/loans')).json(); },
-    async create(data) { return authFetch('/api/loans', { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify(data) }); },
-    async update(id, data) { return authFetch(`/api/loans/${id}`, { method: 'PUT', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify(data) }); }
+    async create(data) { return authFetch('/api/loans', { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: loanPayload(data) }); },
+    async update(id, data) { return authFetch(`/api/loans/${id}`, { method: 'PUT', headers: { 'Content-Type': 'application/json' }, body: loanPayload(data) }); },
+    async projection(schedule = false) { return (await authFetch(`/api/loans/projection${schedule ? '?schedule=true' : ''}`)).json(); }
 };
 
 export const recurring = {
@@ -108,7 +112,9 @@ export const recurring = {
     async create(data) { return authFetch('/api/recurring', { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify(data) }); },
     async delete(id) { return authFetch(`/api/recurring/${id}`, { method: 'DELETE' }); },
     async process(id, dateStr) { return authFetch(`/api/recurring/${id}/process`, { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify({ date: dateStr }) }); },
-    async skip(id) { return authFetch(`/api/recurring/${id}/skip`, { method: 'POST' }); },
+    async skip(id, dateStr) { return authFetch(`/api/recurring/${id}/skip`, { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify({ date: dateStr || null }) }); },
+    async processBatch(items) { return authFetch('/api/recurring/process-batch', { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify({ items }) }); },
+    async skipBatch(items) { return authFetch('/api/recurring/skip-batch', { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify({ items }) }); },
     async update(id, data) {
             return authFetch(`/api/recurring/${id}`, {
                 method: 'PUT',
@@ -148,6 +154,28 @@ export const importCSV = {
         formData.append('file', file);
         return authFetch('/api/import/preview', { method: 'POST', body: formData });
     },
+    // Podgląd jako zadanie w tle: start -> odpytywanie postępu -> wynik
+    async previewJob(file, onProgress) {
+        const formData = new FormData();
+        formData.append('file', file);
+        const startRes = await authFetch('/api/import/preview/jobs', { method: 'POST', body: formData });
+        if (!startRes.ok) throw new Error('Błąd importu');
+        const { job_id } = await startRes.json();
+        const maxAttempts = 1200;  // 10 minut co 500 ms
+        for (let attempt = 0; ; attempt++) {
+            if (attempt >= maxAttempts) throw new Error('Przekroczono czas oczekiwania na podgląd importu');
+            const pollRes = await authFetch(`/api/import/jobs/${job_id}`);
+            if (!pollRes.ok) throw new Error('Błąd importu');  // np. 404 po restarcie serwera, 401
+            const job = await pollRes.json();
+            if (onProgress) onProgress(job.progress);
+            if (job.status === 'error') throw new Error(job.error || 'Błąd importu');
+            if (job.status === 'done') break;
+            await new Promise(resolve => setTimeout(resolve, 500));
+        }
+        const res = await authFetch(`/api/import/jobs/${job_id}/result`);
+        if (!res.ok) throw new Error('Błąd importu');
+        return res.json();
+    },
     async confirm(accountId, transactions) {
         return authFetch('/api/import/confirm', { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify({ account_id: accountId, transactions }) });
     }
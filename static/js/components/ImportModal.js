@@ -1,10 +1,13 @@
 import * as Utils from '../utils.js';
 export default {
-    props: ['importData', 'categories'],
+    props: ['importData', 'progress', 'categories'],
     emits: ['close', 'submit'],
     setup() { return { ...Utils }; },
     template: `
-    <div class="fixed inset-0 z-[80] bg-black/90 backdrop-blur-sm flex flex-col p-4 animate-fade-in">
+    <div v-if="!importData" class="fixed inset-0 z-[80] bg-black/90 backdrop-blur-sm flex items-center justify-center p-4 animate-fade-in">
+        <div class="glass-panel p-6 rounded-2xl w-full max-w-sm text-center"><h2 class="text-lg font-bold text-white mb-4">Analizuję plik...</h2><div class="w-full bg-slate-700 h-2 rounded-full overflow-hidden"><div class="bg-blue-500 h-full transition-all" :style="{ width: (progress || 0) + '%' }"></div></div><div class="text-xs text-slate-400 mt-2">{{ progress || 0 }}%</div></div>
+    </div>
+    <div v-else class="fixed inset-0 z-[80] bg-black/90 backdrop-blur-sm flex flex-col p-4 animate-fade-in">
         <div class="flex justify-between items-center mb-4 shrink-0"><h2 class="text-xl font-bold text-white">Weryfikacja Importu</h2><div class="flex gap-2"><button @click="$emit('close')" class="px-4 py-2 rounded-xl bg-slate-800 text-slate-400 font-bold text-sm">Anuluj</button><button @click="$emit('submit')" class="px-4 py-2 rounded-xl bg-green-600 text-white font-bold text-sm shadow-lg shadow-green-900/20">Zatwierdź ({{ importData.filter(t => !t.ignore).length }})</button></div></div>
         <div class="flex-1 overflow-y-auto bg-slate-900/50 rounded-2xl border border-slate-800">
             <table class="w-full text-left border-collapse">
@@ -1,17 +1,21 @@
 import * as Utils from '../utils.js';
 export default {
-    props: ['filteredLoans', 'showPaidLoans', 'showAddLoan', 'newLoan', 'showAddRecurring', 'newRecurring', 'recurringList', 'accounts', 'filteredCategories', 'categorySearch'],
+    props: ['filteredLoans', 'loanProjection', 'showPaidLoans', 'showAddLoan', 'newLoan', 'showAddRecurring', 'newRecurring', 'recurringList', 'accounts', 'filteredCategories', 'categorySearch'],
     emits: ['update:showPaidLoans', 'update:showAddLoan', 'update:showAddRecurring', 'update:categorySearch', 'submit-loan', 'edit-loan', 'submit-recurring', 'delete-recurring','edit-recurring'],
     data() { return { showCategorySelector: false } },
     setup() { return { ...Utils }; },
+    computed: {
+        payoffByLoan() { return Object.fromEntries(((this.loanProjection && this.loanProjection.loans) || []).map(p => [p.loan_id, p])); }
+    },
     template: `
     <div class="px-6">
         <h2 class="text-xl font-bold text-white mb-6 mt-4">Zobowiązania</h2>
         <div class="mb-8">
             <div class="flex justify-between items-center mb-4"><h3 class="text-sm font-bold text-slate-400 uppercase">Kredyty i Raty</h3><button @click="$emit('update:showAddLoan', !showAddLoan)" class="text-blue-400 text-xs font-bold">{{ showAddLoan ? 'Anuluj' : '+ Dodaj' }}</button></div>
+            <div v-if="loanProjection && loanProjection.loans.length" class="glass-panel p-4 rounded-2xl mb-4 flex justify-between text-xs text-slate-400"><div>Wolny od długów: <span class="text-slate-200 font-bold">{{ loanProjection.debt_free_date || 'rata nie pokrywa odsetek' }}</span></div><div>Odsetki do końca: <span class="text-slate-200">{{ formatMoney(loanProjection.total_interest) }}</span></div></div>
             <div class="flex justify-end mb-2"><label class="flex items-center gap-2 text-xs text-slate-400"><input type="checkbox" :checked="showPaidLoans" @change="$emit('update:showPaidLoans', $event.target.checked)"> Pokaż spłacone</label></div>
-            <div v-if="showAddLoan" class="glass-panel p-4 rounded-2xl mb-4"><div class="space-y-3"><input v-model="newLoan.name" placeholder="Nazwa" class="input-dark w-full p-3 rounded-xl text-sm"><input v-model="newLoan.total_amount" type="number" placeholder="Kwota całk." class="input-dark w-full p-3 rounded-xl text-sm"><input v-model="newLoan.remaining_amount" type="number" placeholder="Pozostało" class="input-dark w-full p-3 rounded-xl text-sm"><input v-model="newLoan.monthly_payment" type="number" placeholder="Rata" class="input-dark w-full p-3 rounded-xl text-sm"><input v-model="newLoan.next_payment_date" type="date" class="input-dark w-full p-3 rounded-xl text-sm"><button @click="$emit('submit-loan')" class="w-full bg-blue-600 py-3 rounded-xl font-bold text-sm">Dodaj</button></div></div>
-            <div class="space-y-4"><div v-for="loan in filteredLoans" :key="loan.id" class="glass-panel p-5 rounded-2xl border-l-4" :class="loan.remaining <= 0 ? 'border-green-500 opacity-60' : 'border-red-500'"><div class="flex justify-between items-start mb-2"><div><div class="font-bold text-lg text-white">{{ loan.name }}</div><div :class="loan.remaining <= 0 ? 'text-green-400' : 'text-red-400'" class="font-bold">{{ formatMoney(loan.remaining) }}</div></div><button @click="$emit('edit-loan', loan)" class="text-slate-500 hover:text-blue-400 p-1">✎</button></div><div class="w-full bg-slate-700 h-2 rounded-full mb-3 overflow-hidden"><div class="bg-green-500 h-full" :style="{ width: calculateProgress(loan) + '%' }"></div></div><div class="flex justify-between text-xs text-slate-400"><div>Rata: <span class="text-slate-200">{{ formatMoney(loan.monthly) }}</span></div><div>Termin: <span class="text-slate-200">{{ loan.next_date }}</span></div></div></div></div>
+            <div v-if="showAddLoan" class="glass-panel p-4 rounded-2xl mb-4"><div class="space-y-3"><input v-model="newLoan.name" placeholder="Nazwa" class="input-dark w-full p-3 rounded-xl text-sm"><input v-model="newLoan.total_amount" type="number" placeholder="Kwota całk." class="input-dark w-full p-3 rounded-xl text-sm"><input v-model="newLoan.remaining_amount" type="number" placeholder="Pozostało" class="input-dark w-full p-3 rounded-xl text-sm"><input v-model="newLoan.monthly_payment" type="number" placeholder="Rata" class="input-dark w-full p-3 rounded-xl text-sm"><input v-model="newLoan.interest_rate" type="number" min="0" max="999.999" step="0.01" placeholder="Oprocentowanie (% rocznie)" class="input-dark w-full p-3 rounded-xl text-sm"><input v-model="newLoan.next_payment_date" type="date" class="input-dark w-full p-3 rounded-xl text-sm"><button @click="$emit('submit-loan')" class="w-full bg-blue-600 py-3 rounded-xl font-bold text-sm">Dodaj</button></div></div>
+            <div class="space-y-4"><div v-for="loan in filteredLoans" :key="loan.id" class="glass-panel p-5 rounded-2xl border-l-4" :class="loan.remaining <= 0 ? 'border-green-500 opacity-60' : 'border-red-500'"><div class="flex justify-between items-start mb-2"><div><div class="font-bold text-lg text-white">{{ loan.name }}</div><div :class="loan.remaining <= 0 ? 'text-green-400' : 'text-red-400'" class="font-bold">{{ formatMoney(loan.remaining) }}</div></div><button @click="$emit('edit-loan', loan)" class="text-slate-500 hover:text-blue-400 p-1">✎</button></div><div class="w-full bg-slate-700 h-2 rounded-full mb-3 overflow-hidden"><div class="bg-green-500 h-full" :style="{ width: calculateProgress(loan) + '%' }"></div></div><div class="flex justify-between text-xs text-slate-400"><div>Rata: <span class="text-slate-200">{{ formatMoney(loan.monthly) }}</span></div><div>Termin: <span class="text-slate-200">{{ loan.next_date }}</span></div></div><div v-if="loan.remaining > 0 && payoffByLoan[loan.id]" class="text-xs text-slate-400 mt-1">Spłata: <span class="text-slate-200">{{ payoffByLoan[loan.id].payoff_date || 'nie spłaca się (rata ≤ odsetki)' }}</span></div></div></div>
         </div>
         <div>
             <div class="flex justify-between items-center mb-4"><h3 class="text-sm font-bold text-slate-400 uppercase">Stałe Opłaty (Subskrypcje)</h3><button @click="$emit('update:showAddRecurring', !showAddRecurring)" class="text-blue-400 text-xs font-bold">{{ showAddRecurring ? 'Anuluj' : '+ Dodaj' }}</button></div>
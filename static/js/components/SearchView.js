@@ -1,7 +1,7 @@
 import * as Utils from '../utils.js';
 export default {
-    props: ['searchCriteria', 'searchResults', 'searchSummary', 'categories'],
-    emits: ['close', 'perform-search', 'clear-filters', 'apply-preset'],
+    props: ['searchCriteria', 'searchResults', 'searchSummary', 'hasMore', 'categories'],
+    emits: ['close', 'perform-search', 'clear-filters', 'apply-preset', 'load-more'],
     setup() { return { ...Utils }; },
     template: `
     <div class="fixed inset-0 z-[100] bg-slate-900 flex flex-col animate-fade-in">
@@ -18,6 +18,7 @@ export default {
                 <div class="flex justify-between items-center mb-4"><h3 class="text-slate-400 text-xs font-bold uppercase tracking-wider">Wyniki: {{ searchSummary.count }}</h3></div>
                 <div class="grid grid-cols-3 gap-2 mb-6"><div class="bg-green-500/10 border border-green-500/20 p-2 rounded-xl text-center"><div class="text-[10px] text-green-400 font-bold uppercase">Przychody</div><div class="text-sm font-bold text-white">{{ formatMoney(searchSummary.income) }}</div></div><div class="bg-red-500/10 border border-red-500/20 p-2 rounded-xl text-center"><div class="text-[10px] text-red-400 font-bold uppercase">Wydatki</div><div class="text-sm font-bold text-white">{{ formatMoney(searchSummary.expense) }}</div></div><div class="bg-blue-500/10 border border-blue-500/20 p-2 rounded-xl text-center"><div class="text-[10px] text-blue-400 font-bold uppercase">Bilans</div><div class="text-sm font-bold text-white">{{ formatMoney(searchSummary.balance) }}</div></div></div>
                 <div class="space-y-3"><div v-if="searchResults.length === 0" class="text-center text-slate-500 py-10">Brak wyników dla tych kryteriów</div><div v-for="tx in searchResults" :key="tx.id" class="glass-panel p-3 rounded-2xl flex items-center gap-3"><div :class="getIconClass(tx.type)" class="w-10 h-10 rounded-full flex items-center justify-center text-lg relative shrink-0">{{ getIcon(tx.type) }}</div><div class="flex-1 min-w-0"><div class="font-semibold text-slate-200 text-sm truncate pr-1">{{ tx.desc }}</div><div class="text-xs text-slate-500 truncate">{{ tx.category }} • {{ formatDateShort(tx.date) }}</div></div><div class="flex flex-col items-end gap-1 shrink-0"><div :class="getColorClass(tx.type)" class="font-bold text-sm whitespace-nowrap">{{ tx.type === 'income' ? '+' : (tx.type === 'transfer' ? '' : '-') }}{{ formatMoney(tx.amount) }}</div></div></div></div>
+                <button v-if="hasMore" @click="$emit('load-more')" class="w-full mt-4 bg-slate-800 text-slate-300 text-xs font-bold py-3 rounded-xl border border-slate-700">Załaduj więcej</button>
             </div>
         </div>
     </div>`
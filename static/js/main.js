@@ -1,6 +1,6 @@
 import { createApp } from 'https://unpkg.com/vue@3/dist/vue.esm-browser.js';
 import * as Utils from './utils.js';
-import * as API from './api.js?v=54';
+import * as API from './api.js?v=61';
 import * as Charts from './charts.js';
 
 // Import Komponentów
@@ -8,14 +8,16 @@ import LoginView from './components/LoginView.js';
 import DashboardView from './components/DashboardView.js?v=53';
 import AccountsView from './components/AccountsView.js';
 import GoalsView from './components/GoalsView.js?v=2';
-import PaymentsView from './components/PaymentsView.js?v=3';
+import PaymentsView from './components/PaymentsView.js?v=6';
 import SettingsView from './components/SettingsView.js?v=52';
 import AddTransactionView from './components/AddTransactionView.js?V=6';
-import SearchView from './components/SearchView.js';
-import ImportModal from './components/ImportModal.js';
+import SearchView from './components/SearchView.js?v=2';
+import ImportModal from './components/ImportModal.js?v=2';
 import TheNavigation from './components/TheNavigation.js?v=2';
 import LoanAlertsModal from './components/LoanAlertsModal.js?v=1';  // NOWY
 
+const SEARCH_PAGE_SIZE = 100;
+
 const app = createApp({
     components: {
         LoginView, DashboardView, AccountsView, GoalsView, PaymentsView, SettingsView, AddTransactionView, SearchView, ImportModal, TheNavigation, LoanAlertsModal
@@ -41,8 +43,8 @@ const app = createApp({
             fundData: { source_account_id: null, target_savings_id: null, amount: '' },
             transferData: { target_goal_id: null, amount: '' },
             searchCriteria: { q: '', date_from: '', date_to: '', category_id: null, account_id: null, type: 'all', min_amount: '', max_amount: '' },
-            searchResults: null, searchSummary: { income: 0, expense: 0, balance: 0, count: 0 },
-            importAccountId: null, importData: null, importTargetAccountId: null,
+            searchResults: null, searchSummary: { income: 0, expense: 0, balance: 0, count: 0 }, searchCursor: null, searchParams: null,
+            importAccountId: null, importData: null, importTargetAccountId: null, importProgress: null,
             
             // Filtry
             filterStatus: 'all', filterAccount: '', isPlanned: false, newCategoryName: '', categorySearch: '',
@@ -55,6 +57,7 @@ const app = createApp({
             dashboard: { total_balance: 0, disposable_balance: 0, forecast_ror: 0, savings_realized: 0, savings_rate: 0, total_debt: 0, monthly_income_realized: 0, monthly_income_forecast: 0, monthly_expenses_realized: 0, monthly_expenses_forecast: 0, goals_monthly_need: 0, goals_total_saved: 0, recent_transactions: [], period_start: '', period_end: '' },
             accounts: [], categories: [],
             loansData: { loans: []},
+            loanProjection: null,
             loanAlerts: {
                 overdue: [],
                 urgent: [],
@@ -72,7 +75,7 @@ const app = createApp({
             
             // Nowe obiekty
             newTx: { description: '', amount: '', type: 'expense', account_id: null, target_account_id: null, category_name: '', loan_id: null, date: new Date().toISOString().split('T')[0] },
-            newLoan: { name: '', total_amount: '', remaining_amount: '', monthly_payment: '', next_payment_date: new Date().toISOString().split('T')[0] },
+            newLoan: { name: '', total_amount: '', remaining_amount: '', monthly_payment: '', interest_rate: 0, next_payment_date: new Date().toISOString().split('T')[0] },
             newGoal: { name: '', target_amount: '', deadline: new Date().toISOString().split('T')[0], account_id: null },
             newRecurring: { name: '', amount: '', day_of_month: '', category_name: '', account_id: null },
             newOverride: { year: new Date().getFullYear(), month: new Date().getMonth() + 1, day: 25 },
@@ -355,6 +358,8 @@ const app = createApp({
             
             const data = await API.loans.getAll();
             this.loansData = { loans: data.loans };
+            // Projekcja spłaty (data wolności od długów) - pomocnicza, błąd nie blokuje listy
+            API.loans.projection().then(p => { this.loanProjection = p; }).catch(e => console.error(e));
             
             // Zapisz alerty
             if (data.alerts) {
@@ -405,8 +410,8 @@ const app = createApp({
         async deleteAccount(id) { if(!confirm("Usunąć?")) return; await API.accounts.delete(id); this.fetchAccounts(); this.fetchData(); this.notify('info', 'Usunięto'); },
         async editAccount(acc) { const newName = prompt("Nazwa:", acc.name); if(!newName) return; const newBalance = prompt("Saldo:", acc.balance); const isSavings = confirm("Oszczędnościowe?"); await API.accounts.update(acc.id, { name: newName, type: acc.type, balance: parseFloat(newBalance), is_savings: isSavings }); this.fetchAccounts(); this.notify('success', 'Zaktualizowano'); },
 
-        async submitLoan() { await API.loans.create(this.newLoan); this.showAddLoan = false; this.fetchLoans(); this.notify('success', 'Dodano'); },
-        async updateLoan() { await API.loans.update(this.editingLoan.id, this.editingLoan); this.editingLoan = null; this.fetchLoans(); this.notify('success', 'Zaktualizowano'); },
+        async submitLoan() { const res = await API.loans.create(this.newLoan); if (!res.ok) return this.notify('error', 'Sprawdź dane kredytu (oprocentowanie 0–999%)'); this.showAddLoan = false; this.fetchLoans(); this.notify('success', 'Dodano'); },
+        async updateLoan() { const res = await API.loans.update(this.editingLoan.id, this.editingLoan); if (!res.ok) return this.notify('error', 'Sprawdź dane kredytu (oprocentowanie 0–999%)'); this.editingLoan = null; this.fetchLoans(); this.notify('success', 'Zaktualizowano'); },
         
         async submitGoal() { if (!this.newGoal.account_id) return this.notify('error', "Wybierz konto!"); await API.goals.create(this.newGoal); this.showAddGoal = false; this.fetchGoals(); this.newGoal = { name: '', target_amount: '', deadline: new Date().toISOString().split('T')[0], account_id: null }; this.notify('success', 'Utworzono'); },
         async deleteGoal(id) {
@@ -501,8 +506,17 @@ const app = createApp({
         async processRecurring(pay) {
             // Użyj daty z payment_date (obliczonej przez backend):
             const paymentDate = pay.payment_date || new Date().toISOString().split('T')[0];
-            await API.recurring.process(pay.id, paymentDate); this.duePayments = this.duePayments.filter(p => p.id !== pay.id); this.fetchData(); this.fetchAccounts(); this.notify('success', 'Zaksięgowano'); },
-        async skipRecurring(pay) { if(!confirm("Pominąć?")) return; await API.recurring.skip(pay.id); this.duePayments = this.duePayments.filter(p => p.id !== pay.id); this.notify('info', 'Pominięto'); },
+            const res = await API.recurring.process(pay.id, paymentDate);
+            if (res.status === 409) { this.duePayments = this.duePayments.filter(p => p.id !== pay.id); this.notify('info', 'Już zaksięgowano w tym cyklu'); return; }
+            this.duePayments = this.duePayments.filter(p => p.id !== pay.id); this.fetchData(); this.fetchAccounts(); this.notify('success', 'Zaksięgowano'); },
+        async processAllRecurring() {
+            // Cały cykl jednym żądaniem (jedna transakcja w bazie)
+            const response = await API.recurring.processBatch(this.duePayments.map(p => ({ id: p.id, date: p.payment_date })));
+            if (!response.ok) { this.notify('error', 'Nie udało się zaksięgować płatności'); return; }
+            const res = await response.json();
+            const done = new Set(res.results.filter(r => r.status === 'processed' || r.status === 'already_processed').map(r => r.id));
+            this.duePayments = this.duePayments.filter(p => !done.has(p.id)); this.fetchData(); this.fetchAccounts(); this.notify('success', `Zaksięgowano: ${res.processed}`); },
+        async skipRecurring(pay) { if(!confirm("Pominąć?")) return; await API.recurring.skip(pay.id, pay.payment_date); this.duePayments = this.duePayments.filter(p => p.id !== pay.id); this.notify('info', 'Pominięto'); },
 
         async addCategory(catData) {
             if(!catData.name) return;
@@ -566,19 +580,40 @@ const app = createApp({
             if(this.searchCriteria.type && this.searchCriteria.type !== 'all') params.append('type', this.searchCriteria.type);
             if(this.searchCriteria.min_amount) params.append('min_amount', this.searchCriteria.min_amount);
             if(this.searchCriteria.max_amount) params.append('max_amount', this.searchCriteria.max_amount);
+            params.append('limit', SEARCH_PAGE_SIZE);
+            this.searchParams = params;
 
             API.transactions.search(params.toString()).then(data => {
                 this.searchResults = data.transactions;
                 this.searchSummary = data.summary;
+                this.searchCursor = data.next_cursor;
+            });
+        },
+        loadMoreSearch() {
+            if (!this.searchCursor || !this.searchParams) return;
+            const params = new URLSearchParams(this.searchParams);
+            params.append('cursor', this.searchCursor);
+            API.transactions.search(params.toString()).then(data => {
+                this.searchResults = this.searchResults.concat(data.transactions);
+                this.searchCursor = data.next_cursor;
             });
         },
         clearSearchFilters() {
             this.searchCriteria = { q: '', date_from: '', date_to: '', category_id: null, account_id: null, type: 'all', min_amount: '', max_amount: '' };
             this.searchResults = null;
+            this.searchCursor = null;
         },
 
         triggerImport(accountId) { this.importTargetAccountId = accountId; const input = document.createElement('input'); input.type = 'file'; input.accept = '.csv'; input.onchange = e => { if (e.target.files.length > 0) this.processImportFile(e.target.files[0]); }; input.click(); },
-        async processImportFile(file) { try { const res = await API.importCSV.preview(file); if (!res.ok) throw new Error("Błąd"); const data = await res.json(); if (data.length === 0) return this.notify('error', "Brak danych"); this.importData = data.map(tx => ({...tx, ignore: false})); } catch (e) { this.notify('error', "Błąd importu"); } },
+        async processImportFile(file) {
+            this.importProgress = 0;
+            try {
+                const data = await API.importCSV.previewJob(file, progress => { this.importProgress = progress; });
+                if (data.length === 0) return this.notify('error', "Brak danych");
+                this.importData = data.map(tx => ({...tx, ignore: false}));
+            } catch (e) { this.notify('error', e.message || "Błąd importu"); }
+            finally { this.importProgress = null; }
+        },
         async submitImport() {
             if (!this.importData || !this.importTargetAccountId) return;
             const toImport = this.importData.filter(tx => !tx.ignore);
@@ -663,7 +698,7 @@ const app = createApp({
             if (desc.length < 3) return;
             
             // Szukaj w CAŁEJ BAZIE (nie tylko recent):
-            API.transactions.search(`q=${desc}&type=${this.newTx.type}`)
+            API.transactions.search(`q=${desc}&type=${this.newTx.type}&limit=20`)
                 .then(data => {
                     if (data.transactions && data.transactions.length > 0) {
                         // Pierwsza znaleziona z kategorią:
@@ -688,7 +723,7 @@ const app = createApp({
         editTx(tx) { this.editingTxId = tx.id; this.isPlanned = (tx.status === 'planowana'); this.newTx = { description: tx.desc, amount: tx.amount, type: tx.type, account_id: tx.account_id, category_name: tx.category_name, loan_id: tx.loan_id, date: tx.date.split('T')[0], target_account_id: tx.target_account_id }; this.currentTab = 'add'; },
         cancelEdit() { this.resetForm(); this.currentTab = 'dashboard'; },
         resetForm() { this.editingTxId = null; this.isPlanned = false; this.showCategorySelector = false; this.newTx = { description: '', amount: '', type: 'expense', account_id: this.accounts[0]?.id, target_account_id: null, category_name: '', loan_id: null, date: new Date().toISOString().split('T')[0] }; },
-        editLoan(loan) { this.editingLoan = { ...loan, total_amount: loan.total, remaining_amount: loan.remaining, monthly_payment: loan.monthly, next_payment_date: loan.next_date }; },
+        editLoan(loan) { this.editingLoan = { ...loan, total_amount: loan.total, remaining_amount: loan.remaining, monthly_payment: loan.monthly, interest_rate: loan.interest_rate || 0, next_payment_date: loan.next_date }; },
         openFundGoal(goal) { this.fundingGoal = goal; const defaultSource = this.accounts[0]?.id; const defaultTarget = this.savingsAccounts[0]?.id; this.fundData = { source_account_id: defaultSource, target_savings_id: defaultTarget, amount: '' }; },
         openTransferGoal(goal) { this.transferingGoal = goal; this.transferData = { target_goal_id: null, amount: '' }; },
         openWithdrawGoal(goal) { this.withdrawingGoal = goal; const defaultTarget = this.accounts.find(a => !a.is_savings) || this.accounts[0]; this.withdrawData = { target_account_id: defaultTarget ? defaultTarget.id : null, amount: '' }; },
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# Silnik tworzony jest przy imporcie database.py - baza testowa musi być ustawiona wcześniej
+os.environ["DATABASE_URL"] = "sqlite:///:memory:"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,36 @@
+from datetime import date
+from types import SimpleNamespace
+import pytest
+from sqlalchemy.dialects import mysql
+import database, models
+from services import description_search
+
+@pytest.fixture
+def db():
+    models.Base.metadata.create_all(bind=database.engine)
+    session = database.SessionLocal()
+    for description in ("BIEDRONKA 1234 WARSZAWA", "Zakupy w Lidlu", "Przelew (Biedronka)"):
+        session.add(models.Transaction(description=description, amount=10, date=date(2026, 10, 1), type="expense", status="zrealizowana"))
+    session.commit()
+    yield session
+    session.close()
+    models.Base.metadata.drop_all(bind=database.engine)
+
+def _search(db, text, **kwargs):
+    return sorted(t.description for t in db.query(models.Transaction).filter(description_search.description_filter(db, text, **kwargs)))
+
+def test_substring_matches_mid_word(db):
+    assert _search(db, "onka") == ["BIEDRONKA 1234 WARSZAWA", "Przelew (Biedronka)"]
+    assert _search(db, "lidl") == ["Zakupy w Lidlu"]
+
+def test_word_mode_matches_word_starts_only(db):
+    assert _search(db, "onka", words=True) == []
+    assert _search(db, "biedronka", words=True) == ["BIEDRONKA 1234 WARSZAWA"]
+    assert _search(db, "lid", words=True) == ["Zakupy w Lidlu"]
+
+def test_mysql_substring_search_does_not_use_fulltext():
+    fake_db = SimpleNamespace(get_bind=lambda: SimpleNamespace(dialect=SimpleNamespace(name="mysql")))
+    plain = str(description_search.description_filter(fake_db, "onka").compile(dialect=mysql.dialect()))
+    assert "MATCH" not in plain
+    words = str(description_search.description_filter(fake_db, "biedronka", words=True).compile(dialect=mysql.dialect()))
+    assert "MATCH" in words
@@ -1,12 +1,12 @@
 from sqlalchemy.orm import Session
-from datetime import date, timedelta
+from datetime import date, datetime, timedelta
+from money import to_money
 import calendar
-import models
+import threading
+import models, response_cache
 
 # --- LOGIKA DAT ---
-def get_actual_payday(year, month, db: Session):
-    override = db.query(models.PaydayOverride).filter(models.PaydayOverride.year == year, models.PaydayOverride.month == month).first()
-    if override: return date(year, month, override.day)
+def _default_payday(year, month):
     try: base_date = date(year, month, 25)
     except ValueError: base_date = date(year, month, 1) + timedelta(days=27)
     weekday = base_date.weekday()
@@ -14,41 +14,110 @@ def get_actual_payday(year, month, db: Session):
     elif weekday == 6: return base_date - timedelta(days=2)
     return base_date
 
-def get_billing_period(db: Session, offset: int = 0):
+# --- KALENDARZ WYPŁAT (cache procesu) ---
+# Nadpisania wypłat ładowane raz do słownika {(rok, miesiąc): data}, wraz z datami wypłat
+# przeliczonymi na okno +/- PAYDAY_WINDOW_YEARS lat. Ważny dla wersji danych
+# (response_cache.data_version) - zmiana nadpisania w innym procesie też go unieważnia.
+# Wersję sprawdzamy raz na sesję (db.info), nie przy każdym wyliczeniu okresu.
+PAYDAY_WINDOW_YEARS = 5
+_payday_calendar = None
+_payday_lock = threading.Lock()
+
+def invalidate_payday_calendar():
+    global _payday_calendar
+    with _payday_lock:
+        _payday_calendar = None
+
+def _get_payday_calendar(db: Session):
+    global _payday_calendar
+    if "payday_version" not in db.info:
+        db.info["payday_version"] = response_cache.data_version(db)
+    version = db.info["payday_version"]
+    calendar_ = _payday_calendar
+    if calendar_ is not None and calendar_["version"] >= version:
+        return calendar_
+    with _payday_lock:
+        if _payday_calendar is None or _payday_calendar["version"] < version:
+            overrides = {(o.year, o.month): o.day for o in db.query(models.PaydayOverride).all()}
+            this_year = date.today().year
+            paydays = {}
+            for year in range(this_year - PAYDAY_WINDOW_YEARS, this_year + PAYDAY_WINDOW_YEARS + 1):
+                for month in range(1, 13):
+                    if (year, month) in overrides: paydays[(year, month)] = date(year, month, overrides[(year, month)])
+                    else: paydays[(year, month)] = _default_payday(year, month)
+            _payday_calendar = {"version": version, "overrides": overrides, "paydays": paydays}
+        return _payday_calendar
+
+def get_actual_payday(year, month, db: Session):
+    calendar_ = _get_payday_calendar(db)
+    payday = calendar_["paydays"].get((year, month))
+    if payday: return payday
+    # Poza oknem - liczymy w locie (bez bazy)
+    override_day = calendar_["overrides"].get((year, month))
+    if override_day: return date(year, month, override_day)
+    return _default_payday(year, month)
+
+def _shift_month(year, month, offset):
+    month_index = year * 12 + (month - 1) + offset
+    return month_index // 12, month_index % 12 + 1
+
+def _current_base_month(db: Session):
     today = date.today()
     current_month_payday = get_actual_payday(today.year, today.month, db)
     if today < current_month_payday:
-        base_month = today.month - 1
-        base_year = today.year
-        if base_month < 1: base_month = 12; base_year -= 1
-    else:
-        base_month = today.month
-        base_year = today.year
-    target_month = base_month + offset
-    target_year = base_year
-    while target_month > 12: target_month -= 12; target_year += 1
-    while target_month < 1: target_month += 12; target_year -= 1
+        return _shift_month(today.year, today.month, -1)
+    return today.year, today.month
+
+def get_billing_period(db: Session, offset: int = 0):
+    base_year, base_month = _current_base_month(db)
+    target_year, target_month = _shift_month(base_year, base_month, offset)
     start_date = get_actual_payday(target_year, target_month, db)
-    next_m = target_month + 1
-    next_y = target_year
-    if next_m > 12: next_m = 1; next_y += 1
+    next_y, next_m = _shift_month(target_year, target_month, 1)
     next_payday = get_actual_payday(next_y, next_m, db)
     end_date = next_payday - timedelta(days=1)
     return start_date, end_date
 
+def get_billing_periods(db: Session, offset: int = 0, count: int = 1):
+    """Zwraca listę `count` kolejnych okresów (start, end) od `offset` - z kalendarza w pamięci"""
+    base_year, base_month = _current_base_month(db)
+    paydays = [get_actual_payday(*_shift_month(base_year, base_month, offset + i), db) for i in range(count + 1)]
+    return [(paydays[i], paydays[i + 1] - timedelta(days=1)) for i in range(count)]
+
 # --- POMOCNICZE DO SALD ---
-def update_balance(db, account_id, amount, type, target_id, is_reversal):
-    acc = db.query(models.Account).filter(models.Account.id == account_id).first()
-    if not acc: return
-    val = float(amount)
+# Salda zmieniane atomowo (UPDATE ... SET balance = balance + :delta), bez read-modify-write,
+# a każda delta trafia do dziennika balance_entries.
+def apply_balance_deltas(db, account_id, deltas_by_date: dict, kind: str = "transaction", transaction_id=None):
+    """Jedna aktualizacja salda na sumę delt + wpis w dzienniku per data. Zwraca False, gdy konta brak."""
+    deltas = {d: to_money(v) for d, v in deltas_by_date.items() if v}
+    if not deltas: return True
+    total = sum(deltas.values())
+    updated = db.query(models.Account).filter(models.Account.id == account_id).update(
+        {models.Account.balance: models.Account.balance + total}, synchronize_session=False
+    )
+    if not updated: return False
+    db.bulk_insert_mappings(models.BalanceEntry, [
+        {"account_id": account_id, "delta": delta, "date": entry_date, "kind": kind, "transaction_id": transaction_id, "created_at": datetime.utcnow()}
+        for entry_date, delta in deltas.items()
+    ])
+    # Wpis wsteczny unieważnia snapshoty od swojej daty (zostaną odtworzone przy kolejnym zrzucie)
+    db.query(models.BalanceSnapshot).filter(
+        models.BalanceSnapshot.account_id == account_id,
+        models.BalanceSnapshot.date >= min(deltas)
+    ).delete(synchronize_session=False)
+    return True
+
+def apply_balance_delta(db, account_id, delta, entry_date=None, kind: str = "transaction", transaction_id=None):
+    return apply_balance_deltas(db, account_id, {entry_date or date.today(): delta}, kind, transaction_id)
+
+def update_balance(db, account_id, amount, type, target_id, is_reversal, tx_date=None, transaction_id=None):
+    val = to_money(amount)
     if is_reversal: val = -val
-    if type == 'income': acc.balance = float(acc.balance) + val
-    elif type == 'expense': acc.balance = float(acc.balance) - val
+    if type == 'income': apply_balance_delta(db, account_id, val, tx_date, transaction_id=transaction_id)
+    elif type == 'expense': apply_balance_delta(db, account_id, -val, tx_date, transaction_id=transaction_id)
     elif type == 'transfer':
-        acc.balance = float(acc.balance) - val
+        if not apply_balance_delta(db, account_id, -val, tx_date, transaction_id=transaction_id): return
         if target_id:
-            acc_target = db.query(models.Account).filter(models.Account.id == target_id).first()
-            if acc_target: acc_target.balance = float(acc_target.balance) + val
+            apply_balance_delta(db, target_id, val, tx_date, transaction_id=transaction_id)
 
 def add_months(sourcedate, months):
     month = sourcedate.month - 1 + months
@@ -62,15 +131,15 @@ def update_loan_balance(db, loan_id, amount, is_reversal):
     loan = db.query(models.Loan).filter(models.Loan.id == loan_id).first()
     if not loan: return
     
-    val = float(amount)
+    val = to_money(amount)
     
     if is_reversal:
         # Cofnięcie transakcji: zwiększamy dług, cofamy datę
-        loan.remaining_amount = float(loan.remaining_amount) + val
+        loan.remaining_amount = to_money(loan.remaining_amount) + val
         if loan.next_payment_date:
             loan.next_payment_date = add_months(loan.next_payment_date, -1)
     else:
         # Nowa transakcja: zmniejszamy dług, przesuwamy datę do przodu
-        loan.remaining_amount = float(loan.remaining_amount) - val
+        loan.remaining_amount = to_money(loan.remaining_amount) - val
         if loan.next_payment_date:
             loan.next_payment_date = add_months(loan.next_payment_date, 1)
@@ -0,0 +1,24 @@
+import sys
+import os
+import asyncio
+import logging
+
+sys.path.append(os.getcwd())
+
+# Osobny proces zadań w tle (zamiast SCHEDULER_ENABLED=1 w aplikacji - np. przy kilku workerach uvicorna,
+# żeby harmonogram działał dokładnie raz). Commity workera podbijają wspólną wersję danych
+# (tabela data_versions), więc cache odpowiedzi i indeksy w pamięci API od razu się odświeżają.
+# Użycie: python worker.py           (pętla: teraz + codziennie o SCHEDULER_HOUR)
+#         python worker.py --once    (jeden przebieg, np. z crona)
+from services import scheduler
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    if "--once" in sys.argv:
+        print(f"✅ {scheduler.run_daily_once()}")
+        return
+    print(f"--- WORKER: zadania dzienne o {scheduler.SCHEDULER_HOUR}:00 ---")
+    asyncio.run(scheduler.run_forever())
+
+if __name__ == "__main__":
+    main()